@@ -0,0 +1,103 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from signals import HpaStatus, PodRequest, QueueBacklog
+
+logger = logging.getLogger(__name__)
+
+# Backlog alone never asks for more than this multiple of a service's consumers in one cycle:
+# a queue nothing acknowledges from has an unbounded drain time
+MAX_CONSUMER_GROWTH = 2.0
+
+
+@dataclass(frozen=True)
+class BacklogBreach:
+    """A watched queue whose weighted drain time exceeds the SLO."""
+    backlog: QueueBacklog
+    # "namespace/deployment" consuming the queue
+    service: str
+    weight: float
+
+    @property
+    def drain_seconds(self) -> float:
+        return self.backlog.drain_seconds * self.weight
+
+
+class BacklogPolicy:
+    """
+    Scales for RabbitMQ backlogs that will not drain within the SLO.
+    A queue's throughput grows roughly with its consumer replicas, so a backlog draining in twice
+    the SLO needs twice the consumers. Those extra pods, sized like the service's current ones and
+    capped at its HPA max, are provisioned for like projected HPA replicas: CPU follows the backlog
+    into the consumers only once they are working through it, which is too late to wait for.
+    """
+
+    def __init__(self, drain_slo_seconds: float = 120.0,
+                 consumers: Optional[Mapping[str, Tuple[str, float]]] = None, min_backlog: float = 100.0):
+        self.drain_slo_seconds = drain_slo_seconds
+        self.consumers = consumers or {}
+        self.min_backlog = min_backlog
+
+    def breaches(self, queues: Iterable[QueueBacklog]) -> Tuple[BacklogBreach, ...]:
+        """The watched queues with a backlog worth scaling for that will not drain in time."""
+        breaches = []
+        for backlog in queues:
+            consumer = self.consumers.get(backlog.queue)
+            if consumer is None or backlog.depth < self.min_backlog:
+                continue
+            breach = BacklogBreach(backlog, *consumer)
+            if breach.drain_seconds > self.drain_slo_seconds:
+                breaches.append(breach)
+        return tuple(breaches)
+
+    def consumer_pods(self, breaches: Sequence[BacklogBreach], pods: Sequence[PodRequest],
+                      hpas: Sequence[HpaStatus] = (), upcoming: Sequence[PodRequest] = ()) -> Tuple[PodRequest, ...]:
+        """
+        The consumer pods to add so every breached queue drains within the SLO.
+        `pods` are the running and pending pods the throughput was measured with; a service with none
+        cannot be sized and is only reported. Replicas the HPAs are already projected to add (`upcoming`)
+        count towards the target.
+        """
+        growth: Dict[str, float] = {}
+        for breach in breaches:
+            ratio = min(breach.drain_seconds / self.drain_slo_seconds, MAX_CONSUMER_GROWTH)
+            growth[breach.service] = max(growth.get(breach.service, 1.0), ratio)
+
+        by_service: Dict[str, List[PodRequest]] = {}
+        for pod in pods:
+            by_service.setdefault(f"{pod.namespace}/{pod.workload}", []).append(pod)
+        projected: Dict[str, int] = {}
+        for pod in upcoming:
+            service = f"{pod.namespace}/{pod.workload}"
+            projected[service] = projected.get(service, 0) + 1
+        max_replicas = {f"{hpa.namespace}/{hpa.workload}": hpa.max_replicas for hpa in hpas}
+
+        extra = []
+        for service, ratio in sorted(growth.items()):
+            replicas = by_service.get(service)
+            if not replicas:
+                logger.warning(f"Backlog for {service} cannot be sized: it has no pods to size it by.")
+                continue
+            target = math.ceil(len(replicas) * ratio)
+            target = min(target, max_replicas.get(service, target))
+            cpu = sum(pod.cpu for pod in replicas) / len(replicas)
+            memory = sum(pod.memory for pod in replicas) / len(replicas)
+            namespace, _, workload = service.partition('/')
+            extra.extend(
+                PodRequest(namespace=namespace, pod=f"{workload}-backlog-{n}", cpu=cpu, memory=memory, workload=workload)
+                for n in range(target - len(replicas) - projected.get(service, 0))
+            )
+
+        for breach in breaches:
+            backlog = breach.backlog
+            logger.info(
+                f"Queue backlog: {backlog.vhost}/{backlog.queue} holds {backlog.depth:.0f} messages at "
+                f"{backlog.throughput:.1f}/s, drain time {self._format_seconds(backlog.drain_seconds)} "
+                f"(weight {breach.weight:g}, SLO {self.drain_slo_seconds:.0f}s); consumer {breach.service}."
+            )
+        return tuple(extra)
+
+    @staticmethod
+    def _format_seconds(seconds: float) -> str:
+        return "unbounded" if math.isinf(seconds) else f"{seconds:.0f}s"
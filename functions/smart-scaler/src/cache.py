@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    Bounded TTL cache for scalar query results, keyed by PromQL and evaluation time bucket.
+
+    Time is cut into `ttl`-second buckets, so every evaluation of a query inside the same bucket
+    shares one result and an entry is never served after its bucket ends. The least recently
+    used entry is evicted once `max_entries` is reached. With a `spill_path`, entries survive
+    a rebuilt client or a restarted process through a small JSON file (e.g. under /tmp).
+    A `ttl` or `max_entries` of 0 disables the cache, spill file included.
+    """
+
+    def __init__(self, ttl: float = 15.0, max_entries: int = 128, spill_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.spill_path = spill_path
+        self._clock = clock
+
+        self._entries: "OrderedDict[Tuple[str, int], Optional[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if spill_path and self.enabled:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get_or_compute(self, promql: str, compute: Callable[[], Optional[float]]) -> Optional[float]:
+        """
+        Returns the cached value for this bucket, or computes and stores it.
+        Concurrent misses on the same key each compute; the last one stored wins.
+        """
+        if not self.enabled:
+            return compute()
+
+        bucket = self._bucket()
+        key = (promql, bucket)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self._expire(bucket)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+    def flush(self):
+        """Writes the live entries to the spill file, if one is configured and anything changed."""
+        if not self.spill_path or not self.enabled or not self._dirty:
+            return
+
+        with self._lock:
+            self._expire(self._bucket())
+            entries = [[promql, bucket, value] for (promql, bucket), value in self._entries.items()]
+            self._dirty = False
+
+        # Write-then-rename so a concurrent reader never sees a half-written file
+        temporary = f"{self.spill_path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'w') as f:
+                json.dump({"ttl": self.ttl, "entries": entries}, f)
+            os.replace(temporary, self.spill_path)
+        except OSError as e:
+            logger.warning(f"Could not spill query cache to {self.spill_path}: {e}")
+
+    def _bucket(self) -> int:
+        return int(self._clock() // self.ttl)
+
+    def _expire(self, bucket: int):
+        # Anything from an earlier bucket is stale
+        for key in [key for key in self._entries if key[1] != bucket]:
+            del self._entries[key]
+
+    def _load(self):
+        try:
+            with open(self.spill_path) as f:
+                spilled = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable query cache spill {self.spill_path}: {e}")
+            return
+
+        # A spill written with another TTL has incompatible buckets
+        if spilled.get("ttl") != self.ttl:
+            return
+
+        bucket = self._bucket()
+        for promql, entry_bucket, value in spilled.get("entries", [])[-self.max_entries:]:
+            if entry_bucket == bucket:
+                self._entries[(promql, entry_bucket)] = value
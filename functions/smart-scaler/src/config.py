@@ -0,0 +1,182 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ScalerConfig:
+    """
+    Scaler settings parsed once from the Lambda environment.
+    """
+    asg_name: Optional[str]
+    prometheus_url: Optional[str]
+    dynamo_table: Optional[str]
+    min_nodes: int = 2
+    max_nodes: int = 5
+
+    # Scaling policies evaluated each cycle (see policies.py): 'smart' for all of them, 'legacy' for the
+    # first autoscaler Lambda's rule (one node more above 80% CPU, never down), or a list of policy names.
+    # Each window of the schedule policy is (weekdays with Monday 0, start minute, end minute, floor
+    # nodes) in UTC, parsed from e.g. "mon-fri 08:00-18:00=4,sat 10:00-14:00=3".
+    scaling_policies: Tuple[str, ...] = ('smart',)
+    scale_schedule: Tuple[Tuple[Tuple[int, ...], int, int, int], ...] = ()
+
+    # CPU controller: 'threshold' adds or removes one node when CPU crosses scale_up_cpu / scale_down_cpu;
+    # 'pid' sizes the cluster from the error against pid_target_cpu (see controller.py), holding
+    # within the dead-band around it. tools/benchmark_controller.py compares them.
+    capacity_controller: str = 'threshold'
+    scale_up_cpu: float = 70.0
+    scale_down_cpu: float = 30.0
+    pid_target_cpu: float = 60.0
+    pid_kp_up: float = 0.7
+    pid_kp_down: float = 0.5
+    pid_ki: float = 0.0
+    pid_kd: float = 0.0
+    pid_deadband_up: float = 10.0
+    pid_deadband_down: float = 30.0
+    pid_integral_window_seconds: float = 600.0
+
+    # Worker shape used to size scale-ups; the allocatable overrides take precedence over the built-in table
+    worker_instance_type: str = 't3.medium'
+    node_allocatable_cpu: Optional[float] = None
+    node_allocatable_memory: Optional[float] = None
+
+    # Trend forecasting: how far ahead to look (roughly the time a new worker needs to become Ready).
+    # A worker started from the ASG's warm pool is already initialized and only joins, so while the
+    # pool has instances the forecast looks warm_node_ready_seconds ahead instead.
+    node_ready_seconds: float = 240.0
+    warm_node_ready_seconds: float = 60.0
+    forecast_method: str = 'holt'
+
+    # Scale-down hysteresis: quiet period after any scaling action, and how many consecutive
+    # stored CPU samples must sit below the scale-down threshold
+    scale_down_cooldown_seconds: float = 300.0
+    scale_down_stable_samples: int = 3
+
+    # Share of the cluster's allocatable CPU, memory or pod slots that may be requested
+    # before the scaler adds nodes, ahead of pods failing to schedule
+    scale_up_request_percent: float = 85.0
+
+    # HPA projection: the fastest an HPA may add replicas (the services' policies add 2 per 30s),
+    # and how far ahead to project the climb of an HPA its policy holds back; 0 disables it.
+    # tools/backtest_hpa.py weighs longer lookaheads against the nodes they add.
+    hpa_scale_up_pods: int = 2
+    hpa_scale_up_period_seconds: float = 30.0
+    hpa_lookahead_seconds: float = 120.0
+
+    # RabbitMQ backlog: longest a queue's backlog may take to drain at its consumers' current rate,
+    # and the consumer of each watched queue: queue -> ("namespace/deployment", weight).
+    # A weight above 1 tightens the SLO for that queue, below 1 relaxes it. Backlogs under
+    # queue_min_backlog messages are left to the consumers as they are.
+    queue_drain_slo_seconds: float = 120.0
+    queue_min_backlog: float = 100.0
+    queue_consumers: Mapping[str, Tuple[str, float]] = field(default_factory=dict)
+
+    # Ingress latency SLO (seconds) per quantile; either may be None to ignore it. Ingresses serving
+    # fewer requests per second than latency_min_rps are not judged. Latency can stay high for
+    # reasons more nodes do not fix, so latency alone adds at most one node per cooldown.
+    latency_slo_p95_seconds: Optional[float] = 0.5
+    latency_slo_p99_seconds: Optional[float] = 1.0
+    latency_min_rps: float = 1.0
+    latency_scale_up_cooldown_seconds: float = 300.0
+
+    # Seasonal forecast: hour-of-week requested CPU learned from Prometheus history ('holt_winters' or
+    # 'naive'), and how far ahead of a predicted peak the floor rises to meet it; the lead covers a node
+    # launching and joining plus a cycle or two. tools/backtest_seasonal.py replays it over a week.
+    seasonal_method: str = 'holt_winters'
+    seasonal_lead_seconds: float = 900.0
+    seasonal_history_seconds: float = 14 * 86400.0
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "ScalerConfig":
+        return cls(
+            asg_name=environ.get('ASG_NAME'),
+            prometheus_url=environ.get('PROMETHEUS_URL'),
+            dynamo_table=environ.get('DYNAMO_TABLE'),
+            min_nodes=int(environ.get('MIN_NODES', 2)),
+            max_nodes=int(environ.get('MAX_NODES', 5)),
+            scaling_policies=tuple(
+                name.strip() for name in environ.get('SCALING_POLICIES', 'smart').split(',') if name.strip()
+            ),
+            scale_schedule=_scale_schedule(environ.get('SCALE_SCHEDULE', '')),
+            capacity_controller=environ.get('CAPACITY_CONTROLLER', 'threshold'),
+            scale_up_cpu=float(environ.get('SCALE_UP_CPU', 70)),
+            scale_down_cpu=float(environ.get('SCALE_DOWN_CPU', 30)),
+            pid_target_cpu=float(environ.get('PID_TARGET_CPU', 60)),
+            pid_kp_up=float(environ.get('PID_KP_UP', 0.7)),
+            pid_kp_down=float(environ.get('PID_KP_DOWN', 0.5)),
+            pid_ki=float(environ.get('PID_KI', 0.0)),
+            pid_kd=float(environ.get('PID_KD', 0.0)),
+            pid_deadband_up=float(environ.get('PID_DEADBAND_UP', 10)),
+            pid_deadband_down=float(environ.get('PID_DEADBAND_DOWN', 30)),
+            pid_integral_window_seconds=float(environ.get('PID_INTEGRAL_WINDOW_SECONDS', 600)),
+            worker_instance_type=environ.get('WORKER_INSTANCE_TYPE', 't3.medium'),
+            node_allocatable_cpu=_optional_float(environ.get('NODE_ALLOCATABLE_CPU')),
+            node_allocatable_memory=_optional_float(environ.get('NODE_ALLOCATABLE_MEMORY')),
+            node_ready_seconds=float(environ.get('NODE_READY_SECONDS', 240)),
+            warm_node_ready_seconds=float(environ.get('WARM_NODE_READY_SECONDS', 60)),
+            forecast_method=environ.get('FORECAST_METHOD', 'holt'),
+            scale_down_cooldown_seconds=float(environ.get('SCALE_DOWN_COOLDOWN_SECONDS', 300)),
+            scale_down_stable_samples=int(environ.get('SCALE_DOWN_STABLE_SAMPLES', 3)),
+            scale_up_request_percent=float(environ.get('SCALE_UP_REQUEST_PERCENT', 85)),
+            hpa_scale_up_pods=int(environ.get('HPA_SCALE_UP_PODS', 2)),
+            hpa_scale_up_period_seconds=float(environ.get('HPA_SCALE_UP_PERIOD_SECONDS', 30)),
+            hpa_lookahead_seconds=float(environ.get('HPA_LOOKAHEAD_SECONDS', 120)),
+            queue_drain_slo_seconds=float(environ.get('QUEUE_DRAIN_SLO_SECONDS', 120)),
+            queue_min_backlog=float(environ.get('QUEUE_MIN_BACKLOG', 100)),
+            queue_consumers=_queue_consumers(environ.get('QUEUE_CONSUMERS', '')),
+            latency_slo_p95_seconds=_optional_float(environ.get('LATENCY_SLO_P95_SECONDS', '0.5')),
+            latency_slo_p99_seconds=_optional_float(environ.get('LATENCY_SLO_P99_SECONDS', '1.0')),
+            latency_min_rps=float(environ.get('LATENCY_MIN_RPS', 1)),
+            latency_scale_up_cooldown_seconds=float(environ.get('LATENCY_SCALE_UP_COOLDOWN_SECONDS', 300)),
+            seasonal_method=environ.get('SEASONAL_METHOD', 'holt_winters'),
+            seasonal_lead_seconds=float(environ.get('SEASONAL_LEAD_SECONDS', 900)),
+            seasonal_history_seconds=float(environ.get('SEASONAL_HISTORY_SECONDS', 14 * 86400)),
+        )
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _queue_consumers(value: str) -> Dict[str, Tuple[str, float]]:
+    """
+    Parses "queue=namespace/deployment[:weight],..." into queue -> (consumer, weight),
+    e.g. "order.created=development/inventory-service:2,email=development/notification-service:0.5".
+    """
+    consumers = {}
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        queue, _, consumer = entry.partition('=')
+        service, _, weight = consumer.partition(':')
+        if not queue or '/' not in service:
+            raise ValueError(f"Invalid QUEUE_CONSUMERS entry {entry!r}; expected queue=namespace/deployment[:weight]")
+        consumers[queue.strip()] = (service.strip(), float(weight) if weight else 1.0)
+    return consumers
+
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _scale_schedule(value: str) -> Tuple[Tuple[Tuple[int, ...], int, int, int], ...]:
+    """
+    Parses "days HH:MM-HH:MM=nodes,..." into (weekdays, start minute, end minute, nodes) windows,
+    where days is a day ("sat"), a range ("mon-fri") or "*" for every day, e.g. "mon-fri 08:00-18:00=4".
+    An end of 24:00 runs to midnight.
+    """
+    windows = []
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        try:
+            period, _, nodes = entry.partition('=')
+            days, hours = period.split()
+            start, end = (int(clock[:2]) * 60 + int(clock[3:]) for clock in hours.split('-'))
+            if days == '*':
+                weekdays = tuple(range(7))
+            else:
+                first, _, last = days.lower().partition('-')
+                weekdays = tuple(range(WEEKDAYS.index(first), WEEKDAYS.index(last or first) + 1))
+            if not weekdays or not 0 <= start < end <= 24 * 60:
+                raise ValueError
+            windows.append((weekdays, start, end, int(nodes)))
+        except ValueError:
+            raise ValueError(f"Invalid SCALE_SCHEDULE entry {entry!r}; expected days HH:MM-HH:MM=nodes") from None
+    return tuple(windows)
@@ -0,0 +1,126 @@
+import logging
+import math
+from typing import Optional
+from config import ScalerConfig
+from signals import RangeSeries
+
+logger = logging.getLogger(__name__)
+
+
+class ThresholdController:
+    """
+    The original policy: one node more when CPU, now or forecast, is above `scale_up`,
+    one fewer when both are below `scale_down`.
+    """
+
+    def __init__(self, scale_up: float = 70.0, scale_down: float = 30.0):
+        self.scale_up = scale_up
+        self.scale_down = scale_down
+
+    def desired_nodes(self, current: int, utilization: Optional[float], predicted: Optional[float] = None,
+                      history: Optional[RangeSeries] = None) -> int:
+        if (utilization is not None and utilization > self.scale_up) or \
+                (predicted is not None and predicted > self.scale_up):
+            return current + 1
+        if utilization is not None and utilization < self.scale_down:
+            if predicted is not None and predicted >= self.scale_down:
+                logger.info(f"Scale-down deferred: CPU is trending up (forecast {predicted:.1f}%).")
+                return current
+            return current - 1
+        return current
+
+
+class PidController:
+    """
+    Sizes the cluster from the error against a target CPU utilization.
+    The error is relative, e = (utilization - target) / target, so a proportional gain of 1 asks for
+    exactly the nodes that would bring utilization back to target (current * utilization / target);
+    separate gains for growing and shrinking let it add capacity eagerly and give it back gently.
+    The integral term sums the error over the stored CPU history (error-minutes within
+    `integral_window`), the derivative is the error's slope per minute over its last samples.
+    Inside the dead-band around the target it holds, and it never shrinks so far that utilization
+    would land above the band again. Like the threshold controller it acts on the forecast: growth is
+    sized from the higher of CPU now and forecast, and a forecast back inside the band defers a shrink.
+    """
+
+    # Per-cycle limits on the relative correction: at most double, at most halve
+    MAX_GROWTH = 1.0
+    MAX_SHRINK = -0.5
+
+    def __init__(self, target: float = 60.0, kp_up: float = 0.7, kp_down: float = 0.5, ki: float = 0.0,
+                 kd: float = 0.0, deadband_up: float = 10.0, deadband_down: float = 30.0,
+                 integral_window: float = 600.0, derivative_window: float = 180.0):
+        self.target = target
+        self.kp_up = kp_up
+        self.kp_down = kp_down
+        self.ki = ki
+        self.kd = kd
+        self.scale_up = target + deadband_up
+        self.scale_down = target - deadband_down
+        self.integral_window = integral_window
+        self.derivative_window = derivative_window
+
+    def desired_nodes(self, current: int, utilization: Optional[float], predicted: Optional[float] = None,
+                      history: Optional[RangeSeries] = None) -> int:
+        if utilization is None or current <= 0:
+            return current
+        # Growth is sized for the load expected once new nodes are Ready. A trend extrapolated past 100%
+        # says the nodes will be saturated, not by how much, so it counts as saturation
+        if predicted is not None and predicted > utilization and predicted > self.scale_up:
+            utilization = min(predicted, 100.0)
+        elif utilization < self.scale_down and predicted is not None and predicted >= self.scale_down:
+            logger.info(f"Scale-down deferred: CPU is trending up (forecast {predicted:.1f}%).")
+            return current
+        if self.scale_down <= utilization <= self.scale_up:
+            return current
+
+        error = (utilization - self.target) / self.target
+        output = (self.kp_up if error > 0 else self.kp_down) * error
+        if history is not None and len(history) >= 2:
+            output += self.ki * self._integral(history) + self.kd * self._derivative(history)
+        output = min(max(output, self.MAX_SHRINK), self.MAX_GROWTH)
+
+        if error > 0:
+            # Outside the band the cluster always moves, by at least one node
+            return max(math.ceil(current * (1 + output)), current + 1)
+        desired = min(math.floor(current * (1 + output)), current - 1)
+        # Fewer nodes than this would push the same load above the band
+        return max(desired, math.ceil(current * utilization / self.scale_up), 1)
+
+    def _errors(self, history: RangeSeries, since: float):
+        return [
+            (timestamp, (value - self.target) / self.target)
+            for timestamp, value in zip(history.timestamps, history.values) if timestamp >= since
+        ]
+
+    def _integral(self, history: RangeSeries) -> float:
+        """Trapezoidal sum of the error over the window, in error-minutes."""
+        samples = self._errors(history, history.timestamps[-1] - self.integral_window)
+        return sum(
+            (e0 + e1) / 2 * (t1 - t0) / 60
+            for (t0, e0), (t1, e1) in zip(samples, samples[1:])
+        )
+
+    def _derivative(self, history: RangeSeries) -> float:
+        """Change of the error per minute across the derivative window."""
+        samples = self._errors(history, history.timestamps[-1] - self.derivative_window)
+        if len(samples) < 2 or samples[-1][0] <= samples[0][0]:
+            return 0.0
+        return (samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0]) * 60
+
+
+CONTROLLERS = ('threshold', 'pid')
+
+
+def build_controller(config: ScalerConfig):
+    """The capacity controller selected by CAPACITY_CONTROLLER."""
+    if config.capacity_controller == 'threshold':
+        return ThresholdController(scale_up=config.scale_up_cpu, scale_down=config.scale_down_cpu)
+    if config.capacity_controller == 'pid':
+        return PidController(
+            target=config.pid_target_cpu, kp_up=config.pid_kp_up, kp_down=config.pid_kp_down,
+            ki=config.pid_ki, kd=config.pid_kd,
+            deadband_up=config.pid_deadband_up, deadband_down=config.pid_deadband_down,
+            integral_window=config.pid_integral_window_seconds,
+        )
+    raise ValueError(f"Unknown capacity controller {config.capacity_controller!r}; expected one of {CONTROLLERS}")
@@ -0,0 +1,104 @@
+import logging
+from typing import Callable, Optional, Tuple
+from headroom import ClusterHeadroom
+from scaler import ScalingDecision, SmartScaler
+from signals import ClusterSignals, RangeSeries
+from snapshot import AsgSnapshot
+from state import SCALE_DOWN, SCALE_UP, ScalerState
+from state_manager import Lease, StateManager
+from telemetry import span
+from webhook import AlertTrigger
+
+logger = logging.getLogger(__name__)
+
+# The steps of one scaling decision, shared by the Lambda handler and the in-cluster daemon.
+# Fetching is left to the callers so each can schedule its I/O its own way.
+
+
+def decide(scaler: SmartScaler, signals: ClusterSignals, snapshot: AsgSnapshot,
+           state: ScalerState, now: float) -> Tuple[ScalingDecision, ScalerState]:
+    """Records this cycle's CPU sample and runs the scaling policy."""
+    spread = signals.cpu_spread
+    logger.info(
+        "Cluster Metrics Fetched",
+        extra={
+            "cpu": signals.cpu_utilization,
+            "pending_pods": signals.pending_pods,
+            "pending_requests": len(signals.pending_requests),
+            "cpu_node_p90": spread.p90 if spread else None,
+            "cpu_node_max": spread.max if spread else None,
+            "cpu_node_skew": round(spread.skew, 2) if spread else None,
+            "request_headroom": ClusterHeadroom.from_nodes(signals.nodes).describe(),
+            "missing": list(signals.missing),
+        }
+    )
+    # A cycle without a CPU measurement leaves no sample rather than a fake 0%
+    if signals.cpu_utilization is not None:
+        state = state.observe(now, signals.cpu_utilization)
+    with span("decision"):
+        decision = scaler.make_decision(signals, snapshot, state, now)
+    return decision, state
+
+
+def learn(scaler: SmartScaler, fetch: Callable[[float, float, float], Optional[RangeSeries]],
+          state: ScalerState, now: float) -> ScalerState:
+    """
+    Folds the hours completed since the seasonal model was last fitted into it, about once an hour.
+    `fetch(start, end, step)` reads the requested-CPU history. A failed fetch keeps the stored model.
+    """
+    forecaster = scaler.seasonal
+    if forecaster is None or not forecaster.due(state.seasonal, now):
+        return state
+    try:
+        with span("seasonal.learn"):
+            history = fetch(forecaster.fetch_from(state.seasonal, now), now, forecaster.step_seconds)
+    except Exception as e:
+        logger.warning(f"Seasonal model not updated this cycle: {e}")
+        return state
+    if history is None:
+        return state
+    return state.learned(forecaster.update(state.seasonal, history.timestamps, history.values, now))
+
+
+def decide_on_alerts(scaler: SmartScaler, trigger: AlertTrigger, snapshot: AsgSnapshot,
+                     state: ScalerState) -> ScalingDecision:
+    """Runs the scaling policy on an alert's values. Alerts only ever justify adding nodes."""
+    # Alerts carry no utilization unless a CPU alert fired; fall back to the last stored sample, if any
+    cpu = trigger.cpu_utilization
+    if cpu is None:
+        cpu = next(iter(state.recent_values(1)), None)
+    signals = ClusterSignals(
+        cpu_utilization=cpu,
+        pending_pods=len(trigger.pending_requests),
+        pending_requests=trigger.pending_requests,
+    )
+
+    with span("decision"):
+        decision = scaler.make_decision(signals, snapshot, state)
+
+    # Shrinking is left to the scheduled cycle
+    if decision.target_capacity <= snapshot.desired_capacity:
+        logger.info("Fast path: the alerts do not call for more nodes.")
+        return ScalingDecision(target_capacity=snapshot.desired_capacity)
+    return decision
+
+
+def apply(state_manager: StateManager, scaler: SmartScaler, lease: Lease, decision: ScalingDecision,
+          current_capacity: int, state: ScalerState, now: float) -> ScalerState:
+    """Carries out a decision under the lease and returns the state with the action recorded."""
+    if decision.target_capacity == current_capacity:
+        logger.info("Cluster capacity is optimal. No action taken.")
+        return state
+
+    logger.info(
+        "Capacity mismatch detected. Scaling...",
+        extra={"from": current_capacity, "to": decision.target_capacity}
+    )
+    # Learning and the metrics fan-out may have used up most of the lease; it must outlive the ASG call
+    lease = state_manager.ensure_lease(lease)
+    # Rejects this write if a newer invocation took the lease over meanwhile
+    state_manager.fence(lease)
+    scaler.apply_decision(decision)
+
+    direction = SCALE_UP if decision.target_capacity > current_capacity else SCALE_DOWN
+    return state.acted(now, direction, decision.target_capacity)
@@ -0,0 +1,197 @@
+"""
+Long-running control loop for the smart-scaler, meant to run on the k3s master next to Prometheus.
+
+It runs the same policy as the Lambda (SmartScaler through cycle.py) but keeps the lease,
+the HTTP connections and the scaler state in memory between ticks, so it can decide every
+few seconds without cold starts or a trip through the ALB. The lease doubles as leader
+election: while the daemon renews it, the scheduled Lambda finds the lock held and skips;
+if the daemon stops, the lease lapses after LOCK_LEASE_SECONDS and the Lambda takes over.
+
+Usage: python daemon.py   (configured through the same environment variables as the Lambda)
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+import cycle
+import telemetry
+from resources import ResourceRegistry
+from state import ScalerState
+from state_manager import Lease, LeaseLostError
+from typing import Any, Dict, Optional
+from webhook import AlertTrigger
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAdapter:
+    """Exposes a blocking client's methods as coroutines that run in the default thread pool."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+        return call
+
+
+class ScalerDaemon:
+    def __init__(self, registry: Optional[ResourceRegistry] = None):
+        self.registry = registry or ResourceRegistry()
+
+        # Seconds between decisions
+        self.interval = float(os.environ.get('DAEMON_INTERVAL_SECONDS', 10))
+        self.emit_emf = os.environ.get('EMIT_EMF_METRICS', 'false').lower() == 'true'
+
+        self.lease: Optional[Lease] = None
+        self.state: Optional[ScalerState] = None
+        # Fast-path triggers collected with the lease, for this tick's decision
+        self.trigger = AlertTrigger()
+        self._stop: Optional[asyncio.Event] = None
+
+    async def run(self):
+        """Ticks until stop() is called, then hands the lease back with the latest state."""
+        self._stop = asyncio.Event()
+        state_manager = self.registry.state_manager()
+        if state_manager is None:
+            raise ValueError("Environment variable DYNAMO_TABLE is not set.")
+
+        lease_seconds = state_manager.lock_duration
+        if self.interval * 2 > lease_seconds:
+            raise ValueError(
+                f"DAEMON_INTERVAL_SECONDS ({self.interval:g}) must be at most half of "
+                f"LOCK_LEASE_SECONDS ({lease_seconds}) or the lease lapses between ticks"
+            )
+        logger.info(f"Scaler daemon started (tick every {self.interval:g}s, lease {lease_seconds}s).")
+
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                await self.tick()
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=max(0.0, self.interval - (time.monotonic() - started)))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._step_down()
+            self.registry.invalidate()
+            logger.info("Scaler daemon stopped.")
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def tick(self) -> Dict[str, Any]:
+        """One decision cycle. Followers only check whether the leader's lease has lapsed."""
+        telemetry.start_cycle()
+        self.registry.start_invocation()
+        result: Dict[str, Any] = {"status": "error", "message": "Unhandled failure"}
+        try:
+            if not await self._lead():
+                result = {"status": "skipped", "message": "Following"}
+                return result
+            result = await self._decide()
+            return result
+
+        except LeaseLostError as e:
+            logger.warning(f"Leadership lost: {e}")
+            self.lease = None
+            result = {"status": "skipped", "message": "Lease lost"}
+            return result
+
+        except Exception as e:
+            logger.error(f"Scaling aborted due to safety failure: {e}")
+            # Connections or credentials may be the cause; rebuild them next tick
+            self.registry.invalidate()
+            result = {"status": "error", "message": "Scaling aborted for safety."}
+            return result
+
+        finally:
+            telemetry.annotate(trigger="daemon", status=result.get("status"),
+                               recommended_capacity=result.get("recommended_capacity"))
+            telemetry.end_cycle(emit_emf=self.emit_emf)
+
+    async def _lead(self) -> bool:
+        """Takes the lease when it is free, otherwise renews it along with the state saved from the last tick."""
+        state_manager = AsyncAdapter(self.registry.state_manager())
+
+        if self.lease is None:
+            lease = await state_manager.acquire_lock()
+            if lease is None:
+                return False
+            # Another holder may have acted since we last led, so start from the stored state
+            self.lease, self.state = lease, lease.state
+            logger.info(f"Scaler daemon is now the leader (token {lease.token}).")
+            return True
+
+        self.lease, queued = await state_manager.checkpoint(self.lease, self.state)
+        self.trigger = AlertTrigger()
+        for payload in queued:
+            self.trigger = self.trigger.merge(AlertTrigger.from_json(payload))
+        if queued:
+            # The checkpoint cleared them, so this tick must act on them: Prometheus may no longer show
+            # pods scheduled since the alert fired, or a burst that came and went between ticks
+            logger.info(f"Folding {len(queued)} queued fast-path trigger(s) into this cycle.")
+        return True
+
+    async def _decide(self) -> Dict[str, Any]:
+        state_manager = self.registry.state_manager()
+        scaler = self.registry.scaler()
+        metrics_client = self.registry.metrics_client()
+        self.registry.report()
+
+        # Prometheus and the ASG are independent, so fetch them concurrently
+        now = time.time()
+        signals, snapshot = await asyncio.gather(
+            AsyncAdapter(metrics_client).collect_signals(
+                history=self.state.history(since=now - metrics_client.history_window), needed=scaler.queries,
+            ),
+            AsyncAdapter(scaler).describe_asg(),
+        )
+
+        self.state = await asyncio.to_thread(
+            cycle.learn, scaler, metrics_client.cpu_requests_history, self.state, now
+        )
+        decision, self.state = cycle.decide(scaler, signals, snapshot, self.state, now)
+        if self.trigger:
+            alerted = cycle.decide_on_alerts(scaler, self.trigger, snapshot, self.state)
+            if alerted.target_capacity > decision.target_capacity:
+                logger.info(f"Queued alerts call for {alerted.target_capacity} nodes; overriding this tick's decision.")
+                decision = alerted
+            self.trigger = AlertTrigger()
+        self.state = await asyncio.to_thread(
+            cycle.apply, state_manager, scaler, self.lease, decision, snapshot.desired_capacity, self.state, now
+        )
+        return {"status": "success", "recommended_capacity": decision.target_capacity}
+
+    async def _step_down(self):
+        if self.lease is None:
+            return
+        queued = await AsyncAdapter(self.registry.state_manager()).release_lock(self.lease, self.state)
+        if queued:
+            # The last tick already read Prometheus; the next scheduled run will read it again
+            logger.info(f"Dropped {len(queued)} fast-path trigger(s) queued after the last tick.")
+        self.lease = None
+
+
+def main():
+    telemetry.configure_logging(os.getenv("LOG_LEVEL", "INFO"))
+    daemon = ScalerDaemon()
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, daemon.stop)
+        await daemon.run()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
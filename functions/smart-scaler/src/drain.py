@@ -0,0 +1,93 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterator, List, Mapping, Optional, Sequence, Tuple
+from signals import NodeState, PodRequest
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DrainPlan:
+    node: str
+    moved_pods: int
+    # pod -> destination node
+    placements: Tuple[Tuple[str, str], ...]
+
+
+class DrainSimulator:
+    """
+    Proves a worker can be removed before the scaler shrinks the cluster.
+    A node is drainable when every movable pod on it repacks onto the remaining
+    nodes' free CPU, memory and pod slots (first-fit-decreasing) and no PodDisruptionBudget
+    would be exceeded. Nodes that do not report max-pods are treated as having slots to spare.
+    """
+
+    def __init__(self, disruptions_allowed: Optional[Mapping[str, int]] = None):
+        self.disruptions_allowed = disruptions_allowed or {}
+
+    def find_removable(self, nodes: Sequence[NodeState]) -> Optional[DrainPlan]:
+        """Returns the cheapest worker that drains cleanly, or None if no worker can be removed."""
+        return next(self.removable(nodes), None)
+
+    def removable(self, nodes: Sequence[NodeState]) -> Iterator[DrainPlan]:
+        """
+        Yields a plan for every worker that drains cleanly, cheapest first:
+        fewest pods to move, then lowest measured CPU usage, then least requested CPU.
+        """
+        candidates = sorted(
+            (node for node in nodes if not node.control_plane),
+            key=lambda node: (sum(1 for pod in node.pods if pod.movable), node.cpu_usage, node.requested_cpu),
+        )
+
+        for candidate in candidates:
+            plan = self.simulate(candidate, [node for node in nodes if node.name != candidate.name])
+            if plan:
+                yield plan
+
+    def simulate(self, candidate: NodeState, others: Sequence[NodeState]) -> Optional[DrainPlan]:
+        """Repacks the candidate's movable pods onto `others`. Returns None when they do not fit."""
+        movable = [pod for pod in candidate.pods if pod.movable]
+
+        blocked = self._pdb_violations(movable)
+        if blocked:
+            logger.debug(f"Node {candidate.name} not drainable: PDB blocks {', '.join(blocked)}")
+            return None
+
+        # One flat array per dimension; each pod only scans these, no per-node objects are touched
+        names = [node.name for node in others]
+        free_cpu = [node.allocatable_cpu - node.requested_cpu for node in others]
+        free_memory = [node.allocatable_memory - node.requested_memory for node in others]
+        free_slots = [node.allocatable_pods - node.pod_count if node.allocatable_pods else len(movable)
+                      for node in others]
+        total_cpu = sum(node.allocatable_cpu for node in others) or 1.0
+        total_memory = sum(node.allocatable_memory for node in others) or 1.0
+
+        placements: List[Tuple[str, str]] = []
+        for pod in sorted(movable, key=lambda p: max(p.cpu / total_cpu, p.memory / total_memory), reverse=True):
+            target = self._first_fit(pod, free_cpu, free_memory, free_slots)
+            if target is None:
+                logger.debug(f"Node {candidate.name} not drainable: {pod.namespace}/{pod.pod} does not fit elsewhere")
+                return None
+
+            free_cpu[target] -= pod.cpu
+            free_memory[target] -= pod.memory
+            free_slots[target] -= 1
+            placements.append((f"{pod.namespace}/{pod.pod}", names[target]))
+
+        return DrainPlan(node=candidate.name, moved_pods=len(placements), placements=tuple(placements))
+
+    @staticmethod
+    def _first_fit(pod: PodRequest, free_cpu: List[float], free_memory: List[float],
+                   free_slots: List[float]) -> Optional[int]:
+        for index in range(len(free_cpu)):
+            if pod.cpu <= free_cpu[index] and pod.memory <= free_memory[index] and free_slots[index] >= 1:
+                return index
+        return None
+
+    def _pdb_violations(self, pods: Sequence[PodRequest]) -> List[str]:
+        evictions = Counter(f"{pod.namespace}/{pod.workload}" for pod in pods if pod.workload)
+        return sorted(
+            workload for workload, count in evictions.items()
+            if workload in self.disruptions_allowed and count > self.disruptions_allowed[workload]
+        )
@@ -0,0 +1,67 @@
+import logging
+from typing import Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TrendForecaster:
+    """
+    Extrapolates a metric a short horizon ahead from its recent history.
+
+    Two estimators of the current level and slope are available:
+      - 'holt': double exponential smoothing (EWMA of the level and of the trend),
+        which reacts quickly to a fresh ramp;
+      - 'linear': least-squares slope over the whole window, which is steadier on noisy series.
+    """
+    METHODS = ('holt', 'linear')
+
+    def __init__(self, method: str = 'holt', alpha: float = 0.5, beta: float = 0.3, min_samples: int = 3):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown forecast method {method!r}; expected one of {self.METHODS}")
+
+        self.method = method
+        self.alpha = alpha
+        self.beta = beta
+        self.min_samples = min_samples
+
+    def forecast(self, timestamps: Sequence[float], values: Sequence[float], horizon: float) -> Optional[float]:
+        """
+        Predicts the value `horizon` seconds after the last sample.
+        Returns None when there is not enough history to estimate a trend.
+        """
+        if len(values) < self.min_samples:
+            return None
+
+        if self.method == 'linear':
+            level, slope = self._linear(timestamps, values)
+        else:
+            level, slope = self._holt(timestamps, values)
+
+        return level + slope * horizon
+
+    def _holt(self, timestamps: Sequence[float], values: Sequence[float]) -> Tuple[float, float]:
+        # Trend is kept per second so irregular sample spacing is handled
+        level = values[0]
+        trend = (values[1] - values[0]) / ((timestamps[1] - timestamps[0]) or 1.0)
+
+        for i in range(1, len(values)):
+            dt = (timestamps[i] - timestamps[i - 1]) or 1.0
+            previous_level = level
+            level = self.alpha * values[i] + (1 - self.alpha) * (level + trend * dt)
+            trend = self.beta * (level - previous_level) / dt + (1 - self.beta) * trend
+
+        return level, trend
+
+    @staticmethod
+    def _linear(timestamps: Sequence[float], values: Sequence[float]) -> Tuple[float, float]:
+        # Fit against time relative to the last sample, so the intercept is the current level
+        last = timestamps[-1]
+        n = len(values)
+        mean_t = sum(t - last for t in timestamps) / n
+        mean_v = sum(values) / n
+
+        covariance = sum((t - last - mean_t) * (v - mean_v) for t, v in zip(timestamps, values))
+        variance = sum((t - last - mean_t) ** 2 for t in timestamps)
+        slope = covariance / variance if variance else 0.0
+
+        return mean_v - slope * mean_t, slope
@@ -0,0 +1,69 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+from signals import NodeState
+
+CPU, MEMORY, PODS = 'cpu', 'memory', 'pods'
+
+
+@dataclass(frozen=True)
+class Headroom:
+    """Requested vs. allocatable for one resource dimension, summed over the schedulable nodes."""
+    dimension: str
+    requested: float
+    allocatable: float
+    nodes: int
+
+    @property
+    def utilization(self) -> float:
+        """Share of the allocatable already requested, in percent."""
+        return self.requested / self.allocatable * 100 if self.allocatable > 0 else 0.0
+
+    @property
+    def per_node(self) -> float:
+        return self.allocatable / self.nodes if self.nodes else 0.0
+
+    def nodes_to_reach(self, percent: float) -> int:
+        """Nodes of average size to add so the requests sit at or below `percent` of allocatable."""
+        if self.per_node <= 0 or self.utilization <= percent:
+            return 0
+        return math.ceil((self.requested * 100 / percent - self.allocatable) / self.per_node)
+
+    def without_node(self) -> "Headroom":
+        """The same requests packed onto one average node fewer."""
+        return Headroom(self.dimension, self.requested, self.allocatable - self.per_node, self.nodes - 1)
+
+
+@dataclass(frozen=True)
+class ClusterHeadroom:
+    """
+    Request headroom of the cluster per dimension (CPU, memory, pod slots).
+    Scheduling fails on whichever dimension runs out first, so the scaler reacts to the tightest one.
+    """
+    dimensions: Tuple[Headroom, ...] = ()
+
+    @classmethod
+    def from_nodes(cls, nodes: Sequence[NodeState]) -> "ClusterHeadroom":
+        """Sums every node's requests and allocatable; a dimension nothing reports is left out."""
+        totals = (
+            (CPU, sum(n.requested_cpu for n in nodes), sum(n.allocatable_cpu for n in nodes)),
+            (MEMORY, sum(n.requested_memory for n in nodes), sum(n.allocatable_memory for n in nodes)),
+            (PODS, sum(n.pod_count for n in nodes), sum(n.allocatable_pods for n in nodes)),
+        )
+        return cls(tuple(
+            Headroom(dimension, requested, allocatable, len(nodes))
+            for dimension, requested, allocatable in totals if allocatable > 0
+        ))
+
+    @property
+    def tightest(self) -> Optional[Headroom]:
+        return max(self.dimensions, key=lambda headroom: headroom.utilization, default=None)
+
+    def nodes_to_reach(self, percent: float) -> int:
+        return max((headroom.nodes_to_reach(percent) for headroom in self.dimensions), default=0)
+
+    def without_node(self) -> "ClusterHeadroom":
+        return ClusterHeadroom(tuple(headroom.without_node() for headroom in self.dimensions if headroom.nodes > 1))
+
+    def describe(self) -> str:
+        return ", ".join(f"{h.dimension} {h.utilization:.0f}%" for h in self.dimensions) or "n/a"
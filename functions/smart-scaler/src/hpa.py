@@ -0,0 +1,37 @@
+import math
+from typing import Iterable, Tuple
+from signals import HpaStatus, PodRequest
+
+
+class HpaProjector:
+    """
+    Anticipates the pods the HPAs are about to create.
+    An HPA whose scale-up policy is holding it back (ScalingLimited below its max) wants more
+    replicas than it may add, so it is projected to keep climbing at the policy's full rate
+    (`pods_per_step` per `step_seconds`; 2 per 30s for the services here) for `lookahead_seconds`
+    or until its max. An HPA that is not limited already has the replicas it asked for, apart
+    from pods still being created. The scaler provisions for projected pods that will not fit the
+    nodes' free capacity before they ever go pending.
+    """
+
+    def __init__(self, pods_per_step: int = 2, step_seconds: float = 30.0, lookahead_seconds: float = 240.0):
+        self.pods_per_step = pods_per_step
+        self.step_seconds = step_seconds
+        self.lookahead_seconds = lookahead_seconds
+
+    def projected_replicas(self, hpa: HpaStatus) -> int:
+        if self.lookahead_seconds <= 0:
+            return hpa.current_replicas
+        if not hpa.rate_limited:
+            return max(hpa.desired_replicas, hpa.current_replicas)
+        steps = math.ceil(self.lookahead_seconds / self.step_seconds)
+        return min(hpa.max_replicas, hpa.desired_replicas + self.pods_per_step * steps)
+
+    def upcoming_pods(self, hpas: Iterable[HpaStatus]) -> Tuple[PodRequest, ...]:
+        """Pods the HPAs will add over the lookahead, sized by their current pods' requests."""
+        return tuple(
+            PodRequest(namespace=hpa.namespace, pod=f"{hpa.workload}-projected-{n}",
+                       cpu=hpa.pod_cpu, memory=hpa.pod_memory, workload=hpa.workload)
+            for hpa in hpas
+            for n in range(self.projected_replicas(hpa) - hpa.current_replicas)
+        )
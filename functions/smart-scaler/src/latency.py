@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+from signals import IngressLatency
+
+
+@dataclass(frozen=True)
+class LatencyBreach:
+    """An Ingress quantile above its SLO."""
+    ingress: IngressLatency
+    quantile: str
+    seconds: float
+    slo: float
+
+    def describe(self) -> str:
+        return (f"{self.ingress.namespace}/{self.ingress.ingress} {self.quantile} {self.seconds * 1000:.0f}ms "
+                f"> {self.slo * 1000:.0f}ms at {self.ingress.requests_per_second:.1f} req/s")
+
+
+class LatencyPolicy:
+    """
+    Judges per-Ingress request latency against p95/p99 SLOs.
+    Latency breaks its SLO while cluster CPU looks fine when pods are throttled at their CPU limit
+    or share a node with a noisy neighbour; a fresh node gives the scheduler and the HPAs room to
+    spread them out. Ingresses with too little traffic for a meaningful quantile are skipped.
+    """
+
+    def __init__(self, p95_seconds: Optional[float] = 0.5, p99_seconds: Optional[float] = 1.0,
+                 min_rps: float = 1.0):
+        self.slos = tuple((quantile, slo) for quantile, slo in (('p95', p95_seconds), ('p99', p99_seconds)) if slo)
+        self.min_rps = min_rps
+
+    def breaches(self, ingresses: Iterable[IngressLatency]) -> Tuple[LatencyBreach, ...]:
+        breaches = []
+        for ingress in ingresses:
+            if ingress.requests_per_second < self.min_rps:
+                continue
+            for quantile, slo in self.slos:
+                seconds = getattr(ingress, quantile)
+                if seconds is not None and seconds > slo:
+                    breaches.append(LatencyBreach(ingress, quantile, seconds, slo))
+        return tuple(breaches)
@@ -1,65 +1,181 @@
 import os
+import time
 import logging
-from scaler import SmartScaler
-from state_manager import StateManager
-from metrics import PrometheusClient
-from typing import Any, Dict
+import cycle
+import telemetry
+import webhook
+from resources import ResourceRegistry
+from state import ScalerState
+from state_manager import Lease, LeaseLostError, StateManager
+from telemetry import span
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from webhook import AlertTrigger, WebhookError
 
 # Configuring the structured logging
 logger = logging.getLogger()
-logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+telemetry.configure_logging(os.getenv("LOG_LEVEL", "INFO"))
 
-DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
-state_manager = StateManager(DYNAMO_TABLE) if DYNAMO_TABLE else None
+# Publish per-phase timings as CloudWatch metrics through the log stream
+EMIT_EMF_METRICS = os.getenv("EMIT_EMF_METRICS", "false").lower() == "true"
+
+# Shared secret Alertmanager presents on the function URL; the fast path is off without it
+WEBHOOK_TOKEN = os.getenv("WEBHOOK_TOKEN")
+
+# Built once per container, reused by every warm invocation
+registry = ResourceRegistry()
+
+CycleResult = Tuple[Dict[str, Any], Optional[ScalerState]]
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler to orchestrate K3s cluster auto-scaling.
+    Scheduled events run a full cycle; Alertmanager webhooks arriving via the function URL
+    take the scale-up fast path. Emits one structured record per invocation with the duration of every phase.
     """
+    telemetry.start_cycle()
+    http = webhook.is_http_event(event)
+    result: Dict[str, Any] = {"status": "error", "message": "Unhandled failure"}
+    try:
+        if http:
+            result = _webhook_cycle(event)
+            return webhook.http_response(result)
+        result = _scaling_cycle(event)
+        return result
+    finally:
+        telemetry.annotate(
+            trigger="webhook" if http else "schedule",
+            status=result.get("status"), recommended_capacity=result.get("recommended_capacity"),
+        )
+        telemetry.end_cycle(emit_emf=EMIT_EMF_METRICS)
 
+def _scaling_cycle(event: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("Auto-scaling check initiated.", extra={"event": event})
+    registry.start_invocation()
 
+    state_manager = _state_manager()
     if not state_manager:
-        logger.error("Environment variable DYNAMO_TABLE is not set.")
         return {"status": "error", "message": "Configuration error"}
 
     # Use Context Manager or Try/Finally for Lock Safety
-    if not state_manager.acquire_lock():
+    lease = state_manager.acquire_lock()
+    if not lease:
         logger.warning("Scaling operation already in progress. Skipping execution.")
         return {"status": "skipped", "message": "Lock active"}
 
+    return _run_locked(state_manager, lease, _scheduled_decision)
+
+def _webhook_cycle(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scale-up fast path: evaluates the alert's own values instead of querying Prometheus.
+    If another invocation holds the lock, the trigger is queued for it rather than dropped.
+    """
+    # The raw event carries the bearer token, so only the parsed alerts are logged
+    registry.start_invocation()
     try:
-        metrics_client = PrometheusClient()
-        scaler = SmartScaler()
+        trigger = webhook.parse_event(event, WEBHOOK_TOKEN)
+    except WebhookError as e:
+        logger.warning(f"Webhook rejected: {e}")
+        return {"status": e.status, "message": str(e)}
 
-        # Fetching Metrics
-        cpu_usage = metrics_client.get_avg_cpu()
-        pending_pods = metrics_client.get_pending_pods()
+    logger.info(
+        "Alertmanager webhook received.",
+        extra={"pending_requests": len(trigger.pending_requests), "cpu": trigger.cpu_utilization}
+    )
+    if not trigger:
+        return {"status": "ignored", "message": "No firing scaler alerts"}
 
-        logger.info(
-            "Cluster Metrics Fetched",
-            extra={"cpu": cpu_usage, "pending_pods": pending_pods}
-        )
+    state_manager = _state_manager()
+    if not state_manager:
+        return {"status": "error", "message": "Configuration error"}
 
-        # Scaling Logic
-        current_capacity = scaler.get_current_capacity()
-        recommended_capacity = scaler.make_decision(cpu_usage, pending_pods)
+    # The holder may release between our two calls, so retry a few times before giving up
+    for _ in range(3):
+        lease = state_manager.acquire_lock()
+        if lease:
+            return _run_locked(state_manager, lease, lambda held: _fast_path_decision(held, trigger))
+        if state_manager.queue_trigger(trigger.to_json()):
+            return {"status": "merged", "message": "Queued for the running scaling cycle"}
 
-        if recommended_capacity != current_capacity:
-            logger.info(
-                "Capacity mismatch detected. Scaling...",
-                extra={"from": current_capacity, "to": recommended_capacity}
-            )
-            scaler.apply_scaling(recommended_capacity)
-        else:
-            logger.info("Cluster capacity is optimal. No action taken.")
+    logger.warning("Lock changed hands repeatedly; dropping the fast-path trigger.")
+    return {"status": "skipped", "message": "Lock contended"}
 
-        return {"status": "success", "recommended_capacity": recommended_capacity}
+def _state_manager() -> Optional[StateManager]:
+    with span("resources"):
+        state_manager = registry.state_manager()
+    if not state_manager:
+        logger.error("Environment variable DYNAMO_TABLE is not set.")
+    return state_manager
+
+def _run_locked(state_manager: StateManager, lease: Lease, cycle: Callable[[Lease], CycleResult]) -> Dict[str, Any]:
+    """
+    Runs one decision under the lease and releases it with the state the decision produced.
+    Triggers queued by fast-path requests while the lease was held are served right after.
+    """
+    state = None
+    try:
+        result, state = cycle(lease)
+
+    except LeaseLostError as e:
+        logger.warning(f"Scaling abandoned, a newer invocation holds the lock: {e}")
+        result = {"status": "skipped", "message": "Lease lost"}
 
     except Exception as e:
         logger.error(f"Scaling aborted due to safety failure: {e}")
-        return {"status": "error", "message": "Scaling aborted for safety."}
+        # Connections or credentials may be the cause; rebuild them next time
+        registry.invalidate()
+        result = {"status": "error", "message": "Scaling aborted for safety."}
 
     finally:
-        state_manager.release_lock()
-        logger.debug("State lock released.")
\ No newline at end of file
+        queued = state_manager.release_lock(lease, state)
+        logger.debug("State lock released.")
+
+    if queued:
+        _serve_queued(state_manager, queued)
+    return result
+
+def _serve_queued(state_manager: StateManager, queued: List[str]):
+    trigger = AlertTrigger()
+    for payload in queued:
+        trigger = trigger.merge(AlertTrigger.from_json(payload))
+    logger.info(f"Serving {len(queued)} fast-path trigger(s) queued during the cycle.")
+
+    lease = state_manager.acquire_lock()
+    if lease:
+        _run_locked(state_manager, lease, lambda held: _fast_path_decision(held, trigger))
+    elif not state_manager.queue_trigger(trigger.to_json()):
+        logger.warning("Could not hand queued fast-path triggers to the new lock holder; dropping them.")
+
+def _scheduled_decision(lease: Lease) -> CycleResult:
+    with span("resources"):
+        state_manager = registry.state_manager()
+        metrics_client = registry.metrics_client()
+        scaler = registry.scaler()
+    registry.report()
+
+    # Fetching Metrics (one parallel batch per cycle); stored samples stand in for the CPU range query
+    now = time.time()
+    with span("metrics"):
+        signals = metrics_client.collect_signals(
+            history=lease.state.history(since=now - metrics_client.history_window), needed=scaler.queries,
+        )
+
+    # Scaling Logic
+    snapshot = scaler.describe_asg()
+    state = cycle.learn(scaler, metrics_client.cpu_requests_history, lease.state, now)
+    decision, state = cycle.decide(scaler, signals, snapshot, state, now)
+    state = cycle.apply(state_manager, scaler, lease, decision, snapshot.desired_capacity, state, now)
+
+    return {"status": "success", "recommended_capacity": decision.target_capacity}, state
+
+def _fast_path_decision(lease: Lease, trigger: AlertTrigger) -> CycleResult:
+    with span("resources"):
+        state_manager = registry.state_manager()
+        scaler = registry.scaler()
+    registry.report()
+
+    now = time.time()
+    snapshot = scaler.describe_asg()
+    decision = cycle.decide_on_alerts(scaler, trigger, snapshot, lease.state)
+    state = cycle.apply(state_manager, scaler, lease, decision, snapshot.desired_capacity, lease.state, now)
+
+    return {"status": "success", "recommended_capacity": decision.target_capacity}, state
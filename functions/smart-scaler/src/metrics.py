@@ -1,46 +1,504 @@
 import requests
 import os
+import time
 import logging
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
+import queries
+from cache import QueryCache
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+from queries import ScalerQuery
+from signals import ClusterSignals, HpaStatus, IngressLatency, InstantVector, NodeState, PodRequest, QueueBacklog, RangeSeries
+from telemetry import annotate, span
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
 class PrometheusClient:
-    def __init__(self):
+    # Raw PromQL of the registered queries; collect_signals() swaps in recorded series when they exist
+    AVG_CPU_QUERY = queries.AVG_CPU.promql
+    NODE_CPU_UTILIZATION_QUERY = queries.NODE_CPU_UTILIZATION.promql
+    PENDING_PODS_QUERY = queries.PENDING_PODS.promql
+    PENDING_POD_REQUESTS_QUERY = queries.PENDING_POD_REQUESTS.promql
+    NODE_POD_REQUESTS_QUERY = queries.NODE_POD_REQUESTS.promql
+    NODE_POD_COUNT_QUERY = queries.NODE_POD_COUNT.promql
+    NODE_ALLOCATABLE_QUERY = queries.NODE_ALLOCATABLE.promql
+    CONTROL_PLANE_NODES_QUERY = queries.CONTROL_PLANE_NODES.promql
+    NODE_INFO_QUERY = queries.NODE_INFO.promql
+    NODE_CPU_USAGE_QUERY = queries.NODE_CPU_USAGE.promql
+    POD_OWNERS_QUERY = queries.POD_OWNERS.promql
+    HPAS_QUERY = queries.HPAS.promql
+    HPA_GROWTH_QUERY = queries.HPA_GROWTH.promql
+    QUEUE_DEPTH_QUERY = queries.QUEUE_DEPTH.promql
+    QUEUE_THROUGHPUT_QUERY = queries.QUEUE_THROUGHPUT.promql
+    INGRESS_LATENCY_P95_QUERY = queries.INGRESS_LATENCY_P95.promql
+    INGRESS_LATENCY_P99_QUERY = queries.INGRESS_LATENCY_P99.promql
+    INGRESS_REQUEST_RATE_QUERY = queries.INGRESS_REQUEST_RATE.promql
+    CPU_REQUESTS_QUERY = queries.CPU_REQUESTS.promql
+    PDB_DISRUPTIONS_QUERY = queries.PDB_DISRUPTIONS.promql
+
+    def __init__(self, url: Optional[str] = None):
         # to ensure the URL doesn't have a trailing slash to avoid // in the API path
-        self.url = os.environ['PROMETHEUS_URL'].rstrip('/')
+        self.url = (url or os.environ['PROMETHEUS_URL']).rstrip('/')
+
+        # Upper bound for one batch of queries (one decision cycle), in seconds
+        self.cycle_deadline = float(os.environ.get('PROMETHEUS_CYCLE_DEADLINE', 10))
+        self.max_workers = int(os.environ.get('PROMETHEUS_MAX_WORKERS', 16))
+
+        # Series whose target stopped reporting vanish from results on their own (staleness markers);
+        # samples older than this (a lagging federated or remote source, clock skew) are dropped as stale too
+        self.max_sample_age = float(os.environ.get('PROMETHEUS_MAX_SAMPLE_AGE_SECONDS', 300))
+
+        # CPU history fetched each cycle for trend forecasting; a window of 0 disables it
+        self.history_window = float(os.environ.get('FORECAST_WINDOW_SECONDS', 900))
+        self.history_step = float(os.environ.get('FORECAST_STEP_SECONDS', 60))
+
+        # One keep-alive pool shared by every query, sized so parallel queries never wait for a socket
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='prometheus')
+
+        # Which recording rules Prometheus already serves, re-checked every few minutes
+        self.recording_refresh = float(os.environ.get('RECORDING_RULES_REFRESH_SECONDS', 600))
+        self._recorded: FrozenSet[str] = frozenset()
+        self._recorded_checked_at: Optional[float] = None
+
+        # Scalar results shared by triggers that land in the same time bucket; a TTL of 0 disables it
+        self.cache = QueryCache(
+            ttl=float(os.environ.get('QUERY_CACHE_TTL_SECONDS', 15)),
+            max_entries=int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', 128)),
+            spill_path=os.environ.get('QUERY_CACHE_SPILL_PATH') or None,
+        )
+
+    def _query(self, promql_query: str, timeout: float, endpoint: str = 'query', **params) -> List[Dict[str, Any]]:
+        """Runs a query against /api/v1/<endpoint> and returns the raw result list."""
+        response = self.session.get(
+            f"{self.url}/api/v1/{endpoint}", params={'query': promql_query, **params}, timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        status = data.get('status')
+        if status != 'success':
+            error_type = data.get('errorType', 'UnknownError')
+            error_msg = data.get('error', 'No error message provided')
+            raise ValueError(f"Prometheus API returned error ({error_type}): {error_msg}")
 
-    def query_metric(self, promql_query):
+        return data.get('data', {}).get('result', [])
+
+    def query_metric(self, promql_query, timeout=10, empty: Optional[float] = None) -> Optional[float]:
+        """
+        Runs an instant query for a single value, served from the query cache within its time bucket.
+        Returns `empty` when no fresh series matched: pass 0.0 for counts, and leave it None for
+        measurements, so missing data is never mistaken for an idle cluster.
+        """
+        value = self.cache.get_or_compute(promql_query, lambda: self._query_metric(promql_query, timeout))
+        return empty if value is None else value
+
+    def _query_metric(self, promql_query, timeout) -> Optional[float]:
+        vector = self.query_vector(promql_query, timeout)
+        if not len(vector):
+            logger.info(f"Query returned no data points: {promql_query}")
+            return None
+        if len(vector) > 1:
+            logger.warning(f"Expected one series but got {len(vector)}, using the first: {promql_query}")
+
+        # The value is usually a list like [timestamp, "value"]
+        return vector.values[0]
+
+    def query_vector(self, promql_query, timeout=10) -> InstantVector:
+        """
+        Runs an instant query and decodes every series into an InstantVector.
+        NaN and stale samples are dropped, so an empty vector means no usable data.
+        """
         try:
-            response = requests.get(f"{self.url}/api/v1/query", params={'query': promql_query}, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            status = data.get('status')
-            if status != 'success':
-                error_type = data.get('errorType', 'UnknownError')
-                error_msg = data.get('error', 'No error message provided')
-                raise ValueError(f"Prometheus API returned error ({error_type}): {error_msg}")
-
-            results = data.get('data', {}).get('result', [])
-            if not results:
-                logger.info(f"Query returned no data points: {promql_query}. Interpreting as 0.")
-                return 0.0
-
-            # The value is usually a list like [timestamp, "value"]
-            return float(results[0]['value'][1])
+            results = self._query(promql_query, timeout)
         except Exception as e:
             logger.error(f"Prometheus query failed: {e}")
             raise
 
+        oldest = time.time() - self.max_sample_age
+        labels, timestamps, values = [], array('d'), array('d')
+        stale = 0
+        for series in results:
+            timestamp, value = (float(field) for field in series['value'])
+            if value != value:
+                continue
+            if timestamp < oldest:
+                stale += 1
+                continue
+            labels.append(series.get('metric', {}))
+            timestamps.append(timestamp)
+            values.append(value)
+
+        if stale:
+            logger.warning(f"Dropped {stale} stale series (older than {self.max_sample_age:.0f}s): {promql_query}")
+        return InstantVector(labels=tuple(labels), timestamps=timestamps, values=values)
+
+    def query_range(self, promql_query, start: float, end: float, step: float, timeout=10) -> List[RangeSeries]:
+        """
+        Runs a range query and decodes every series into packed timestamp/value arrays.
+        NaN samples (e.g. from a division by zero) are dropped.
+        """
+        try:
+            results = self._query(promql_query, timeout, endpoint='query_range', start=start, end=end, step=step)
+
+            decoded = []
+            for series in results:
+                timestamps, values = array('d'), array('d')
+                for timestamp, value in series.get('values', []):
+                    value = float(value)
+                    if value == value:
+                        timestamps.append(float(timestamp))
+                        values.append(value)
+                decoded.append(RangeSeries(labels=series.get('metric', {}), timestamps=timestamps, values=values))
+            return decoded
+        except Exception as e:
+            logger.error(f"Prometheus range query failed: {e}")
+            raise
+
+    def query_many(self, queries: Dict[str, str], deadline: Optional[float] = None,
+                   vectors: Iterable[str] = (),
+                   ranges: Optional[Mapping[str, Tuple[float, float, float]]] = None,
+                   empty: Optional[Mapping[str, float]] = None) -> Dict[str, Any]:
+        """
+        Runs every query of a decision cycle in parallel over the shared session.
+        Takes a mapping of name -> PromQL and returns name -> value.
+        Names listed in `vectors` are returned as query_vector results instead of a single value;
+        names in `ranges` map to (start, end, step) and are returned as query_range results.
+        A single value with no data is None, or its entry in `empty`.
+        Raises TimeoutError if the whole batch does not finish within the deadline.
+        """
+        deadline = self.cycle_deadline if deadline is None else deadline
+        vectors = set(vectors)
+        ranges = ranges or {}
+        empty = empty or {}
+        started = time.monotonic()
+
+        def run(name, query):
+            with span(f"prometheus.{name}"):
+                if name in ranges:
+                    return self.query_range(query, *ranges[name], timeout=deadline)
+                if name in vectors:
+                    return self.query_vector(query, deadline)
+                return self.query_metric(query, deadline, empty.get(name))
+
+        futures = {self._executor.submit(run, name, query): name for name, query in queries.items()}
+        done, not_done = wait(futures, timeout=deadline)
+
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            missing = sorted(futures[future] for future in not_done)
+            raise TimeoutError(f"Prometheus queries exceeded the {deadline}s cycle deadline: {missing}")
+
+        # result() re-raises the first failed query, so a partial batch never reaches the scaler
+        results = {futures[future]: future.result() for future in done}
+        logger.debug(f"Fetched {len(results)} metrics in {time.monotonic() - started:.3f}s")
+        return results
+
+    def collect_signals(self, history: Optional[RangeSeries] = None,
+                        needed: Optional[Iterable[str]] = None) -> ClusterSignals:
+        """
+        Fetches everything the scaler needs for one decision cycle in a single parallel batch.
+        `needed` limits the batch to those registered queries (the scaler's policies declare theirs);
+        the rest decode as no data. CPU history the caller already has (the scaler's stored samples)
+        replaces the range query when it covers at least half the forecast window.
+        """
+        vectors = [
+            "node_utilization", "pending_requests", "node_requests", "node_pods", "allocatable",
+            "control_plane", "node_info", "node_cpu", "owners", "hpas", "hpa_growth",
+            "queue_depth", "queue_throughput", "ingress_p95", "ingress_p99", "ingress_rps", "pdbs",
+        ]
+        needed = set(queries.REGISTRY if needed is None else needed)
+        batch = {name: self.resolve(query) for name, query in queries.REGISTRY.items() if name in needed}
+        ranges = {}
+        stored_history = history is not None and self.history_window > 0 and \
+            len(history) >= self.history_window / self.history_step / 2
+        if self.history_window > 0 and not stored_history and "cpu" in batch:
+            now = time.time()
+            batch["cpu_history"] = batch["cpu"]
+            ranges["cpu_history"] = (now - self.history_window, now, self.history_step)
+
+        cache_before = self.cache.stats()
+        empty = {name: query.empty for name, query in queries.REGISTRY.items() if query.empty is not None}
+        metrics = self.query_many(batch, vectors=vectors, ranges=ranges, empty=empty)
+        self._report_cache(cache_before)
+
+        missing = tuple(sorted(
+            name for name, value in metrics.items()
+            if value is None or (name == "node_utilization" and not len(value))
+        ))
+        if missing:
+            logger.warning(f"No fresh data for: {', '.join(missing)}")
+        # Queries no policy reads were not run; they decode as an empty cluster rather than missing data
+        for name in set(queries.REGISTRY) - needed:
+            metrics[name] = InstantVector() if name in vectors else empty.get(name)
+
+        owners = self._decode_owners(metrics["owners"])
+        pending_requests = self._decode_pod_requests(metrics["pending_requests"], owners)
+        nodes = self._decode_nodes(
+            metrics["node_requests"], metrics["allocatable"], metrics["control_plane"],
+            metrics["node_info"], metrics["node_cpu"], owners, metrics["node_pods"],
+        )
+
+        return ClusterSignals(
+            cpu_utilization=metrics["cpu"],
+            pending_pods=int(metrics["pending_pods"]),
+            pending_requests=pending_requests,
+            nodes=nodes,
+            hpas=self._decode_hpas(
+                metrics["hpas"], metrics["hpa_growth"],
+                [pod for node in nodes for pod in node.pods] + list(pending_requests),
+            ),
+            queues=self._decode_queues(metrics["queue_depth"], metrics["queue_throughput"]),
+            ingresses=self._decode_ingresses(metrics["ingress_p95"], metrics["ingress_p99"], metrics["ingress_rps"]),
+            disruptions_allowed=self._decode_pdbs(metrics["pdbs"]),
+            cpu_history=self._history(history if stored_history else None, metrics),
+            node_utilization=metrics["node_utilization"],
+            missing=missing,
+        )
+
+    def cpu_requests_history(self, start: float, end: float, step: float) -> Optional[RangeSeries]:
+        """Requested CPU cores of the cluster over a range, for the seasonal model; None when nothing was recorded."""
+        series = self.query_range(self.resolve(queries.CPU_REQUESTS), start, end, step, timeout=self.cycle_deadline)
+        return series[0] if series else None
+
+    def resolve(self, query: ScalerQuery) -> str:
+        """The PromQL to run for a registered query: its recorded series if Prometheus has it, else the raw query."""
+        if query.record and query.record in self.recorded_series():
+            return query.record
+        return query.promql
+
+    def recorded_series(self) -> FrozenSet[str]:
+        """
+        Names of the scaler's recording rules that Prometheus has loaded and evaluates without errors.
+        Rules are checked rather than series because an empty aggregation (no pending pods) records nothing.
+        Checked with one request and cached; on failure the raw queries are used until the next check.
+        """
+        now = time.monotonic()
+        if self._recorded_checked_at is not None and now - self._recorded_checked_at < self.recording_refresh:
+            return self._recorded
+
+        records = sorted(query.record for query in queries.REGISTRY.values() if query.record)
+        self._recorded_checked_at = now
+        try:
+            with span("prometheus.recorded_series"):
+                response = self.session.get(f"{self.url}/api/v1/rules", params={'type': 'record'}, timeout=5)
+                response.raise_for_status()
+                groups = response.json().get('data', {}).get('groups', [])
+            self._recorded = frozenset(
+                rule['name'] for group in groups for rule in group.get('rules', [])
+                if rule.get('name') in records and rule.get('health', 'ok') == 'ok'
+            )
+        except Exception as e:
+            logger.warning(f"Could not check for recorded series, using raw queries: {e}")
+            self._recorded = frozenset()
+
+        missing = sorted(set(records) - self._recorded)
+        logger.info(f"Recorded series in use: {len(self._recorded)}/{len(records)}"
+                    + (f" (missing: {', '.join(missing)})" if missing else ""))
+        return self._recorded
+
+    @classmethod
+    def _history(cls, stored: Optional[RangeSeries], metrics: Dict[str, Any]) -> Optional[RangeSeries]:
+        """The stored samples plus this cycle's value when they are used, else the fetched range."""
+        if stored is None:
+            return (metrics.get("cpu_history") or [None])[0]
+        if metrics["cpu"] is None:
+            return stored
+        return cls._extend(stored, time.time(), metrics["cpu"])
+
+    @staticmethod
+    def _extend(history: RangeSeries, timestamp: float, value: float) -> RangeSeries:
+        """Stored samples end at the previous cycle; append the value just measured."""
+        timestamps, values = array('d', history.timestamps), array('d', history.values)
+        timestamps.append(timestamp)
+        values.append(value)
+        return RangeSeries(labels=history.labels, timestamps=timestamps, values=values)
+
+    @staticmethod
+    def _decode_pod_requests(series: Iterable[Tuple[Dict[str, str], float]],
+                             owners: Optional[Dict[Tuple[str, str], Tuple[str, bool]]] = None) -> Tuple[PodRequest, ...]:
+        """Folds the per-resource series into one PodRequest per pod."""
+        pods: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for labels, value in series:
+            key = (labels.get('namespace', ''), labels.get('pod', ''))
+            pods.setdefault(key, {})[labels.get('resource', '')] = value
+
+        requests = []
+        for (namespace, pod), resources in pods.items():
+            workload, movable = (owners or {}).get((namespace, pod), (pod, True))
+            requests.append(PodRequest(
+                namespace=namespace, pod=pod,
+                cpu=resources.get('cpu', 0.0), memory=resources.get('memory', 0.0),
+                workload=workload, movable=movable,
+            ))
+        return tuple(requests)
+
+    @staticmethod
+    def _decode_owners(series: InstantVector) -> Dict[Tuple[str, str], Tuple[str, bool]]:
+        """
+        Maps (namespace, pod) to (workload, movable).
+        ReplicaSet names carry a pod-template hash suffix that is stripped to get the Deployment name.
+        """
+        owners = {}
+        for labels, _ in series:
+            kind, name = labels.get('owner_kind'), labels.get('owner_name', '')
+            if kind == 'ReplicaSet':
+                name = name.rsplit('-', 1)[0]
+            owners[(labels.get('namespace', ''), labels.get('pod', ''))] = (name, kind != 'DaemonSet')
+        return owners
+
+    @staticmethod
+    def _decode_nodes(requests_series: InstantVector, allocatable_series: InstantVector,
+                      control_plane_series: InstantVector, info_series: InstantVector,
+                      cpu_series: InstantVector, owners,
+                      pod_count_series: InstantVector) -> Tuple[NodeState, ...]:
+        allocatable: Dict[str, Dict[str, float]] = {}
+        for labels, value in allocatable_series:
+            allocatable.setdefault(labels.get('node', ''), {})[labels.get('resource', '')] = value
+
+        control_plane = {labels.get('node', '') for labels, _ in control_plane_series}
+        internal_ips = {labels.get('node', ''): labels.get('internal_ip', '') for labels, _ in info_series}
+        cpu_usage = cpu_series.by('node')
+        pod_counts = pod_count_series.by('node')
+
+        pods_by_node: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+        for labels, value in requests_series:
+            pods_by_node.setdefault(labels.get('node', ''), []).append((labels, value))
+
+        return tuple(
+            NodeState(
+                name=node,
+                allocatable_cpu=resources.get('cpu', 0.0),
+                allocatable_memory=resources.get('memory', 0.0),
+                pods=PrometheusClient._decode_pod_requests(pods_by_node.get(node, []), owners),
+                control_plane=node in control_plane,
+                internal_ip=internal_ips.get(node, ''),
+                cpu_usage=cpu_usage.get(node, 0.0),
+                pod_count=int(pod_counts.get(node, 0)),
+                allocatable_pods=resources.get('pods', 0.0),
+            )
+            for node, resources in sorted(allocatable.items())
+        )
+
+    @staticmethod
+    def _decode_hpas(series: InstantVector, growth_series: InstantVector,
+                     pods: List[PodRequest]) -> Tuple[HpaStatus, ...]:
+        """
+        Folds the HPA series into one HpaStatus each. The per-pod requests are the average over
+        the target's current pods; an HPA whose pods are all gone cannot be sized and is left out.
+        """
+        fields: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for labels, value in series:
+            entry = fields.setdefault((labels.get('namespace', ''), labels.get('horizontalpodautoscaler', '')), {})
+            metric = labels.get('__name__', '')
+            if metric.endswith('_info'):
+                entry['workload'] = labels.get('scaletargetref_name', '')
+            elif metric.endswith('_condition'):
+                if labels.get('status') == 'true' and value == 1:
+                    entry['limited'] = True
+            elif metric.endswith('_replicas'):
+                # ..._status_current_replicas / ..._status_desired_replicas / ..._spec_max_replicas
+                entry[metric.rsplit('_', 2)[-2]] = int(value)
+
+        growth = {
+            (labels.get('namespace', ''), labels.get('horizontalpodautoscaler', '')): int(value)
+            for labels, value in growth_series
+        }
+
+        requests: Dict[Tuple[str, str], List[PodRequest]] = {}
+        for pod in pods:
+            requests.setdefault((pod.namespace, pod.workload), []).append(pod)
+
+        hpas = []
+        for (namespace, name), entry in sorted(fields.items()):
+            target_pods = requests.get((namespace, entry.get('workload', '')))
+            if not target_pods or 'current' not in entry:
+                logger.debug(f"HPA {namespace}/{name} skipped: no replica counts or running pods to size it by")
+                continue
+            hpas.append(HpaStatus(
+                namespace=namespace, name=name, workload=entry['workload'],
+                current_replicas=entry['current'],
+                desired_replicas=entry.get('desired', entry['current']),
+                max_replicas=entry.get('max', entry['current']),
+                pod_cpu=sum(pod.cpu for pod in target_pods) / len(target_pods),
+                pod_memory=sum(pod.memory for pod in target_pods) / len(target_pods),
+                recent_growth=growth.get((namespace, name), 0),
+                limited=entry.get('limited', False),
+            ))
+        return tuple(hpas)
+
+    @staticmethod
+    def _decode_queues(depth_series: InstantVector, throughput_series: InstantVector) -> Tuple[QueueBacklog, ...]:
+        """Pairs each queue's depth with its consumers' ack rate; a queue nobody has acked from yet has 0."""
+        throughput = {
+            (labels.get('vhost', ''), labels.get('queue', '')): value
+            for labels, value in throughput_series
+        }
+        return tuple(sorted(
+            (QueueBacklog(vhost=labels.get('vhost', ''), queue=labels.get('queue', ''), depth=value,
+                          throughput=throughput.get((labels.get('vhost', ''), labels.get('queue', '')), 0.0))
+             for labels, value in depth_series),
+            key=lambda backlog: (backlog.vhost, backlog.queue),
+        ))
+
+    @staticmethod
+    def _decode_ingresses(p95_series: InstantVector, p99_series: InstantVector,
+                          rate_series: InstantVector) -> Tuple[IngressLatency, ...]:
+        """
+        One IngressLatency per Ingress that served requests. A quantile is missing (NaN, dropped)
+        when no request landed in the window.
+        """
+        def key(labels: Dict[str, str]) -> Tuple[str, str]:
+            return labels.get('exported_namespace', labels.get('namespace', '')), labels.get('ingress', '')
+
+        p95 = {key(labels): value for labels, value in p95_series}
+        p99 = {key(labels): value for labels, value in p99_series}
+        return tuple(
+            IngressLatency(namespace=namespace, ingress=ingress, p95=p95.get((namespace, ingress)),
+                           p99=p99.get((namespace, ingress)), requests_per_second=value)
+            for (namespace, ingress), value in sorted((key(labels), value) for labels, value in rate_series)
+        )
+
+    @staticmethod
+    def _decode_pdbs(series: InstantVector) -> Dict[str, int]:
+        """
+        Keys each budget by "namespace/workload". PDBs here are named after the workload
+        they protect with a "-pdb" suffix (order-service-pdb -> order-service).
+        """
+        budgets = {}
+        for labels, value in series:
+            name = labels.get('poddisruptionbudget', '')
+            if name.endswith('-pdb'):
+                name = name[:-len('-pdb')]
+            budgets[f"{labels.get('namespace', '')}/{name}"] = int(value)
+        return budgets
+
+    def _report_cache(self, before: Dict[str, int]):
+        """Adds this cycle's query cache hits and misses to the cycle record and spills the cache."""
+        after = self.cache.stats()
+        annotate(query_cache_hits=after["hits"] - before["hits"], query_cache_misses=after["misses"] - before["misses"])
+        self.cache.flush()
+
+    def close(self):
+        """Releases the worker threads and pooled connections."""
+        self.cache.flush()
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
     def get_avg_cpu(self):
         """
         Query: Average CPU usage across all nodes.
         Filters out 'idle' time to get actual utilization.
         """
-        query = '100 - (avg(irate(node_cpu_seconds_total{mode="idle"}[10m])) * 100)'
-        return self.query_metric(query)
+        return self.query_metric(self.resolve(queries.AVG_CPU), empty=queries.AVG_CPU.empty)
 
     def get_pending_pods(self):
         """
@@ -48,7 +506,6 @@ class PrometheusClient:
         Only count pods where the Scheduler explicitly says 'Unschedulable'.
         This ignores pods pending due to ImagePullBackOff or OOMKills.
         """
-        query = 'sum(kube_pod_scheduler_status_condition{condition="Scheduled", status="False", reason="Unschedulable"})'
-        count = self.query_metric(query)
+        count = self.query_metric(self.resolve(queries.PENDING_PODS), empty=queries.PENDING_PODS.empty)
         logger.info(f"Detected {count} unschedulable (pending) pods.")
-        return int(count)
\ No newline at end of file
+        return int(count)
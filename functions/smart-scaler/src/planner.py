@@ -0,0 +1,108 @@
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+from signals import NodeState, PodRequest
+
+logger = logging.getLogger(__name__)
+
+GIB = 1024 ** 3
+
+# Schedulable capacity of one worker, in (CPU cores, memory bytes).
+# Instance size minus what the OS, k3s agent and the per-node DaemonSets hold on to.
+INSTANCE_ALLOCATABLE = {
+    't3.small': (1.8, 1.4 * GIB),
+    't3.medium': (1.8, 3.2 * GIB),
+    't3.large': (1.8, 7.0 * GIB),
+    't3.xlarge': (3.7, 14.8 * GIB),
+    't3.2xlarge': (7.6, 30.5 * GIB),
+}
+
+
+@dataclass(frozen=True)
+class NodeCapacity:
+    cpu: float
+    memory: float
+
+    @classmethod
+    def for_instance_type(cls, instance_type: str, cpu: Optional[float] = None,
+                          memory: Optional[float] = None) -> "NodeCapacity":
+        """Looks up the instance type; explicit cpu/memory values override the table."""
+        default_cpu, default_memory = INSTANCE_ALLOCATABLE.get(instance_type, INSTANCE_ALLOCATABLE['t3.medium'])
+        if instance_type not in INSTANCE_ALLOCATABLE and (cpu is None or memory is None):
+            logger.warning(f"No allocatable profile for {instance_type}; falling back to t3.medium.")
+        return cls(cpu=cpu if cpu is not None else default_cpu, memory=memory if memory is not None else default_memory)
+
+    def fits(self, pod: PodRequest) -> bool:
+        return pod.cpu <= self.cpu and pod.memory <= self.memory
+
+
+def unplaced(pods: Iterable[PodRequest], nodes: Sequence[NodeState]) -> Tuple[PodRequest, ...]:
+    """
+    The pods that will not fit the nodes' free capacity (first-fit-decreasing on CPU, memory
+    and pod slots). Nodes that do not report max-pods are treated as having slots to spare.
+    """
+    pods = sorted(pods, key=lambda p: (p.cpu, p.memory), reverse=True)
+    free_cpu = [node.allocatable_cpu - node.requested_cpu for node in nodes]
+    free_memory = [node.allocatable_memory - node.requested_memory for node in nodes]
+    free_slots = [node.allocatable_pods - node.pod_count if node.allocatable_pods else len(pods) for node in nodes]
+
+    leftover: List[PodRequest] = []
+    for pod in pods:
+        for index in range(len(nodes)):
+            if pod.cpu <= free_cpu[index] and pod.memory <= free_memory[index] and free_slots[index] >= 1:
+                free_cpu[index] -= pod.cpu
+                free_memory[index] -= pod.memory
+                free_slots[index] -= 1
+                break
+        else:
+            leftover.append(pod)
+    return tuple(leftover)
+
+
+@dataclass(frozen=True)
+class CapacityPlan:
+    nodes_needed: int
+    placed_pods: int
+    unplaceable_pods: Tuple[PodRequest, ...]
+
+
+class CapacityPlanner:
+    """
+    Sizes a scale-up from the requests of the unschedulable pods.
+    Packs them onto empty nodes of the worker instance type with first-fit-decreasing.
+    """
+
+    def __init__(self, node_capacity: NodeCapacity):
+        self.node_capacity = node_capacity
+
+    def _weight(self, pod: PodRequest) -> float:
+        # Order by the dimension the pod stresses most, relative to one node
+        return max(pod.cpu / self.node_capacity.cpu, pod.memory / self.node_capacity.memory)
+
+    def plan(self, pods: Iterable[PodRequest]) -> CapacityPlan:
+        free: List[List[float]] = []  # remaining [cpu, memory] per new node
+        placed = 0
+        unplaceable = []
+
+        for pod in sorted(pods, key=self._weight, reverse=True):
+            if not self.node_capacity.fits(pod):
+                # Bigger than an empty node; adding nodes will never schedule it
+                unplaceable.append(pod)
+                continue
+
+            for node in free:
+                if pod.cpu <= node[0] and pod.memory <= node[1]:
+                    node[0] -= pod.cpu
+                    node[1] -= pod.memory
+                    break
+            else:
+                free.append([self.node_capacity.cpu - pod.cpu, self.node_capacity.memory - pod.memory])
+            placed += 1
+
+        if unplaceable:
+            logger.warning(
+                f"{len(unplaceable)} pending pods request more than one node can hold: "
+                f"{', '.join(f'{p.namespace}/{p.pod}' for p in unplaceable)}"
+            )
+
+        return CapacityPlan(nodes_needed=len(free), placed_pods=placed, unplaceable_pods=tuple(unplaceable))
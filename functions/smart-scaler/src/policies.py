@@ -0,0 +1,421 @@
+import logging
+import math
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import FrozenSet, Optional, Sequence, Tuple
+from backlog import BacklogPolicy
+from config import ScalerConfig
+from controller import ThresholdController, build_controller
+from forecast import TrendForecaster
+from headroom import ClusterHeadroom
+from hpa import HpaProjector
+from latency import LatencyPolicy
+from planner import CapacityPlanner, NodeCapacity, unplaced
+from seasonal import SeasonalForecaster, SeasonalModel
+from signals import ClusterSignals, PodRequest
+from state import SCALE_UP, ScalerState
+
+logger = logging.getLogger(__name__)
+
+# The queries NodeState is decoded from: requests, pod counts, allocatable, roles, IPs, CPU and owners
+NODE_QUERIES = frozenset({
+    'node_requests', 'node_pods', 'allocatable', 'control_plane', 'node_info', 'node_cpu', 'owners',
+})
+# What the scaler reads to pick a worker to drain on a scale-down
+DRAIN_QUERIES = NODE_QUERIES | {'pdbs'}
+
+
+@dataclass(frozen=True)
+class Vote:
+    """
+    One policy's verdict for this cycle.
+    `nodes` is the change it asks for: above 0 to grow, 0 to hold, below 0 to shrink, None when it
+    has no opinion. `pending` pods need new nodes as they are; `upcoming` pods need them only where
+    the nodes' free capacity cannot take them.
+    """
+    policy: str
+    nodes: Optional[int] = None
+    reason: str = ''
+    pending: Tuple[PodRequest, ...] = ()
+    upcoming: Tuple[PodRequest, ...] = ()
+
+
+@dataclass(frozen=True)
+class PolicyContext:
+    """What the policies know of the cluster besides its signals."""
+    current: int
+    launching: int = 0
+    now: float = 0.0
+    state: Optional[ScalerState] = None
+    # How long a node added now takes to become Ready, when the scaler knows better than the configured horizon
+    ready_seconds: Optional[float] = None
+    # Pods the policies evaluated so far expect, so later ones do not provision for them twice
+    upcoming: Tuple[PodRequest, ...] = ()
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """
+    The policies' votes merged: the largest scale-up any of them asks for (including the nodes the
+    pending and overflowing pods need), and a scale-down only when every policy with an opinion asks
+    for one. The scaler then removes one drained node, however many the policies would shed.
+    """
+    votes: Tuple[Vote, ...]
+    overflow: Tuple[PodRequest, ...] = ()
+    # Nodes to add before those already launching are subtracted
+    grow: int = 0
+
+    @property
+    def growing(self) -> Tuple[Vote, ...]:
+        return tuple(
+            vote for vote in self.votes
+            if (vote.nodes or 0) > 0 or vote.pending or any(pod in self.overflow for pod in vote.upcoming)
+        )
+
+    @property
+    def holds(self) -> Tuple[Vote, ...]:
+        return tuple(vote for vote in self.votes if vote.nodes == 0)
+
+    @property
+    def shrinking(self) -> Tuple[Vote, ...]:
+        return tuple(vote for vote in self.votes if vote.nodes is not None and vote.nodes < 0)
+
+
+class CpuPolicy:
+    """
+    Cluster CPU through the capacity controller, now and as forecast for when a new node would be
+    Ready (`horizon` seconds ahead, or sooner when the context says a node comes up faster). Holds a
+    scale-down while any node runs hot despite a low average, and until low CPU has persisted for
+    `stable_samples` stored samples.
+    """
+    name = 'cpu'
+    queries = frozenset({'cpu', 'node_utilization'})
+
+    def __init__(self, controller, forecaster: Optional[TrendForecaster] = None, horizon: float = 240.0,
+                 stable_samples: int = 3):
+        self.controller = controller
+        self.forecaster = forecaster
+        self.horizon = horizon
+        self.stable_samples = stable_samples
+
+    @property
+    def shrinks(self) -> bool:
+        return self.controller.scale_down > 0
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        cpu = signals.cpu_utilization
+        if cpu is None:
+            # Without a CPU measurement the cluster is not known to be idle
+            logger.warning(f"Scale-down disabled this cycle: no CPU data (missing: {', '.join(signals.missing) or 'cpu'}).")
+            return Vote(self.name, 0, "no CPU data")
+
+        predicted = self.predict(signals, context.ready_seconds)
+        nodes = self.controller.desired_nodes(context.current, cpu, predicted, signals.cpu_history) - context.current
+        reason = f"CPU={cpu:.1f}% (forecast {'n/a' if predicted is None else f'{predicted:.1f}%'})"
+        if nodes >= 0:
+            return Vote(self.name, nodes, reason)
+
+        spread = signals.cpu_spread
+        if spread is not None and spread.max > self.controller.scale_up:
+            return Vote(self.name, 0, f"{spread.hottest} is at {spread.max:.0f}% CPU "
+                                      f"(p50 {spread.p50:.0f}%, p90 {spread.p90:.0f}%, skew {spread.skew:.1f}x)")
+
+        if context.state is not None:
+            recent = context.state.recent_values(self.stable_samples)
+            if len(recent) < self.stable_samples or any(value >= self.controller.scale_down for value in recent):
+                return Vote(self.name, 0, f"CPU has not stayed below {self.controller.scale_down}% "
+                                          f"for {self.stable_samples} cycles")
+        return Vote(self.name, nodes, reason)
+
+    def predict(self, signals: ClusterSignals, horizon: Optional[float] = None) -> Optional[float]:
+        """Cluster CPU expected by the time a node launched now would be Ready, if history is available."""
+        history = signals.cpu_history
+        if self.forecaster is None or history is None:
+            return None
+        horizon = self.horizon if horizon is None else horizon
+        return self.forecaster.forecast(history.timestamps, history.values, horizon)
+
+
+class PendingPodsPolicy:
+    """Unschedulable pods, planned onto new nodes by their requests; one node when none were decoded."""
+    name = 'pending_pods'
+    queries = frozenset({'pending_pods', 'pending_requests', 'owners'})
+    shrinks = False
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        if signals.pending_pods <= 0:
+            return Vote(self.name)
+        requests = tuple(signals.pending_requests)
+        return Vote(self.name, None if requests else 1, f"Pending={signals.pending_pods}", pending=requests)
+
+
+class RequestHeadroomPolicy:
+    """
+    Requests against allocatable on the tightest of CPU, memory and pod slots: adds the nodes that
+    bring every dimension back under `percent`, and holds a scale-down that would push one above it.
+    """
+    name = 'request_headroom'
+    queries = NODE_QUERIES
+    shrinks = False
+
+    def __init__(self, percent: float = 85.0):
+        self.percent = percent
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        headroom = ClusterHeadroom.from_nodes(signals.nodes)
+        tightest = headroom.tightest
+        if tightest is not None and tightest.utilization > self.percent:
+            needed = headroom.nodes_to_reach(self.percent)
+            logger.info(
+                f"Request headroom: {tightest.dimension} is the tightest at {tightest.utilization:.0f}% "
+                f"of allocatable; {needed} nodes bring every dimension under {self.percent:.0f}%."
+            )
+            return Vote(self.name, needed, f"Requests={headroom.describe()}")
+
+        after = headroom.without_node().tightest
+        if after is not None and after.utilization > self.percent:
+            return Vote(self.name, 0, f"one node fewer would put {after.dimension} requests "
+                                      f"at {after.utilization:.0f}% of allocatable")
+        return Vote(self.name)
+
+
+class HpaPolicy:
+    """The replicas the HPAs are projected to add; holds a scale-down while any HPA is scaling up."""
+    name = 'hpa'
+    queries = NODE_QUERIES | {'hpas', 'hpa_growth', 'pending_requests'}
+    shrinks = False
+
+    def __init__(self, projector: HpaProjector):
+        self.projector = projector
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        scaling = [hpa for hpa in signals.hpas if hpa.scaling_up]
+        upcoming = self.projector.upcoming_pods(signals.hpas)
+        if not scaling and not upcoming:
+            return Vote(self.name)
+        reason = ", ".join(
+            f"HPA {hpa.namespace}/{hpa.name} is scaling up ({hpa.current_replicas}->{hpa.desired_replicas}, "
+            f"projected {self.projector.projected_replicas(hpa)})"
+            for hpa in scaling
+        )
+        return Vote(self.name, 0 if scaling else None, reason or f"{len(upcoming)} HPA replicas", upcoming=upcoming)
+
+
+class QueueDepthPolicy:
+    """
+    The consumers RabbitMQ backlogs call for to drain within the SLO, counting the replicas earlier
+    policies already expect; holds a scale-down while a queue is behind.
+    """
+    name = 'queue_depth'
+    queries = NODE_QUERIES | {'queue_depth', 'queue_throughput', 'hpas', 'hpa_growth', 'pending_requests'}
+    shrinks = False
+
+    def __init__(self, backlog: BacklogPolicy):
+        self.backlog = backlog
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        breaches = self.backlog.breaches(signals.queues)
+        if not breaches:
+            return Vote(self.name)
+        consumers = self.backlog.consumer_pods(
+            breaches, [pod for node in signals.nodes for pod in node.pods] + list(signals.pending_requests),
+            signals.hpas, context.upcoming,
+        )
+        reason = "queue " + ", ".join(
+            f"{breach.backlog.vhost}/{breach.backlog.queue} will not drain within "
+            f"{self.backlog.drain_slo_seconds:.0f}s" for breach in breaches
+        )
+        return Vote(self.name, 0, reason, upcoming=consumers)
+
+
+class IngressLatencyPolicy:
+    """
+    Ingress latency over its SLO. Nodes do not fix every slow backend, so latency alone adds one node
+    at a time and waits out `cooldown` after a scale-up to see if it helped.
+    """
+    name = 'latency'
+    queries = frozenset({'ingress_p95', 'ingress_p99', 'ingress_rps'})
+    shrinks = False
+
+    def __init__(self, latency: LatencyPolicy, cooldown: float = 300.0):
+        self.latency = latency
+        self.cooldown = cooldown
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        breaches = self.latency.breaches(signals.ingresses)
+        if not breaches:
+            return Vote(self.name)
+        reason = "latency " + ", ".join(breach.describe() for breach in breaches)
+        logger.info(f"Latency over SLO: {'; '.join(breach.describe() for breach in breaches)}.")
+
+        state = context.state
+        since_action = state.seconds_since_action() if state is not None else None
+        if state is not None and state.last_action == SCALE_UP and since_action is not None \
+                and since_action < self.cooldown:
+            logger.info(f"Latency scale-up deferred: last scale-up was {since_action:.0f}s ago.")
+            return Vote(self.name, 0, reason)
+        return Vote(self.name, 1, reason)
+
+
+class SchedulePolicy:
+    """
+    Capacity floors for known busy periods: (weekdays, start minute, end minute, nodes) windows in UTC,
+    Monday being 0. Inside a window it grows the cluster to the floor and holds scale-downs below it.
+    """
+    name = 'schedule'
+    queries: FrozenSet[str] = frozenset()
+    shrinks = False
+
+    def __init__(self, windows: Sequence[Tuple[Tuple[int, ...], int, int, int]] = ()):
+        self.windows = tuple(windows)
+
+    def floor(self, now: float) -> Optional[int]:
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        minute = moment.hour * 60 + moment.minute
+        return max((nodes for days, start, end, nodes in self.windows
+                    if moment.weekday() in days and start <= minute < end), default=None)
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        floor = self.floor(context.now)
+        if floor is None:
+            return Vote(self.name)
+        return _floor_vote(self.name, floor, context, f"schedule floor {floor} nodes")
+
+
+class SeasonalPolicy:
+    """
+    Pre-warms capacity for the peaks the seasonal model predicts: the nodes the requested CPU expected
+    within `lead` seconds needs at the request threshold become a floor, so the cluster has grown by
+    the time the morning arrives instead of climbing a node per cycle behind it. The model is learned
+    outside the decision (cycle.learn) and read from the stored state.
+    """
+    name = 'seasonal'
+    queries: FrozenSet[str] = frozenset()
+    shrinks = False
+
+    def __init__(self, forecaster: SeasonalForecaster, node_cpu: float, percent: float = 85.0, lead: float = 900.0):
+        self.forecaster = forecaster
+        self.node_cpu = node_cpu
+        self.percent = percent
+        self.lead = lead
+
+    def floor(self, model: Optional[SeasonalModel], now: float) -> Optional[int]:
+        peak = model.predict(now, now + self.lead) if model is not None else None
+        if peak is None or peak <= 0:
+            return None
+        return math.ceil(peak / (self.node_cpu * self.percent / 100))
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Vote:
+        model = context.state.seasonal if context.state is not None else None
+        floor = self.floor(model, context.now)
+        if floor is None:
+            return Vote(self.name)
+        return _floor_vote(self.name, floor, context, f"seasonal forecast needs {floor} nodes "
+                                                      f"within {self.lead / 60:.0f} minutes")
+
+
+def _floor_vote(name: str, floor: int, context: PolicyContext, reason: str) -> Vote:
+    """Grows the cluster to `floor` nodes, and holds a scale-down that would drop below it."""
+    if context.current < floor:
+        # A floor is absolute: nodes already launching count towards it once, through `current`
+        return Vote(name, floor - context.current + context.launching, reason)
+    if context.current - 1 < floor:
+        return Vote(name, 0, reason)
+    return Vote(name)
+
+
+class PolicyEngine:
+    """
+    Evaluates every policy on one set of signals and merges their votes. The policies declare the
+    queries they read, so the metrics client fetches only their union once per cycle.
+    """
+
+    def __init__(self, policies: Sequence, planner: CapacityPlanner):
+        self.policies = tuple(policies)
+        self.planner = planner
+
+    @property
+    def queries(self) -> FrozenSet[str]:
+        needed = frozenset().union(*(policy.queries for policy in self.policies))
+        # A scale-down picks the worker to drain from the nodes and their disruption budgets
+        return needed | DRAIN_QUERIES if self.shrinks else needed
+
+    @property
+    def shrinks(self) -> bool:
+        return any(policy.shrinks for policy in self.policies)
+
+    def evaluate(self, signals: ClusterSignals, context: PolicyContext) -> Verdict:
+        votes = []
+        for policy in self.policies:
+            vote = policy.evaluate(signals, context)
+            if vote.upcoming:
+                context = replace(context, upcoming=context.upcoming + vote.upcoming)
+            votes.append(vote)
+
+        overflow = unplaced(context.upcoming, signals.nodes) if context.upcoming else ()
+        if overflow:
+            logger.info(
+                f"Projection: {len(overflow)} of {len(context.upcoming)} upcoming pods will not fit "
+                f"({'; '.join(vote.reason for vote in votes if vote.upcoming)})."
+            )
+
+        grow = max((vote.nodes for vote in votes if vote.nodes is not None), default=0)
+        pending = tuple(pod for vote in votes for pod in vote.pending)
+        if pending or overflow:
+            plan = self.planner.plan(pending + overflow)
+            logger.info(
+                f"Capacity plan: {plan.placed_pods} pending and projected pods need {plan.nodes_needed} new nodes "
+                f"({context.launching} already launching)."
+            )
+            grow = max(grow, plan.nodes_needed)
+        return Verdict(votes=tuple(votes), overflow=overflow, grow=max(grow, 0))
+
+
+POLICIES = ('cpu', 'pending_pods', 'request_headroom', 'hpa', 'queue_depth', 'latency', 'schedule', 'seasonal')
+# 'legacy' is the first autoscaler Lambda: one node more above 80% CPU, and it never scales down
+PRESETS = {'smart': POLICIES, 'legacy': ('legacy',)}
+
+
+def build_policies(config: ScalerConfig, node_capacity: NodeCapacity) -> Tuple:
+    """
+    The policies SCALING_POLICIES selects, in evaluation order (HPA replicas before backlog consumers).
+    `node_capacity` is the worker shape the planner sizes scale-ups with.
+    """
+    names = [name for entry in config.scaling_policies for name in PRESETS.get(entry, (entry,))]
+    builders = {
+        'cpu': lambda: CpuPolicy(
+            build_controller(config), TrendForecaster(method=config.forecast_method),
+            horizon=config.node_ready_seconds, stable_samples=config.scale_down_stable_samples,
+        ),
+        'legacy': lambda: CpuPolicy(ThresholdController(scale_up=80.0, scale_down=0.0)),
+        'pending_pods': PendingPodsPolicy,
+        'request_headroom': lambda: RequestHeadroomPolicy(config.scale_up_request_percent),
+        'hpa': lambda: HpaPolicy(HpaProjector(
+            pods_per_step=config.hpa_scale_up_pods,
+            step_seconds=config.hpa_scale_up_period_seconds,
+            lookahead_seconds=config.hpa_lookahead_seconds,
+        )),
+        'queue_depth': lambda: QueueDepthPolicy(BacklogPolicy(
+            drain_slo_seconds=config.queue_drain_slo_seconds,
+            consumers=config.queue_consumers,
+            min_backlog=config.queue_min_backlog,
+        )),
+        'latency': lambda: IngressLatencyPolicy(
+            LatencyPolicy(
+                p95_seconds=config.latency_slo_p95_seconds,
+                p99_seconds=config.latency_slo_p99_seconds,
+                min_rps=config.latency_min_rps,
+            ),
+            cooldown=config.latency_scale_up_cooldown_seconds,
+        ),
+        'schedule': lambda: SchedulePolicy(config.scale_schedule),
+        'seasonal': lambda: SeasonalPolicy(
+            SeasonalForecaster(method=config.seasonal_method, history_seconds=config.seasonal_history_seconds),
+            node_cpu=node_capacity.cpu,
+            percent=config.scale_up_request_percent, lead=config.seasonal_lead_seconds,
+        ),
+    }
+    unknown = [name for name in names if name not in builders]
+    if unknown:
+        raise ValueError(f"Unknown scaling policies {unknown}; expected presets {tuple(PRESETS)} or {POLICIES}")
+    return tuple(builders[name]() for name in dict.fromkeys(names))
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class ScalerQuery:
+    """
+    One PromQL query the scaler runs, every cycle unless noted.
+    Aggregations that scan many raw series name a recording rule; tools/recording_rules.py
+    generates the rules and PrometheusClient reads the recorded series once they exist.
+    """
+    name: str
+    promql: str
+    record: Optional[str] = None
+    # Value of a scalar query when no series matches. Counts are legitimately 0 then;
+    # a measurement such as CPU utilization is missing and reported as None.
+    empty: Optional[float] = None
+
+
+# Pods the scheduler explicitly reports as Unschedulable
+UNSCHEDULABLE_PODS = 'kube_pod_scheduler_status_condition{condition="Scheduled", status="False", reason="Unschedulable"}'
+
+AVG_CPU = ScalerQuery(
+    'cpu',
+    '100 - (avg(irate(node_cpu_seconds_total{mode="idle"}[10m])) * 100)',
+    record='cluster:node_cpu_utilization:percent_irate10m',
+)
+# The same measurement per node, for the hot-node skew and percentiles
+NODE_CPU_UTILIZATION = ScalerQuery(
+    'node_utilization',
+    '100 - (avg by (instance) (irate(node_cpu_seconds_total{mode="idle"}[10m])) * 100)',
+    record='instance:node_cpu_utilization:percent_irate10m',
+)
+PENDING_PODS = ScalerQuery(
+    'pending_pods',
+    f'sum({UNSCHEDULABLE_PODS})',
+    record='cluster:kube_pod_unschedulable:sum',
+    empty=0.0,
+)
+
+# CPU (cores) and memory (bytes) requested by each unschedulable pod, summed over its containers
+PENDING_POD_REQUESTS = ScalerQuery(
+    'pending_requests',
+    'sum by (namespace, pod, resource) ('
+    'kube_pod_container_resource_requests{resource=~"cpu|memory"} '
+    f'* on (namespace, pod) group_left () ({UNSCHEDULABLE_PODS} == 1))',
+    record='namespace_pod_resource:kube_pod_unschedulable_requests:sum',
+)
+
+# Requests of every running pod, per node, for the scale-down drain simulation
+NODE_POD_REQUESTS = ScalerQuery(
+    'node_requests',
+    'sum by (node, namespace, pod, resource) ('
+    'kube_pod_container_resource_requests{resource=~"cpu|memory", node!=""} '
+    '* on (namespace, pod) group_left () (kube_pod_status_phase{phase="Running"} == 1))',
+    record='node_namespace_pod_resource:kube_pod_running_requests:sum',
+)
+# Every pod bound to a node takes a pod slot, including pods that request nothing
+NODE_POD_COUNT = ScalerQuery(
+    'node_pods',
+    'count by (node) (kube_pod_info{node!=""} '
+    '* on (namespace, pod) group_left () (kube_pod_status_phase{phase=~"Pending|Running"} == 1))',
+    record='node:kube_pod_info:count',
+)
+NODE_CPU_USAGE = ScalerQuery(
+    'node_cpu',
+    'sum by (node) (rate(container_cpu_usage_seconds_total{container!=""}[5m]))',
+    record='node:container_cpu_usage_seconds:sum_rate5m',
+)
+
+# Plain selectors are already a single index lookup; precomputing them saves nothing
+NODE_ALLOCATABLE = ScalerQuery('allocatable', 'kube_node_status_allocatable{resource=~"cpu|memory|pods"}')
+CONTROL_PLANE_NODES = ScalerQuery('control_plane', 'kube_node_role{role=~"control-plane|master"}')
+NODE_INFO = ScalerQuery('node_info', 'kube_node_info')
+POD_OWNERS = ScalerQuery('owners', 'kube_pod_owner{owner_kind=~"ReplicaSet|StatefulSet|DaemonSet"}')
+# Replica counts, scale targets and ScalingLimited conditions of every HPA, in one selector
+# (told apart by __name__)
+HPAS = ScalerQuery(
+    'hpas',
+    '{__name__=~"kube_horizontalpodautoscaler_(info|status_current_replicas|status_desired_replicas'
+    '|spec_max_replicas|status_condition)", condition=~"|ScalingLimited"}',
+)
+# Replicas each HPA added over the last two minutes. Pods are created within seconds of a scale step,
+# so desired rarely exceeds current at scrape time; recent growth is what shows an HPA mid-climb.
+HPA_GROWTH = ScalerQuery(
+    'hpa_growth',
+    'kube_horizontalpodautoscaler_status_desired_replicas '
+    '- kube_horizontalpodautoscaler_status_desired_replicas offset 2m',
+)
+
+# RabbitMQ per-queue metrics, scraped from the broker's /metrics/detailed endpoint
+# (k8s-manifests/rabbitmq/cluster/servicemonitor.yaml). A queue is reported by the node
+# hosting its leader, so summing by queue covers the whole cluster.
+# Messages waiting in each queue, ready or delivered but not yet acknowledged
+QUEUE_DEPTH = ScalerQuery(
+    'queue_depth',
+    'sum by (vhost, queue) (rabbitmq_detailed_queue_messages)',
+    record='vhost_queue:rabbitmq_detailed_queue_messages:sum',
+)
+# Messages per second the consumers of each queue acknowledge
+QUEUE_THROUGHPUT = ScalerQuery(
+    'queue_throughput',
+    'sum by (vhost, queue) (rate(rabbitmq_detailed_queue_messages_acked_total[2m]))',
+    record='vhost_queue:rabbitmq_detailed_queue_messages_acked:rate2m',
+)
+
+# ingress-nginx request durations per Ingress, from the controller's ServiceMonitor
+# (k8s-manifests/helm/ingress-nginx). The scrape target's namespace takes the `namespace` label,
+# so the Ingress's own namespace arrives as `exported_namespace`.
+INGRESS_REQUEST_DURATION = (
+    'sum by (exported_namespace, ingress, le) '
+    '(rate(nginx_ingress_controller_request_duration_seconds_bucket{ingress!=""}[2m]))'
+)
+INGRESS_LATENCY_P95 = ScalerQuery(
+    'ingress_p95',
+    f'histogram_quantile(0.95, {INGRESS_REQUEST_DURATION})',
+    record='exported_namespace_ingress:nginx_ingress_controller_request_duration_seconds:p95_rate2m',
+)
+INGRESS_LATENCY_P99 = ScalerQuery(
+    'ingress_p99',
+    f'histogram_quantile(0.99, {INGRESS_REQUEST_DURATION})',
+    record='exported_namespace_ingress:nginx_ingress_controller_request_duration_seconds:p99_rate2m',
+)
+# Requests per second, so a quantile over a handful of requests is not taken at face value
+INGRESS_REQUEST_RATE = ScalerQuery(
+    'ingress_rps',
+    'sum by (exported_namespace, ingress) (rate(nginx_ingress_controller_requests{ingress!=""}[2m]))',
+    record='exported_namespace_ingress:nginx_ingress_controller_requests:rate2m',
+)
+
+# CPU cores requested by every running or pending pod: the demand the seasonal model learns,
+# read as a range query about once an hour rather than every cycle
+CPU_REQUESTS = ScalerQuery(
+    'cpu_requests',
+    'sum(kube_pod_container_resource_requests{resource="cpu"} '
+    '* on (namespace, pod) group_left () (kube_pod_status_phase{phase=~"Pending|Running"} == 1))',
+    record='cluster:kube_pod_cpu_requests:sum',
+)
+
+PDB_DISRUPTIONS = ScalerQuery('pdbs', 'kube_poddisruptionbudget_status_pod_disruptions_allowed')
+
+REGISTRY: Dict[str, ScalerQuery] = {
+    query.name: query for query in (
+        AVG_CPU, NODE_CPU_UTILIZATION, PENDING_PODS, PENDING_POD_REQUESTS, NODE_POD_REQUESTS, NODE_POD_COUNT, NODE_CPU_USAGE,
+        NODE_ALLOCATABLE, CONTROL_PLANE_NODES, NODE_INFO, POD_OWNERS, HPAS, HPA_GROWTH,
+        QUEUE_DEPTH, QUEUE_THROUGHPUT, INGRESS_LATENCY_P95, INGRESS_LATENCY_P99, INGRESS_REQUEST_RATE,
+        CPU_REQUESTS, PDB_DISRUPTIONS,
+    )
+}
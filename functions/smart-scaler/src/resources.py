@@ -0,0 +1,100 @@
+import time
+import logging
+import boto3
+import telemetry
+from typing import Optional
+from config import ScalerConfig
+from metrics import PrometheusClient
+from scaler import SmartScaler
+from state_manager import StateManager
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """
+    Holds the clients a scaling cycle needs for the lifetime of the Lambda container.
+    Everything is built lazily on first use and reused by warm invocations;
+    invalidate() drops the cached objects so the next invocation rebuilds them.
+    """
+
+    def __init__(self):
+        self._config: Optional[ScalerConfig] = None
+        self._asg_client = None
+        self._ec2_client = None
+        self._metrics_client: Optional[PrometheusClient] = None
+        self._scaler: Optional[SmartScaler] = None
+        self._state_manager: Optional[StateManager] = None
+
+        self.invocations = 0
+        self._init_seconds = 0.0
+
+    def start_invocation(self):
+        """Resets the per-invocation build timer."""
+        self.invocations += 1
+        self._init_seconds = 0.0
+
+    def report(self):
+        """Logs whether this invocation had to build anything, and how long it took."""
+        init_ms = self._init_seconds * 1000
+        cold_start = self.invocations == 1
+        telemetry.annotate(cold_start=cold_start, init_ms=round(init_ms, 1))
+        logger.info(
+            f"Resources ready ({'cold' if cold_start else 'warm'} start, init {init_ms:.1f} ms)",
+            extra={"cold_start": cold_start, "init_ms": round(init_ms, 1), "container_invocations": self.invocations}
+        )
+
+    def _build(self, factory):
+        started = time.perf_counter()
+        try:
+            return factory()
+        finally:
+            self._init_seconds += time.perf_counter() - started
+
+    def config(self) -> ScalerConfig:
+        if self._config is None:
+            self._config = self._build(ScalerConfig.from_env)
+        return self._config
+
+    def asg_client(self):
+        if self._asg_client is None:
+            self._asg_client = self._build(lambda: boto3.client('autoscaling'))
+        return self._asg_client
+
+    def ec2_client(self):
+        if self._ec2_client is None:
+            self._ec2_client = self._build(lambda: boto3.client('ec2'))
+        return self._ec2_client
+
+    def metrics_client(self) -> PrometheusClient:
+        if self._metrics_client is None:
+            self._metrics_client = self._build(lambda: PrometheusClient(url=self.config().prometheus_url))
+        return self._metrics_client
+
+    def scaler(self) -> SmartScaler:
+        if self._scaler is None:
+            self._scaler = self._build(lambda: SmartScaler(
+                config=self.config(), asg_client=self.asg_client(), ec2_client=self.ec2_client()
+            ))
+        return self._scaler
+
+    def state_manager(self) -> Optional[StateManager]:
+        """Returns None when DYNAMO_TABLE is not configured."""
+        table_name = self.config().dynamo_table
+        if not table_name:
+            return None
+        if self._state_manager is None:
+            self._state_manager = self._build(lambda: StateManager(table_name))
+        return self._state_manager
+
+    def invalidate(self):
+        """Drops every cached client after a failure so the next invocation starts clean."""
+        if self._metrics_client:
+            self._metrics_client.close()
+
+        self._asg_client = None
+        self._ec2_client = None
+        self._metrics_client = None
+        self._scaler = None
+        self._state_manager = None
+        logger.info("Cached clients invalidated; they will be rebuilt on the next invocation.")
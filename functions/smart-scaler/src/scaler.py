@@ -1,75 +1,236 @@
 import boto3
-import os
 import logging
+import time
 from botocore.exceptions import ClientError
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Sequence
+from config import ScalerConfig
+from drain import DrainSimulator
+from planner import CapacityPlanner, NodeCapacity
+from policies import PolicyContext, PolicyEngine, SeasonalPolicy, Vote, build_policies
+from signals import ClusterSignals
+from snapshot import AsgSnapshot
+from state import ScalerState
+from telemetry import span
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class ScalingDecision:
+    target_capacity: int
+    # On scale-down, the worker to remove explicitly instead of leaving the choice to the ASG
+    terminate_instance_id: Optional[str] = None
+    node: Optional[str] = None
+
+
 class SmartScaler:
-    def __init__(self):
-        self.asg_client = boto3.client('autoscaling')
-        self.asg_name = os.environ['ASG_NAME']
+    def __init__(self, config: Optional[ScalerConfig] = None, asg_client=None, ec2_client=None):
+        config = config or ScalerConfig.from_env()
+        if not config.asg_name:
+            raise ValueError("Environment variable ASG_NAME is not set.")
 
-        self.min_nodes = int(os.environ.get('MIN_NODES', 2))
-        self.max_nodes = int(os.environ.get('MAX_NODES', 5))
+        self.asg_client = asg_client or boto3.client('autoscaling')
+        self.ec2_client = ec2_client or boto3.client('ec2')
+        self.asg_name = config.asg_name
 
-        # Thresholds
-        self.scale_up_cpu = 70.0
-        self.scale_down_cpu = 30.0
+        self.min_nodes = config.min_nodes
+        self.max_nodes = config.max_nodes
 
-    def get_current_capacity(self):
-        """Fetches the current Desired Capacity from AWS ASG."""
+        self.planner = CapacityPlanner(NodeCapacity.for_instance_type(
+            config.worker_instance_type,
+            cpu=config.node_allocatable_cpu,
+            memory=config.node_allocatable_memory,
+        ))
+
+        # Every signal that may move capacity is a policy; the engine merges their votes each cycle
+        self.engine = PolicyEngine(build_policies(config, self.planner.node_capacity), self.planner)
+        # Learns the demand model the seasonal policy reads, when it is enabled
+        self.seasonal = next(
+            (policy.forecaster for policy in self.engine.policies if isinstance(policy, SeasonalPolicy)), None
+        )
+
+        self.scale_down_cooldown = config.scale_down_cooldown_seconds
+        self.node_ready_seconds = config.node_ready_seconds
+        self.warm_node_ready_seconds = config.warm_node_ready_seconds
+
+    def describe_asg(self) -> AsgSnapshot:
+        """Fetches the ASG once and returns an immutable snapshot for this cycle."""
         try:
-            response = self.asg_client.describe_auto_scaling_groups(
-                AutoScalingGroupNames=[self.asg_name]
-            )
+            with span("asg.describe"):
+                response = self.asg_client.describe_auto_scaling_groups(
+                    AutoScalingGroupNames=[self.asg_name]
+                )
 
             if not response['AutoScalingGroups']:
                 raise ValueError(f"ASG with name {self.asg_name} not found.")
 
-            return response['AutoScalingGroups'][0]['DesiredCapacity']
+            return AsgSnapshot.from_response(response['AutoScalingGroups'][0])
 
         except ClientError as e:
             logger.error(f"Failed to describe ASG: {e}")
             raise
 
-    def make_decision(self, cpu_utilization: float, pending_pods_count: int) -> int:
+    def get_current_capacity(self):
+        """Fetches the current Desired Capacity from AWS ASG."""
+        return self.describe_asg().desired_capacity
+
+    @property
+    def queries(self) -> FrozenSet[str]:
+        """Names of the registered queries the configured policies read."""
+        return self.engine.queries
+
+    def make_decision(self, signals: ClusterSignals, snapshot: Optional[AsgSnapshot] = None,
+                      state: Optional[ScalerState] = None, now: Optional[float] = None) -> ScalingDecision:
         """
         Business logic for scaling decisions.
         Prioritizes Scale-Up for availability, Conservative Scale-Down for stability.
+        Pass the cycle's snapshot to avoid describing the ASG again, and the stored state
+        (with this cycle's sample observed) to apply the scale-down cooldown and hysteresis.
         """
-        current = self.get_current_capacity()
-        logger.debug(f"Current Desired Capacity: {current}")
-
-        # Scale Up (High CPU or Pending Pods)
-        if cpu_utilization > self.scale_up_cpu or pending_pods_count > 0:
-            if current < self.max_nodes:
-                target = current + 1
-                logger.info(
-                    f"Decision: SCALE_UP to {target}. Reason: CPU={cpu_utilization}%, Pending={pending_pods_count}")
-                return current + 1
+        snapshot = snapshot or self.describe_asg()
+        current = snapshot.desired_capacity
+        launching = snapshot.launching_count
+        logger.debug(
+            f"Current Desired Capacity: {current} "
+            f"(in service={len(snapshot.in_service)}, pending={len(snapshot.pending)}, "
+            f"terminating={len(snapshot.terminating)}, warm pool={snapshot.warm_pool_size})"
+        )
+        verdict = self.engine.evaluate(signals, PolicyContext(
+            current=current, launching=launching, now=time.time() if now is None else now, state=state,
+            ready_seconds=self._ready_seconds(snapshot),
+        ))
+
+        # Scale Up: any policy asks for nodes, by the most any of them asks for
+        if verdict.growing:
+            step = max(verdict.grow - launching, 0)
+            if step == 0:
+                # The nodes already launching will absorb this load; adding more now over-scales
+                logger.info("Scale-up needed but the nodes already launching cover it. Waiting for them to join.")
+            elif current < self.max_nodes:
+                target = min(current + step, self.max_nodes)
+                logger.info(f"Decision: SCALE_UP to {target}. Reason: {self._reasons(verdict.growing)}")
+                if snapshot.warm_pool_size:
+                    warm = min(target - current, snapshot.warm_pool_size)
+                    logger.info(f"{warm} of {target - current} new nodes start from the warm pool.")
+                return ScalingDecision(target_capacity=target)
             else:
                 logger.warning("Max node limit reached. Cannot scale up further.")
 
-        # Scale Down (Low CPU or no Pending Pods)
-        elif cpu_utilization < self.scale_down_cpu and pending_pods_count == 0:
-            if current > self.min_nodes:
-                target = current - 1
-                logger.info(f"Decision: SCALE_DOWN to {target}. Reason: CPU={cpu_utilization}%")
-                return target
+        # Scale Down: only when no policy holds; one drained node at a time, however many they would shed
+        elif verdict.shrinking:
+            if snapshot.launch_in_progress or snapshot.termination_in_progress:
+                logger.info("Scale-down deferred while instances are launching or terminating.")
+            elif current > self.min_nodes:
+                hold = self._reasons(verdict.holds) or self._cooldown_hold_reason(state)
+                if hold:
+                    logger.info(f"Scale-down deferred: {hold}.")
+                else:
+                    return self._scale_down_decision(signals, snapshot)
+
+        return ScalingDecision(target_capacity=current)  # No change
+
+    def _ready_seconds(self, snapshot: AsgSnapshot) -> float:
+        """
+        How long the next node added takes to become Ready: a warm-pool instance is already
+        initialized and only has to start and join, a cold one runs the whole bootstrap first.
+        """
+        return self.warm_node_ready_seconds if snapshot.warm_pool_size > 0 else self.node_ready_seconds
+
+    def _cooldown_hold_reason(self, state: Optional[ScalerState]) -> Optional[str]:
+        """Holds a scale-down during the cooldown after any scaling action."""
+        since_action = state.seconds_since_action() if state is not None else None
+        if since_action is not None and since_action < self.scale_down_cooldown:
+            return f"last scale-{state.last_action} was {since_action:.0f}s ago"
+        return None
+
+    @staticmethod
+    def _reasons(votes: Sequence[Vote]) -> str:
+        return "; ".join(vote.reason for vote in votes if vote.reason)
 
-        return current  # No change
+    def _scale_down_decision(self, signals: ClusterSignals, snapshot: AsgSnapshot) -> ScalingDecision:
+        """
+        Only shrinks when a worker's pods provably fit on the remaining nodes,
+        and targets that exact worker so the ASG does not pick a busy one instead.
+        """
+        current = snapshot.desired_capacity
+        instances_by_ip = None
+
+        for plan in DrainSimulator(signals.disruptions_allowed).removable(signals.nodes):
+            if instances_by_ip is None:
+                instances_by_ip = self._instances_by_ip(snapshot)
+
+            node = next(n for n in signals.nodes if n.name == plan.node)
+            instance_id = instances_by_ip.get(node.internal_ip)
+            if not instance_id:
+                logger.debug(f"Node {plan.node} ({node.internal_ip}) is not an in-service instance of {self.asg_name}")
+                continue
+
+            target = current - 1
+            logger.info(
+                f"Decision: SCALE_DOWN to {target}. Reason: CPU={self._format_percent(signals.cpu_utilization)}, "
+                f"{plan.node} ({instance_id}) drains cleanly ({plan.moved_pods} pods move)")
+            return ScalingDecision(target_capacity=target, terminate_instance_id=instance_id, node=plan.node)
+
+        logger.info("Scale-down skipped: no worker can be drained onto the remaining nodes.")
+        return ScalingDecision(target_capacity=current)
+
+    def _instances_by_ip(self, snapshot: AsgSnapshot) -> Dict[str, str]:
+        """Maps private IP -> instance ID for the ASG's in-service workers."""
+        instance_ids = [instance.instance_id for instance in snapshot.in_service]
+        if not instance_ids:
+            return {}
+
+        try:
+            with span("ec2.describe_instances"):
+                response = self.ec2_client.describe_instances(InstanceIds=instance_ids)
+        except ClientError as e:
+            logger.error(f"Failed to describe worker instances: {e}")
+            raise
+
+        return {
+            instance['PrivateIpAddress']: instance['InstanceId']
+            for reservation in response['Reservations']
+            for instance in reservation['Instances']
+            if instance.get('PrivateIpAddress')
+        }
+
+    @staticmethod
+    def _format_percent(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"{value:.1f}%"
+
+    def apply_decision(self, decision: ScalingDecision):
+        """Terminates the chosen worker when there is one, otherwise adjusts the desired capacity."""
+        if decision.terminate_instance_id:
+            self.terminate_instance(decision.terminate_instance_id)
+        else:
+            self.apply_scaling(decision.target_capacity)
+
+    def terminate_instance(self, instance_id: str):
+        """Removes one specific worker and lowers the desired capacity with it."""
+        try:
+            logger.info(f"Applying scaling: Terminating {instance_id} in {self.asg_name} and decrementing capacity")
+
+            with span("asg.terminate_instance"):
+                self.asg_client.terminate_instance_in_auto_scaling_group(
+                    InstanceId=instance_id,
+                    ShouldDecrementDesiredCapacity=True
+                )
+        except ClientError as e:
+            logger.error(f"AWS API Error while terminating {instance_id}: {e}")
+            raise
 
     def apply_scaling(self, new_capacity: int):
         """Executes the scaling command in AWS."""
         try:
             logger.info(f"Applying scaling: Setting {self.asg_name} desired capacity to {new_capacity}")
 
-            self.asg_client.set_desired_capacity(
-                AutoScalingGroupName=self.asg_name,
-                DesiredCapacity=new_capacity,
-                HonorCooldown=True  # Respects the ASG cooldown period to prevent thrashing
-            )
+            with span("asg.set_desired_capacity"):
+                self.asg_client.set_desired_capacity(
+                    AutoScalingGroupName=self.asg_name,
+                    DesiredCapacity=new_capacity,
+                    HonorCooldown=True  # Respects the ASG cooldown period to prevent thrashing
+                )
         except ClientError as e:
             logger.error(f"AWS API Error while scaling: {e}")
             raise
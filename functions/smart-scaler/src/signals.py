@@ -0,0 +1,202 @@
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class PodRequest:
+    """Resource requests of a single pod: CPU in cores, memory in bytes."""
+    namespace: str
+    pod: str
+    cpu: float
+    memory: float
+
+    # Owning Deployment/StatefulSet, used to match the pod to its PodDisruptionBudget
+    workload: str = ''
+    # DaemonSet pods are never evicted to another node
+    movable: bool = True
+
+
+@dataclass(frozen=True)
+class NodeState:
+    """A node's allocatable capacity and the pods currently running on it."""
+    name: str
+    allocatable_cpu: float
+    allocatable_memory: float
+    pods: Tuple[PodRequest, ...] = ()
+    control_plane: bool = False
+    internal_ip: str = ''
+    # Measured CPU usage in cores (cAdvisor), as opposed to the requested CPU
+    cpu_usage: float = 0.0
+    # Pod slots: pods bound to the node (with or without requests) and the kubelet's max-pods
+    pod_count: int = 0
+    allocatable_pods: float = 0.0
+
+    @property
+    def requested_cpu(self) -> float:
+        return sum(pod.cpu for pod in self.pods)
+
+    @property
+    def requested_memory(self) -> float:
+        return sum(pod.memory for pod in self.pods)
+
+
+@dataclass(frozen=True)
+class HpaStatus:
+    """A HorizontalPodAutoscaler's replica counts and what one of its pods requests."""
+    namespace: str
+    name: str
+    # The Deployment it scales, matched against PodRequest.workload
+    workload: str
+    current_replicas: int
+    desired_replicas: int
+    max_replicas: int
+    pod_cpu: float = 0.0
+    pod_memory: float = 0.0
+    # Replicas added over the last couple of minutes
+    recent_growth: int = 0
+    # ScalingLimited: the HPA wants more replicas than its scale-up policy lets it add right now
+    limited: bool = False
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.limited and self.current_replicas < self.max_replicas and self.recent_growth >= 0
+
+    @property
+    def scaling_up(self) -> bool:
+        """Mid-climb: still creating pods, held back by its policy, or grew recently and is below its max."""
+        if self.desired_replicas > self.current_replicas or self.rate_limited:
+            return True
+        return self.recent_growth > 0 and self.desired_replicas < self.max_replicas
+
+
+@dataclass(frozen=True)
+class QueueBacklog:
+    """A RabbitMQ queue's backlog and how fast its consumers work through it."""
+    vhost: str
+    queue: str
+    # Messages ready or delivered but not yet acknowledged
+    depth: float
+    # Acknowledgements per second over the last couple of minutes
+    throughput: float = 0.0
+
+    @property
+    def drain_seconds(self) -> float:
+        """Time to clear the backlog at the current throughput; unbounded while nothing is acknowledged."""
+        if self.depth <= 0:
+            return 0.0
+        return self.depth / self.throughput if self.throughput > 0 else math.inf
+
+
+@dataclass(frozen=True)
+class IngressLatency:
+    """Request latency quantiles of one Ingress, in seconds, and the request rate they were measured over."""
+    namespace: str
+    ingress: str
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    requests_per_second: float = 0.0
+
+
+@dataclass(frozen=True)
+class RangeSeries:
+    """One series of a range query, packed as parallel float64 arrays."""
+    labels: Dict[str, str]
+    timestamps: array
+    values: array
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+@dataclass(frozen=True)
+class InstantVector:
+    """
+    Every series of an instant query: label sets plus parallel float64 arrays of sample time and value.
+    Iterating yields (labels, value) pairs.
+    """
+    labels: Tuple[Dict[str, str], ...] = ()
+    timestamps: array = field(default_factory=lambda: array('d'))
+    values: array = field(default_factory=lambda: array('d'))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, str], float]]:
+        return zip(self.labels, self.values)
+
+    def index(self, label: str) -> Dict[str, int]:
+        """Position of each series by the value of one label."""
+        return {labels.get(label, ''): position for position, labels in enumerate(self.labels)}
+
+    def by(self, label: str) -> Dict[str, float]:
+        """Values keyed by one label, e.g. by('node') for a per-node aggregation."""
+        return {key: self.values[position] for key, position in self.index(label).items()}
+
+
+@dataclass(frozen=True)
+class UtilizationSpread:
+    """How CPU utilization (percent) is spread over the nodes, from one per-node vector."""
+    nodes: int
+    mean: float
+    p50: float
+    p90: float
+    max: float
+    hottest: str
+
+    @property
+    def skew(self) -> float:
+        """Hottest node relative to the mean; 1.0 is perfectly even."""
+        return self.max / self.mean if self.mean > 0 else 1.0
+
+    @classmethod
+    def from_vector(cls, vector: InstantVector, label: str = 'instance') -> Optional["UtilizationSpread"]:
+        if not len(vector):
+            return None
+        ordered = sorted(vector.values)
+        hottest = max(range(len(vector)), key=vector.values.__getitem__)
+        return cls(
+            nodes=len(ordered),
+            mean=sum(ordered) / len(ordered),
+            p50=_percentile(ordered, 0.5),
+            p90=_percentile(ordered, 0.9),
+            max=ordered[-1],
+            hottest=vector.labels[hottest].get(label, ''),
+        )
+
+
+def _percentile(ordered, q: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    return ordered[min(len(ordered), max(1, math.ceil(q * len(ordered)))) - 1]
+
+
+@dataclass(frozen=True)
+class ClusterSignals:
+    """
+    Everything fetched from Prometheus for one scaling cycle.
+    A value Prometheus could not provide (no series, or only stale ones) is None, never 0.
+    """
+    cpu_utilization: Optional[float]
+    pending_pods: int
+    pending_requests: Tuple[PodRequest, ...] = ()
+
+    nodes: Tuple[NodeState, ...] = ()
+    # "namespace/workload" -> evictions the workload's PDB currently allows
+    disruptions_allowed: Mapping[str, int] = field(default_factory=dict)
+
+    # Recent cluster CPU utilization, for trend forecasting
+    cpu_history: Optional[RangeSeries] = None
+
+    # Per-node CPU utilization in percent, labelled by node-exporter instance
+    node_utilization: InstantVector = field(default_factory=InstantVector)
+    hpas: Tuple[HpaStatus, ...] = ()
+    queues: Tuple[QueueBacklog, ...] = ()
+    ingresses: Tuple[IngressLatency, ...] = ()
+
+    # Names of the queries that returned no fresh data this cycle
+    missing: Tuple[str, ...] = ()
+
+    @property
+    def cpu_spread(self) -> Optional[UtilizationSpread]:
+        return UtilizationSpread.from_vector(self.node_utilization)
@@ -0,0 +1,77 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+
+@dataclass(frozen=True)
+class InstanceState:
+    instance_id: str
+    lifecycle_state: str
+    health_status: str
+
+
+@dataclass(frozen=True)
+class AsgSnapshot:
+    """
+    Immutable view of the worker ASG, taken once per scaling cycle.
+    Built from a single describe_auto_scaling_groups response and passed through decision and apply.
+    """
+    name: str
+    desired_capacity: int
+    min_size: int
+    max_size: int
+    instances: Tuple[InstanceState, ...]
+    fetched_at: float
+    # Instances in the warm pool, ready to start or still initializing; 0 when the ASG has none
+    warm_pool_size: int = 0
+
+    @classmethod
+    def from_response(cls, group: Dict[str, Any]) -> "AsgSnapshot":
+        instances = tuple(
+            InstanceState(
+                instance_id=instance['InstanceId'],
+                lifecycle_state=instance['LifecycleState'],
+                health_status=instance.get('HealthStatus', 'Healthy'),
+            )
+            for instance in group.get('Instances', [])
+        )
+        return cls(
+            name=group['AutoScalingGroupName'],
+            desired_capacity=group['DesiredCapacity'],
+            min_size=group['MinSize'],
+            max_size=group['MaxSize'],
+            instances=instances,
+            fetched_at=time.time(),
+            warm_pool_size=group.get('WarmPoolSize', 0),
+        )
+
+    @property
+    def in_service(self) -> Tuple[InstanceState, ...]:
+        return tuple(i for i in self.instances if i.lifecycle_state == 'InService')
+
+    @property
+    def pending(self) -> Tuple[InstanceState, ...]:
+        # Pending, Pending:Wait, Pending:Proceed
+        return tuple(i for i in self.instances if i.lifecycle_state.startswith('Pending'))
+
+    @property
+    def terminating(self) -> Tuple[InstanceState, ...]:
+        # Terminating, Terminating:Wait, Terminating:Proceed
+        return tuple(i for i in self.instances if i.lifecycle_state.startswith('Terminating'))
+
+    @property
+    def launching_count(self) -> int:
+        """
+        Nodes the ASG is still bringing up: Pending instances, or the gap between
+        DesiredCapacity and the instances launched so far, whichever is larger.
+        """
+        live = len(self.instances) - len(self.terminating)
+        return max(len(self.pending), self.desired_capacity - live, 0)
+
+    @property
+    def launch_in_progress(self) -> bool:
+        return self.launching_count > 0
+
+    @property
+    def termination_in_progress(self) -> bool:
+        return bool(self.terminating)
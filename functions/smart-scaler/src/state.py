@@ -0,0 +1,171 @@
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+from seasonal import SeasonalModel
+from signals import RangeSeries
+
+SCALE_UP = 'up'
+SCALE_DOWN = 'down'
+
+
+class SampleRing:
+    """
+    Fixed-size ring of (timestamp, value) samples that packs into one DynamoDB binary attribute.
+    Timestamps are whole epoch seconds (uint32) and values float32, so a sample costs 8 bytes.
+    """
+    VERSION = 1
+    # format version, capacity, next write slot, filled slots
+    _HEADER = struct.Struct('<BHHH')
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Ring capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._timestamps = array('I', [0]) * capacity
+        self._values = array('f', [0.0]) * capacity
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Tuple[float, float]]:
+        """Yields samples oldest first."""
+        start = (self._head - self._count) % self.capacity
+        for i in range(self._count):
+            slot = (start + i) % self.capacity
+            yield float(self._timestamps[slot]), float(self._values[slot])
+
+    def append(self, timestamp: float, value: float):
+        self._timestamps[self._head] = int(timestamp)
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def copy(self) -> "SampleRing":
+        ring = SampleRing(self.capacity)
+        ring._timestamps = array('I', self._timestamps)
+        ring._values = array('f', self._values)
+        ring._head, ring._count = self._head, self._count
+        return ring
+
+    def pack(self) -> bytes:
+        timestamps, values = array('I', self._timestamps), array('f', self._values)
+        if sys.byteorder == 'big':
+            timestamps.byteswap()
+            values.byteswap()
+        header = self._HEADER.pack(self.VERSION, self.capacity, self._head, self._count)
+        return header + timestamps.tobytes() + values.tobytes()
+
+    @classmethod
+    def unpack(cls, data: Optional[bytes], capacity: int) -> "SampleRing":
+        """
+        Restores a packed ring. A missing, truncated or foreign record yields an empty ring;
+        one packed with a different capacity is re-filled newest-last into the requested size.
+        """
+        ring = cls(capacity)
+        if not data or len(data) < cls._HEADER.size:
+            return ring
+
+        version, stored_capacity, head, count = cls._HEADER.unpack_from(data)
+        body = cls._HEADER.size
+        if version != cls.VERSION or len(data) != body + stored_capacity * 8 or count > stored_capacity:
+            return ring
+
+        timestamps = array('I', data[body:body + stored_capacity * 4])
+        values = array('f', data[body + stored_capacity * 4:])
+        if sys.byteorder == 'big':
+            timestamps.byteswap()
+            values.byteswap()
+
+        if stored_capacity == capacity:
+            ring._timestamps, ring._values, ring._head, ring._count = timestamps, values, head % capacity, count
+            return ring
+
+        start = (head - count) % stored_capacity
+        for i in range(count):
+            slot = (start + i) % stored_capacity
+            ring.append(timestamps[slot], values[slot])
+        return ring
+
+
+@dataclass(frozen=True)
+class ScalerState:
+    """
+    What the scaler remembers between invocations, stored on the lock item.
+    Carries recent cluster CPU samples and the last scaling action, so cooldowns,
+    hysteresis and trend checks need neither range queries nor ASG activity lookups,
+    and the seasonal demand model, so it is learned from weeks of history only once.
+    """
+    samples: SampleRing = field(default_factory=lambda: SampleRing(32))
+    last_action: Optional[str] = None
+    last_action_at: Optional[float] = None
+    last_target: Optional[int] = None
+    # Hour-of-week demand learned from range history, refreshed about once an hour
+    seasonal: Optional[SeasonalModel] = None
+
+    @classmethod
+    def from_item(cls, item: Mapping[str, Any], capacity: int = 32) -> "ScalerState":
+        raw = item.get('cpu_samples')
+        # The resource API hands binary attributes back wrapped in boto3's Binary
+        raw = getattr(raw, 'value', raw)
+        seasonal = item.get('seasonal_model')
+        last_action_at = item.get('last_action_at')
+        last_target = item.get('last_target')
+        return cls(
+            samples=SampleRing.unpack(raw, capacity),
+            last_action=item.get('last_action'),
+            last_action_at=float(last_action_at) if last_action_at is not None else None,
+            last_target=int(last_target) if last_target is not None else None,
+            seasonal=SeasonalModel.unpack(getattr(seasonal, 'value', seasonal)),
+        )
+
+    def to_item(self) -> Dict[str, Any]:
+        item: Dict[str, Any] = {'cpu_samples': self.samples.pack()}
+        if self.last_action is not None:
+            item.update(last_action=self.last_action, last_action_at=int(self.last_action_at),
+                        last_target=self.last_target)
+        if self.seasonal is not None:
+            item['seasonal_model'] = self.seasonal.pack()
+        return item
+
+    @property
+    def latest_at(self) -> Optional[float]:
+        """Timestamp of the newest sample, which is this cycle's time once observe() ran."""
+        last = None
+        for last, _ in self.samples:
+            pass
+        return last
+
+    def observe(self, timestamp: float, cpu_utilization: float) -> "ScalerState":
+        samples = self.samples.copy()
+        samples.append(timestamp, cpu_utilization)
+        return replace(self, samples=samples)
+
+    def acted(self, timestamp: float, direction: str, target: int) -> "ScalerState":
+        return replace(self, last_action=direction, last_action_at=timestamp, last_target=target)
+
+    def learned(self, seasonal: Optional[SeasonalModel]) -> "ScalerState":
+        return replace(self, seasonal=seasonal)
+
+    def seconds_since_action(self) -> Optional[float]:
+        latest = self.latest_at
+        if self.last_action_at is None or latest is None:
+            return None
+        return latest - self.last_action_at
+
+    def recent_values(self, n: int) -> List[float]:
+        """The newest n CPU samples (fewer while the ring is still filling), oldest first."""
+        values = [value for _, value in self.samples]
+        return values[-n:] if n > 0 else []
+
+    def history(self, since: float) -> RangeSeries:
+        """Samples taken at or after `since`, in the same shape as a Prometheus range query."""
+        kept = [(ts, value) for ts, value in self.samples if ts >= since]
+        return RangeSeries(
+            labels={},
+            timestamps=array('d', (ts for ts, _ in kept)),
+            values=array('d', (value for _, value in kept)),
+        )
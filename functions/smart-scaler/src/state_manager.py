@@ -1,72 +1,234 @@
+import os
+import socket
+import uuid
 import boto3
 from botocore.exceptions import ClientError
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 import time
 import logging
+from state import ScalerState
+from telemetry import span
 
 logger = logging.getLogger(__name__)
 
+
+class LeaseLostError(Exception):
+    """Raised when a holder's lease was taken over before it could act on it."""
+
+
+@dataclass(frozen=True)
+class Lease:
+    owner_id: str
+    # Strictly increasing across every acquisition of the lock; older tokens are fenced out
+    token: int
+    expires_at: int
+    # Scaler state stored on the lock item, as of this acquisition
+    state: ScalerState = field(default_factory=ScalerState)
+
+
 class StateManager:
-    def __init__(self, table_name: str):
-        self.dynamodb = boto3.resource('dynamodb')
+    def __init__(self, table_name: str, dynamodb=None):
+        self.dynamodb = dynamodb or boto3.resource('dynamodb')
         self.table = self.dynamodb.Table(table_name)
         self.lock_id = "cluster_scaling_lock"
 
-        # How long a lock is valid before it's considered "stale" (5 minutes)
-        self.lock_duration = 300
+        # How long a lease is valid before another invocation may take it over. Kept above the Lambda's
+        # timeout (60s), so a live invocation never loses the lease to expiry and a timed-out one frees it
+        # by the next scheduled run; the daemon renews it every tick instead
+        self.lock_duration = int(os.environ.get('LOCK_LEASE_SECONDS', 120))
+        # A holder with less than this left on its lease renews it before touching the ASG
+        self.renew_margin = int(os.environ.get('LOCK_RENEW_MARGIN_SECONDS', 30))
+        # CPU samples kept in the state record's ring buffer
+        self.history_samples = int(os.environ.get('STATE_HISTORY_SAMPLES', 32))
 
-    def acquire_lock(self) -> bool:
+    def acquire_lock(self) -> Optional[Lease]:
         """
-        Attempts to acquire a distributed lock using DynamoDB Conditional Writes.
-        Includes a safety check for stale locks.
+        Attempts to acquire the scaling lease using a single DynamoDB conditional update.
+        The same write bumps the fencing token and returns it together with the scaler state
+        kept on the item, so no extra read is needed.
+        Returns None if another holder's lease is still valid.
         """
         now = int(time.time())
-        expiration_time = now + self.lock_duration
+        owner_id = f"{os.environ.get('AWS_LAMBDA_LOG_STREAM_NAME') or socket.gethostname()}/{uuid.uuid4().hex[:12]}"
+        expires_at = now + self.lock_duration
 
         try:
-            # Atomic operation: Put the item ONLY if:
+            # Atomic operation: take the lease ONLY if:
             # The lock doesn't exist yet
-            # The existing lock is marked as False (not locked)
-            # The existing lock has expired (stale lock recovery)
-            self.table.put_item(
-                Item={
-                    'LockID': self.lock_id,
-                    'is_locked': True,
-                    'last_updated': now,
-                    'ttl': expiration_time  # DynamoDB can auto-delete this
-                },
-                ConditionExpression=(
-                    "attribute_not_exists(LockID) OR "
-                    "is_locked = :false_val OR "
-                    "last_updated < :stale_time"
-                ),
-                ExpressionAttributeValues={
-                    ":false_val": False,
-                    ":stale_time": now - self.lock_duration
-                }
+            # The existing lock was released
+            # The existing lease has expired (stale lock recovery)
+            with span("lock.acquire"):
+                response = self.table.update_item(
+                    Key={'LockID': self.lock_id},
+                    UpdateExpression=(
+                        "SET is_locked = :true, owner_id = :owner, lease_expires = :expires, "
+                        "last_updated = :now "
+                        "ADD fencing_token :one"
+                    ),
+                    ConditionExpression=(
+                        "attribute_not_exists(LockID) OR "
+                        "is_locked = :false OR "
+                        "lease_expires < :now OR "
+                        "(attribute_not_exists(lease_expires) AND last_updated < :stale_time)"
+                    ),
+                    ExpressionAttributeValues={
+                        ":true": True,
+                        ":false": False,
+                        ":owner": owner_id,
+                        ":expires": expires_at,
+                        ":now": now,
+                        ":one": 1,
+                        ":stale_time": now - self.lock_duration
+                    },
+                    ReturnValues="ALL_NEW"
+                )
+            item = response['Attributes']
+            lease = Lease(
+                owner_id=owner_id, token=int(item['fencing_token']), expires_at=expires_at,
+                state=ScalerState.from_item(item, self.history_samples),
             )
-            logger.info("Scaling lock acquired successfully.")
-            return True
+            logger.info(f"Scaling lock acquired successfully (token {lease.token}).")
+            return lease
         except ClientError as e:
             # Error code 'ConditionalCheckFailedException' means someone else has the lock
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
                 logger.warning("Failed to acquire lock: Scaling already in progress.")
             else:
                 logger.error(f"DynamoDB error during lock acquisition: {e}")
-            return False
+            return None
 
-    def release_lock(self):
+    def renew_lock(self, lease: Lease) -> Lease:
+        """
+        Extends a lease that is still held, for operations that outlive the lease duration.
+        Raises LeaseLostError if the lease was taken over in the meantime.
         """
-        Releases the lock by setting is_locked to False.
+        now = int(time.time())
+        expires_at = now + self.lock_duration
+        self._conditional_update(
+            lease, "SET lease_expires = :expires, last_updated = :now",
+            {":expires": expires_at, ":now": now}, phase="lock.renew"
+        )
+        return Lease(owner_id=lease.owner_id, token=lease.token, expires_at=expires_at, state=lease.state)
+
+    def ensure_lease(self, lease: Lease) -> Lease:
+        """Renews the lease if less than `renew_margin` seconds of it are left, otherwise returns it as is."""
+        if lease.expires_at - time.time() >= self.renew_margin:
+            return lease
+        logger.info(f"Lease (token {lease.token}) expires in under {self.renew_margin}s; renewing it.")
+        return self.renew_lock(lease)
+
+    def fence(self, lease: Lease):
         """
+        Records the lease's token as the latest scaling write, right before touching the ASG.
+        Fails with LeaseLostError if a newer holder exists, so a stale holder never scales.
+        """
+        now = int(time.time())
+        self._conditional_update(
+            lease, "SET last_scaling_token = :token, last_scaling_at = :now",
+            {":now": now}, phase="lock.fence"
+        )
+
+    def queue_trigger(self, payload: str) -> bool:
+        """
+        Hands a fast-path trigger to the current holder instead of dropping it.
+        Returns False if nobody holds a live lease, in which case the caller should take the lock itself.
+        """
+        now = int(time.time())
         try:
-            self.table.update_item(
-                Key={'LockID': self.lock_id},
-                UpdateExpression="SET is_locked = :f, last_updated = :t",
-                ExpressionAttributeValues={
-                    ":f": False,
-                    ":t": int(time.time())
-                }
+            with span("lock.queue_trigger"):
+                self.table.update_item(
+                    Key={'LockID': self.lock_id},
+                    UpdateExpression="SET pending_triggers = list_append(if_not_exists(pending_triggers, :empty), :trigger)",
+                    ConditionExpression="is_locked = :true AND lease_expires >= :now",
+                    ExpressionAttributeValues={":empty": [], ":trigger": [payload], ":true": True, ":now": now},
+                )
+            logger.info("Lock is held; trigger queued for the current holder.")
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            logger.error(f"DynamoDB error while queueing trigger: {e}")
+            raise
+
+    def release_lock(self, lease: Lease, state: Optional[ScalerState] = None) -> List[str]:
+        """
+        Releases the lease, but only if this invocation still owns it.
+        The cycle's updated state is saved in the same write; a stale holder's state is dropped.
+        Returns the triggers queued while the lease was held, which the same write clears.
+        """
+        assignments, names, values = self._state_assignments(state)
+        values.update({":f": False, ":zero": 0, ":t": int(time.time())})
+
+        try:
+            response = self._conditional_update(
+                lease,
+                f"SET is_locked = :f, lease_expires = :zero, last_updated = :t{assignments} REMOVE pending_triggers",
+                values, names=names, phase="lock.release", require_live=False, return_values="UPDATED_OLD"
             )
             logger.info("Scaling lock released.")
+            return list(response.get('Attributes', {}).get('pending_triggers', []))
+        except LeaseLostError:
+            logger.warning(f"Lock was taken over before release (token {lease.token}); leaving it to the new holder.")
         except ClientError as e:
             logger.error(f"Failed to release lock: {e}")
+        return []
+
+    def checkpoint(self, lease: Lease, state: ScalerState) -> Tuple[Lease, List[str]]:
+        """
+        For a holder that keeps the lease across cycles (the in-cluster daemon): extends the lease,
+        saves the state and collects queued triggers, all in one write.
+        Raises LeaseLostError if the lease lapsed or was taken over.
+        """
+        now = int(time.time())
+        expires_at = now + self.lock_duration
+        assignments, names, values = self._state_assignments(state)
+        values.update({":expires": expires_at, ":now": now})
+
+        response = self._conditional_update(
+            lease, f"SET lease_expires = :expires, last_updated = :now{assignments} REMOVE pending_triggers",
+            values, names=names, phase="lock.checkpoint", return_values="UPDATED_OLD"
+        )
+        renewed = Lease(owner_id=lease.owner_id, token=lease.token, expires_at=expires_at, state=state)
+        return renewed, list(response.get('Attributes', {}).get('pending_triggers', []))
+
+    @staticmethod
+    def _state_assignments(state: Optional[ScalerState]) -> Tuple[str, Optional[Dict[str, str]], dict]:
+        """SET clauses (with their names and values) that store the state record on the lock item."""
+        if state is None:
+            return "", None, {}
+
+        clauses, names, values = "", {}, {}
+        for i, (attribute, value) in enumerate(state.to_item().items()):
+            clauses += f", #s{i} = :s{i}"
+            names[f"#s{i}"] = attribute
+            values[f":s{i}"] = value
+        return clauses, names, values
+
+    def _conditional_update(self, lease: Lease, update_expression: str, values: dict,
+                            names: Optional[dict] = None, phase: str = "lock.update", require_live: bool = True,
+                            return_values: str = "NONE") -> dict:
+        condition = "owner_id = :owner AND fencing_token = :token"
+        values = {**values, ":owner": lease.owner_id, ":token": lease.token}
+        if require_live:
+            condition += " AND lease_expires >= :check_time"
+            values[":check_time"] = int(time.time())
+
+        kwargs = {}
+        if names:
+            kwargs['ExpressionAttributeNames'] = names
+
+        try:
+            with span(phase):
+                return self.table.update_item(
+                    Key={'LockID': self.lock_id},
+                    UpdateExpression=update_expression,
+                    ConditionExpression=condition,
+                    ExpressionAttributeValues=values,
+                    ReturnValues=return_values,
+                    **kwargs
+                )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise LeaseLostError(f"Lease with token {lease.token} is no longer held by {lease.owner_id}") from e
+            raise
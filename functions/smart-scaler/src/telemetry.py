@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON line, including the fields passed through `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({key: value for key, value in vars(record).items() if key not in _RESERVED_ATTRS})
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level: str = "INFO"):
+    """Puts the JSON formatter on the root logger's handlers (the Lambda runtime installs one)."""
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    for handler in root.handlers:
+        handler.setFormatter(JsonFormatter())
+    root.setLevel(level)
+
+
+class CycleTrace:
+    """
+    Phase durations of one scaling cycle.
+    Repeated phases are summed; spans may be recorded from worker threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def annotate(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def as_record(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+                "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+                **self.fields,
+            }
+
+
+# One cycle runs at a time per container, so a module-level slot is enough
+_active: Optional[CycleTrace] = None
+
+
+def start_cycle() -> CycleTrace:
+    global _active
+    _active = CycleTrace()
+    return _active
+
+
+@contextmanager
+def span(name: str):
+    """Times the enclosed block into the active cycle. A no-op when no cycle is active."""
+    trace = _active
+    if trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(name, time.perf_counter() - started)
+
+
+def annotate(**fields):
+    """Attaches fields (status, decision, cold start...) to the active cycle record."""
+    if _active is not None:
+        _active.annotate(**fields)
+
+
+def end_cycle(emit_emf: bool = False, namespace: str = "SmartScaler"):
+    """Logs the active cycle as one structured record and, optionally, as CloudWatch EMF."""
+    global _active
+    trace, _active = _active, None
+    if trace is None:
+        return
+
+    record = trace.as_record()
+    logger.info("Scaling cycle complete", extra={"cycle": record})
+
+    if emit_emf:
+        sys.stdout.write(json.dumps(_to_emf(record, namespace)) + "\n")
+        sys.stdout.flush()
+
+
+def _to_emf(record: Dict[str, Any], namespace: str) -> Dict[str, Any]:
+    """
+    CloudWatch Embedded Metric Format: the Lambda log pipeline turns this line into
+    metrics (cycle_ms, <phase>_ms, init_ms, query cache counts) without any PutMetricData calls.
+    """
+    values = {"cycle_ms": record["total_ms"]}
+    values.update({f"{name.replace('.', '_')}_ms": ms for name, ms in record["phases_ms"].items()})
+    if "init_ms" in record:
+        values["init_ms"] = record["init_ms"]
+    counts = {name: record[name] for name in ("query_cache_hits", "query_cache_misses") if name in record}
+
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace,
+                "Dimensions": [["FunctionName"], ["FunctionName", "ColdStart"]],
+                "Metrics": [{"Name": name, "Unit": "Milliseconds"} for name in values]
+                + [{"Name": name, "Unit": "Count"} for name in counts],
+            }],
+        },
+        "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "smart-scaler"),
+        "ColdStart": str(record.get("cold_start", False)).lower(),
+        "status": record.get("status"),
+        **values,
+        **counts,
+    }
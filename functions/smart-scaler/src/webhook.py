@@ -0,0 +1,149 @@
+import base64
+import hmac
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from signals import PodRequest
+
+logger = logging.getLogger(__name__)
+
+# Alert label the scaler's alerting rules set to say what the alert's value measures
+SIGNAL_LABEL = 'scaler_signal'
+# One alert per unschedulable pod, valued at the pod's CPU request in cores (memory request in the `memory` annotation)
+PENDING_POD_SIGNAL = 'pending_pod'
+# Cluster CPU utilization in percent
+CPU_SIGNAL = 'cpu'
+
+HTTP_STATUS = {
+    "success": 200,
+    "ignored": 200,
+    "skipped": 200,
+    "merged": 202,
+    "bad_request": 400,
+    "unauthorized": 401,
+    "error": 500,
+}
+
+
+class WebhookError(Exception):
+    """A request the fast path refuses; `status` is the result status reported back."""
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class AlertTrigger:
+    """
+    The scale-up evidence carried by one or more Alertmanager notifications,
+    used in place of a Prometheus round-trip.
+    """
+    pending_requests: Tuple[PodRequest, ...] = ()
+    cpu_utilization: Optional[float] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.pending_requests) or self.cpu_utilization is not None
+
+    @classmethod
+    def from_alerts(cls, alerts: Iterable[Mapping[str, Any]]) -> "AlertTrigger":
+        pods: Dict[Tuple[str, str], PodRequest] = {}
+        cpu = None
+
+        for alert in alerts:
+            if alert.get('status', 'firing') != 'firing':
+                continue
+            labels = alert.get('labels') or {}
+            value = _annotation_float(alert, 'value')
+            signal = labels.get(SIGNAL_LABEL)
+
+            if signal == PENDING_POD_SIGNAL and labels.get('pod'):
+                key = (labels.get('namespace', ''), labels['pod'])
+                pods[key] = PodRequest(namespace=key[0], pod=key[1], cpu=value or 0.0,
+                                       memory=_annotation_float(alert, 'memory') or 0.0)
+            elif signal == CPU_SIGNAL and value is not None:
+                cpu = value if cpu is None else max(cpu, value)
+
+        return cls(pending_requests=tuple(pods.values()), cpu_utilization=cpu)
+
+    def merge(self, other: "AlertTrigger") -> "AlertTrigger":
+        pods = {(pod.namespace, pod.pod): pod for pod in self.pending_requests + other.pending_requests}
+        cpus = [cpu for cpu in (self.cpu_utilization, other.cpu_utilization) if cpu is not None]
+        return AlertTrigger(pending_requests=tuple(pods.values()), cpu_utilization=max(cpus) if cpus else None)
+
+    def to_json(self) -> str:
+        """Compact form queued on the lock item while another invocation holds it."""
+        return json.dumps({
+            "pods": [[pod.namespace, pod.pod, pod.cpu, pod.memory] for pod in self.pending_requests],
+            "cpu": self.cpu_utilization,
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "AlertTrigger":
+        data = json.loads(payload)
+        return cls(
+            pending_requests=tuple(
+                PodRequest(namespace=namespace, pod=pod, cpu=cpu, memory=memory)
+                for namespace, pod, cpu, memory in data["pods"]
+            ),
+            cpu_utilization=data.get("cpu"),
+        )
+
+
+def is_http_event(event: Mapping[str, Any]) -> bool:
+    """Function URL (payload format 2.0) events carry an HTTP request context; scheduled events do not."""
+    return 'http' in (event.get('requestContext') or {})
+
+
+def parse_event(event: Mapping[str, Any], token: Optional[str]) -> AlertTrigger:
+    """
+    Authenticates an Alertmanager webhook delivered through the function URL and extracts its trigger.
+    Alertmanager sends the shared token as `Authorization: Bearer <token>` (http_config.authorization).
+    """
+    if not token:
+        raise WebhookError("unauthorized", "WEBHOOK_TOKEN is not configured; the fast path is disabled")
+
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+    scheme, _, credentials = headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+        raise WebhookError("unauthorized", "Missing or invalid bearer token")
+
+    body = event.get('body') or ''
+    try:
+        if event.get('isBase64Encoded'):
+            body = base64.b64decode(body).decode()
+        payload = json.loads(body)
+        alerts = payload['alerts']
+    except (ValueError, KeyError, TypeError) as e:
+        raise WebhookError("bad_request", f"Not an Alertmanager webhook payload: {e}") from e
+
+    # from_alerts reads labels and annotations as mappings; anything else is a malformed body, not a server error
+    if not isinstance(alerts, list) or not all(_is_alert(alert) for alert in alerts):
+        raise WebhookError("bad_request", "Not an Alertmanager webhook payload: malformed alerts")
+    return AlertTrigger.from_alerts(alerts)
+
+
+def http_response(result: Mapping[str, Any]) -> Dict[str, Any]:
+    """Wraps a cycle result for the function URL."""
+    return {
+        "statusCode": HTTP_STATUS.get(result.get("status"), 500),
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(result),
+    }
+
+
+def _is_alert(alert: Any) -> bool:
+    return isinstance(alert, dict) and all(
+        isinstance(alert.get(field) or {}, dict) for field in ('labels', 'annotations')
+    )
+
+
+def _annotation_float(alert: Mapping[str, Any], name: str) -> Optional[float]:
+    # Alertmanager does not forward sample values; the rules template them into annotations
+    raw = (alert.get('annotations') or {}).get(name)
+    try:
+        return float(raw) if raw not in (None, '') else None
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring non-numeric {name} {raw!r} on alert {alert.get('labels', {}).get('alertname')}")
+        return None
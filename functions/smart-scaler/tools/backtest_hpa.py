@@ -0,0 +1,60 @@
+"""
+Backtests the HPA projection in the offline simulator.
+
+Replays each scenario with the workload's pods coming from an HPA model (at most
+--step-pods replicas per --period seconds, up to --max-replicas) and runs the scaler
+once per lookahead setting. A lookahead of 0 seconds is the purely reactive scaler,
+which only sees the HPA's pods once they are pending; the scaler defaults to 120s.
+Projecting pays off when an HPA can climb faster than a node joins (e.g. --step-pods 4
+--period 15); at the services' 2 pods per 30s longer lookaheads mostly add node-minutes.
+
+Reports, per scenario and lookahead: pending-pod minutes, time-to-capacity,
+node-minutes and flaps, so the earlier capacity can be weighed against what it costs.
+
+Usage: python tools/backtest_hpa.py [--lookahead 0 120 225 450] [--step-pods 2 --period 30]
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from simulate import Simulation, Workload, scenario  # noqa: E402
+
+COLUMNS = ('pending_pod_minutes', 'time_to_capacity_mean_s', 'time_to_capacity_max_s', 'node_minutes', 'flaps')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', default=['burst', 'ramp', 'sawtooth'])
+    parser.add_argument('--lookahead', type=float, nargs='+', default=[0, 120, 225, 450],
+                        help='Seconds of HPA climb to project')
+    parser.add_argument('--max-replicas', type=int, default=60, help='HPA maxReplicas of the simulated workload')
+    parser.add_argument('--step-pods', type=int, default=2, help='Replicas the HPA adds per period')
+    parser.add_argument('--period', type=float, default=30, help='HPA scale-up policy period in seconds')
+    parser.add_argument('--duration', type=float, default=3 * 3600)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"{'scenario':>10} {'lookahead':>9} " + " ".join(f"{column:>24}" for column in COLUMNS))
+    for name in args.scenarios:
+        for lookahead in args.lookahead:
+            workload = Workload(
+                demand=scenario(name), hpa_max_replicas=args.max_replicas,
+                hpa_step_pods=args.step_pods, hpa_period=args.period,
+            )
+            summary = Simulation(
+                workload, args.duration,
+                config_overrides={
+                    'hpa_scale_up_pods': args.step_pods, 'hpa_scale_up_period_seconds': args.period,
+                    'hpa_lookahead_seconds': lookahead,
+                },
+            ).run().summary()
+            print(f"{name:>10} {lookahead:>9.0f} " + " ".join(f"{summary[column]:>24}" for column in COLUMNS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Backtests the seasonal forecast in the offline simulator.
+
+Seeds the requested-CPU history the seasonal model learns from with --train-weeks of the
+'weekly' scenario (sampled like the range query, every --step seconds, growing by --growth
+a week), then replays the following week, the model learning each completed hour as it
+does in the Lambda, with:
+  - reactive:      the scaler without a model, climbing behind each morning's rise
+  - static-floor:  the reactive scaler with MIN_NODES raised to the week's peak, the usual workaround
+  - <method>:      the scaler pre-warming from a model learned with each seasonal method
+
+For each it reports node-minutes, pending-pod minutes and SLO misses (pending episodes that
+outlast --slo seconds), then the capacity each seasonal method saves against the static
+floor and the SLO misses it avoids against the reactive scaler.
+
+Usage: python tools/backtest_seasonal.py [--methods holt_winters naive] [--train-weeks 2] [--slo 120]
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from policies import POLICIES  # noqa: E402
+from seasonal import SeasonalForecaster  # noqa: E402
+from simulate import Simulation, Workload, scenario  # noqa: E402
+
+WEEK = 7 * 86400
+COLUMNS = ('node_minutes', 'pending_pod_minutes', 'slo_misses', 'time_to_capacity_max_s', 'flaps')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=list(SeasonalForecaster.METHODS),
+                        choices=SeasonalForecaster.METHODS)
+    parser.add_argument('--train-weeks', type=int, default=2)
+    parser.add_argument('--step', type=float, default=300, help='Seconds between training samples')
+    parser.add_argument('--slo', type=float, default=120, help='Longest acceptable pending-pod episode, in seconds')
+    parser.add_argument('--lead', type=float, default=900, help='SEASONAL_LEAD_SECONDS')
+    parser.add_argument('--growth', type=float, default=0.1,
+                        help='Week-on-week demand growth, which the seasonal-naive baseline always lags')
+    parser.add_argument('--max-nodes', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    weekly = scenario('weekly')
+    workload = Workload(demand=lambda t: weekly(t) * (1 + args.growth) ** (t / WEEK))
+
+    # The range history the model learns from: requested CPU over the weeks before the replay
+    history = [
+        (t, workload.pods_wanted(t) * workload.pod_cpu)
+        for t in range(-args.train_weeks * WEEK, 0, int(args.step))
+    ]
+    peak_nodes = max(
+        math.ceil(workload.pods_wanted(t) / int(Simulation(workload, 0).capacity.cpu // workload.pod_cpu))
+        for t in range(0, WEEK, 300)
+    )
+
+    def run(min_nodes: int = 2, **overrides) -> Dict[str, float]:
+        report = Simulation(
+            workload, WEEK, min_nodes=min_nodes, max_nodes=args.max_nodes, initial_nodes=max(min_nodes, 3),
+            requested_history=history, config_overrides={'seasonal_lead_seconds': args.lead, **overrides},
+        ).run()
+        summary = report.summary()
+        summary['slo_misses'] = sum(1 for episode in report.time_to_capacity if episode > args.slo)
+        return summary
+
+    reactive = tuple(name for name in POLICIES if name != 'seasonal')
+    results = {
+        'reactive': run(scaling_policies=reactive),
+        'static-floor': run(min_nodes=peak_nodes, scaling_policies=reactive),
+    }
+    for method in args.methods:
+        results[method] = run(seasonal_method=method)
+
+    print(f"{'variant':>14} " + " ".join(f"{column:>24}" for column in COLUMNS))
+    for variant, summary in results.items():
+        print(f"{variant:>14} " + " ".join(f"{summary[column]:>24}" for column in COLUMNS))
+
+    print(f"\nStatic floor: {peak_nodes} nodes")
+    for method in args.methods:
+        saved = results['static-floor']['node_minutes'] - results[method]['node_minutes']
+        avoided = results['reactive']['slo_misses'] - results[method]['slo_misses']
+        print(f"{method:>14}: {saved:.0f} node-minutes saved against the static floor "
+              f"({saved / results['static-floor']['node_minutes'] * 100:.0f}%), "
+              f"{avoided} of {results['reactive']['slo_misses']} reactive SLO misses avoided")
+
+
+if __name__ == '__main__':
+    main()
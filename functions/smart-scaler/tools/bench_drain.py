@@ -0,0 +1,75 @@
+"""
+Benchmarks the scale-down drain simulation over synthetic clusters.
+
+Each cluster is filled to a target request utilization with pods shaped like the
+saga services (100m/128Mi up to 250m/512Mi). Reports how long find_removable takes
+to scan every worker and whether it found a node to remove.
+
+Usage: python tools/bench_drain.py [--utilization 0.6] [--rounds 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from drain import DrainSimulator  # noqa: E402
+from planner import INSTANCE_ALLOCATABLE  # noqa: E402
+from signals import NodeState, PodRequest  # noqa: E402
+
+MIB = 1024 ** 2
+POD_SHAPES = [(0.1, 128 * MIB), (0.1, 256 * MIB), (0.25, 512 * MIB), (0.05, 64 * MIB)]
+WORKLOADS = ['order-service', 'payment-service', 'inventory-service', 'notification-service']
+
+
+def synthetic_cluster(node_count, pod_count, utilization, seed=7):
+    rng = random.Random(seed)
+    cpu, memory = INSTANCE_ALLOCATABLE['t3.medium']
+    nodes = [{'name': f"ip-10-0-2-{i}", 'cpu': 0.0, 'memory': 0.0, 'pods': []} for i in range(node_count)]
+
+    for i in range(pod_count):
+        pod_cpu, pod_memory = rng.choice(POD_SHAPES)
+        node = rng.choice(nodes)
+        if node['cpu'] + pod_cpu > cpu * utilization or node['memory'] + pod_memory > memory * utilization:
+            continue
+        node['cpu'] += pod_cpu
+        node['memory'] += pod_memory
+        node['pods'].append(PodRequest(
+            namespace='development', pod=f"pod-{i}", cpu=pod_cpu, memory=pod_memory,
+            workload=rng.choice(WORKLOADS),
+        ))
+
+    return [
+        NodeState(name=n['name'], allocatable_cpu=cpu, allocatable_memory=memory, pods=tuple(n['pods']))
+        for n in nodes
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--utilization', type=float, default=0.6, help='Per-node request fill ceiling')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    simulator = DrainSimulator()
+    print(f"{'nodes':>6} {'pods':>6} {'median (ms)':>12} {'p95 (ms)':>10}  removable")
+    for node_count, pod_count in [(5, 50), (5, 200), (20, 300), (50, 1000), (100, 3000)]:
+        nodes = synthetic_cluster(node_count, pod_count, args.utilization)
+        placed = sum(len(node.pods) for node in nodes)
+
+        samples = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            plan = simulator.find_removable(nodes)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{node_count:>6} {placed:>6} {statistics.median(samples):>12.2f} {p95:>10.2f}  {plan.node if plan else '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Contention benchmark and safety check for the DynamoDB lease lock.
+
+Runs against a local DynamoDB stand-in: DynamoDB Local (--endpoint-url, e.g. the
+amazon/dynamodb-local container) or, by default, an in-process moto server
+(pip install "moto[server]"). moto does not serialise concurrent conditional
+writes the way DynamoDB does, so under contention it occasionally lets two
+acquires through; those show up as "fenced out" rather than as overlaps.
+
+Scenarios:
+  contention  N concurrent acquirers loop acquire -> fence -> hold -> release.
+              Reports throughput, acquire latency and contention, and verifies that
+              no two holders ever overlapped and fencing tokens only increased.
+  takeover    A holder stalls past its lease and may no longer fence; a second invocation
+              takes over. The stale holder's renewal and fence must be rejected and its release
+              must not free the new holder's lease. The new holder keeps a lease with
+              time to spare as is, and its release hands back the triggers queued meanwhile.
+
+Exits non-zero when a check fails; CI runs it with a short --seconds.
+
+Usage: python tools/bench_lock.py [--workers 32] [--seconds 5] [--hold-ms 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import boto3  # noqa: E402
+from state_manager import LeaseLostError, StateManager  # noqa: E402
+
+TABLE = 'scaling-state-bench'
+
+
+def start_local_dynamodb(endpoint_url):
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-1')
+
+    server = None
+    if not endpoint_url:
+        from moto.server import ThreadedMotoServer
+
+        server = ThreadedMotoServer(port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint_url = f"http://{host}:{port}"
+
+    client = boto3.client('dynamodb', endpoint_url=endpoint_url)
+    if TABLE in client.list_tables()['TableNames']:
+        client.delete_table(TableName=TABLE)
+        client.get_waiter('table_not_exists').wait(TableName=TABLE)
+    client.create_table(
+        TableName=TABLE,
+        AttributeDefinitions=[{'AttributeName': 'LockID', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'LockID', 'KeyType': 'HASH'}],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    client.get_waiter('table_exists').wait(TableName=TABLE)
+    return endpoint_url, server
+
+
+def new_state_manager(endpoint_url, lease_seconds=None):
+    # boto3 resources are not thread-safe: one session per worker, as each Lambda container has its own
+    resource = boto3.session.Session().resource('dynamodb', endpoint_url=endpoint_url)
+    manager = StateManager(TABLE, dynamodb=resource)
+    if lease_seconds is not None:
+        manager.lock_duration = lease_seconds
+    return manager
+
+
+def contention(endpoint_url, workers, seconds, hold_ms):
+    holder = {'owner': None}
+    guard = threading.Lock()
+    stats = {'attempts': 0, 'acquired': 0, 'overlaps': 0, 'lost': 0}
+    latencies, tokens = [], []
+
+    # Build every client up front so session setup is not counted as lock latency
+    managers = [new_state_manager(endpoint_url) for _ in range(workers)]
+    for manager in managers:
+        manager.table.load()
+    deadline = time.monotonic() + seconds
+
+    def worker(manager):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            lease = manager.acquire_lock()
+            elapsed = time.perf_counter() - started
+
+            with guard:
+                stats['attempts'] += 1
+                latencies.append(elapsed)
+            if not lease:
+                continue
+
+            try:
+                manager.fence(lease)
+                with guard:
+                    stats['acquired'] += 1
+                    tokens.append(lease.token)
+                    if holder['owner'] is not None:
+                        stats['overlaps'] += 1
+                    holder['owner'] = lease.owner_id
+                time.sleep(hold_ms / 1000)
+                with guard:
+                    if holder['owner'] == lease.owner_id:
+                        holder['owner'] = None
+            except LeaseLostError:
+                with guard:
+                    stats['lost'] += 1
+            finally:
+                manager.release_lock(lease)
+
+    threads = [threading.Thread(target=worker, args=(manager,)) for manager in managers]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+
+    latencies.sort()
+    monotonic = all(a < b for a, b in zip(sorted(tokens), sorted(tokens)[1:])) and len(set(tokens)) == len(tokens)
+    print(f"contention: {workers} workers for {wall:.1f}s, hold {hold_ms}ms")
+    print(f"  attempts            {stats['attempts']}")
+    print(f"  acquisitions        {stats['acquired']} ({stats['acquired'] / wall:.1f}/s)")
+    print(f"  contended attempts  {stats['attempts'] - stats['acquired'] - stats['lost']}")
+    print(f"  acquire latency     p50 {statistics.median(latencies) * 1000:.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    print(f"  fenced out          {stats['lost']}")
+    print(f"  overlapping holders {stats['overlaps']}")
+    print(f"  unique tokens       {'yes' if monotonic else 'NO'}")
+    return stats['overlaps'] == 0 and monotonic
+
+
+def takeover(endpoint_url):
+    stale = new_state_manager(endpoint_url, lease_seconds=1)
+    fresh = new_state_manager(endpoint_url, lease_seconds=60)
+
+    old_lease = stale.acquire_lock()
+    time.sleep(2.2)  # the stale holder stalls past its lease
+    # Even before anyone takes over, a lapsed lease no longer authorises scaling
+    lapsed_fence_rejected = rejected(lambda: stale.fence(old_lease))
+    new_lease = fresh.acquire_lock()
+
+    checks = {
+        'lapsed fence rejected': lapsed_fence_rejected,
+        'new holder acquired after expiry': new_lease is not None,
+        'token increased': bool(new_lease) and new_lease.token > old_lease.token,
+    }
+
+    checks['stale renewal rejected'] = rejected(lambda: stale.ensure_lease(old_lease))
+    checks['stale fence rejected'] = rejected(lambda: stale.fence(old_lease))
+    checks['live lease kept without renewal'] = bool(new_lease) and fresh.ensure_lease(new_lease) is new_lease
+    checks['trigger queued for the holder'] = fresh.queue_trigger('{"pending_requests": []}')
+
+    stale.release_lock(old_lease)
+    checks['stale release left new lease intact'] = new_manager_still_holds(fresh, new_lease)
+    checks['release returned queued trigger'] = fresh.release_lock(new_lease) == ['{"pending_requests": []}']
+    checks['no trigger queued once released'] = not fresh.queue_trigger('{"pending_requests": []}')
+
+    print("takeover:")
+    for name, passed in checks.items():
+        print(f"  {name:<38} {'PASS' if passed else 'FAIL'}")
+    return all(checks.values())
+
+
+def rejected(call) -> bool:
+    try:
+        call()
+        return False
+    except LeaseLostError:
+        return True
+
+
+def new_manager_still_holds(manager, lease):
+    try:
+        manager.renew_lock(lease)
+        return True
+    except LeaseLostError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint-url', help='DynamoDB Local endpoint; defaults to an in-process moto server')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--hold-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    endpoint_url, server = start_local_dynamodb(args.endpoint_url)
+    try:
+        ok = contention(endpoint_url, args.workers, args.seconds, args.hold_ms)
+        print()
+        ok = takeover(endpoint_url) and ok
+    finally:
+        if server:
+            server.stop()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    import logging
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.CRITICAL)
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmarks one decision cycle's worth of Prometheus queries against a local fake server.
+
+Compares the sequential path (one query_metric call after another) with query_many,
+for a growing number of queries per cycle. With query_many the cycle latency should
+stay close to a single round-trip as queries are added.
+
+Usage: python tools/bench_query_many.py [--latency 0.05] [--rounds 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from cache import QueryCache  # noqa: E402
+from fake_prometheus import FakePrometheus  # noqa: E402
+from metrics import PrometheusClient  # noqa: E402
+
+
+def time_cycle(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-query latency in seconds')
+    parser.add_argument('--rounds', type=int, default=5, help='Cycles per measurement (median is reported)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with FakePrometheus(latency=args.latency) as server:
+        client = PrometheusClient(url=server.url)
+        # Every round has to reach the server, or rounds after the first only measure cache hits
+        client.cache = QueryCache(ttl=0)
+        try:
+            print(f"{'queries':>8} {'sequential (ms)':>16} {'query_many (ms)':>16} {'speedup':>8}")
+            for size in args.sizes:
+                queries = {f"q{i}": f"up{{job=\"bench-{i}\"}}" for i in range(size)}
+
+                sequential = time_cycle(lambda: [client.query_metric(q) for q in queries.values()], args.rounds)
+                batched = time_cycle(lambda: client.query_many(queries), args.rounds)
+
+                print(f"{size:>8} {sequential * 1000:>16.1f} {batched * 1000:>16.1f} {sequential / batched:>7.1f}x")
+
+            print(f"\n{server.requests_served} requests served over {server.connections_opened} TCP connections")
+        finally:
+            client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmarks fitting the seasonal model, the part of a cycle that grows with the history it reads.
+
+Times SeasonalForecaster.update on synthetic requested-CPU history with a daily and weekly shape:
+the first fit over the whole history, and the hourly refit that folds in only the last hour.
+
+Usage: python tools/bench_seasonal.py [--days 14] [--rounds 20]
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from seasonal import SeasonalForecaster  # noqa: E402
+
+# A Monday, 00:00 UTC
+START = 1_790_000_000 // (7 * 86400) * (7 * 86400) + 4 * 86400
+
+
+def synthetic_history(days, step, seed=7):
+    rng = random.Random(seed)
+    timestamps = [START + i * step for i in range(int(days * 86400 // step))]
+    # Busy from 07:00 to 19:00 UTC, weekends at 40% of weekdays
+    values = [
+        2.0 + 1.5 * max(0.0, math.sin(math.pi * ((t % 86400) / 3600 - 7) / 12))
+        * (0.4 if (t - START) % 604800 >= 5 * 86400 else 1.0) + rng.uniform(-0.1, 0.1)
+        for t in timestamps
+    ]
+    return timestamps, values
+
+
+def timed(rounds, fit):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fit()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=float, default=14)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'method':>12} {'step (s)':>8} {'samples':>8} {'fit':>7} {'median (ms)':>12} {'p95 (ms)':>10}")
+    for method in SeasonalForecaster.METHODS:
+        for step in (300, 60):
+            forecaster = SeasonalForecaster(method=method, history_seconds=args.days * 86400, step_seconds=step)
+            timestamps, values = synthetic_history(args.days, step)
+            now = timestamps[-1] + step
+
+            # The first fit reads the whole history; the hourly refit only what came after
+            split = len(timestamps) - int(3600 // step)
+            model = forecaster.update(None, timestamps[:split], values[:split], now - 3600)
+            for fit, window, run in (
+                ('first', len(timestamps), lambda: forecaster.update(None, timestamps, values, now)),
+                ('hourly', len(timestamps) - split,
+                 lambda: forecaster.update(model, timestamps[split:], values[split:], now)),
+            ):
+                median, p95 = timed(args.rounds, run)
+                print(f"{method:>12} {step:>8} {window:>8} {fit:>7} {median:>12.2f} {p95:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmarks the CPU capacity controllers in the offline simulator.
+
+Replays a demand step (the 'step' scenario: 0.9 -> 5.4 cores at 30 minutes, back at 90)
+and the regular scenarios against the threshold controller and PID variants, with room
+to grow (--max-nodes 10). For each step in demand it measures, from the desired capacity
+the scaler set after every decision:
+  - settling time: seconds from the step until capacity last changed before the next step
+  - overshoot:     nodes requested beyond where capacity settled (below it, for a step down)
+alongside pending-pod minutes, node-minutes and flaps.
+
+Usage: python tools/benchmark_controller.py [--scenarios step burst] [--variants threshold pid pid-pi]
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from simulate import Simulation, Workload, scenario  # noqa: E402
+
+# Times at which each scenario's demand steps
+STEPS = {'step': (1800, 5400), 'burst': (1800, 4200), 'ramp': (0, 5400), 'sawtooth': tuple(range(900, 10800, 900))}
+
+VARIANTS: Dict[str, Dict[str, object]] = {
+    'threshold': {'capacity_controller': 'threshold'},
+    # The PID defaults: proportional only, target 60% with the band reaching the old 70/30 thresholds
+    'pid': {'capacity_controller': 'pid'},
+    'pid-pi': {'capacity_controller': 'pid', 'pid_ki': 0.05},
+    'pid-pd': {'capacity_controller': 'pid', 'pid_kd': 2.0},
+    'pid-target50': {'capacity_controller': 'pid', 'pid_target_cpu': 50, 'pid_deadband_up': 20, 'pid_deadband_down': 20},
+    'pid-kp1': {'capacity_controller': 'pid', 'pid_kp_up': 1.0},
+}
+
+COLUMNS = ('settling_s', 'overshoot_nodes', 'pending_pod_minutes', 'node_minutes', 'flaps')
+
+
+def step_response(capacity: List[Tuple[float, int]], steps: Tuple[float, ...], duration: float) -> Tuple[float, float]:
+    """Mean settling time and worst overshoot (nodes) over the demand steps."""
+    settling, overshoot = [], 0
+    bounds = list(steps) + [duration]
+    for start, end in zip(bounds, bounds[1:]):
+        segment = [(t, nodes) for t, nodes in capacity if start <= t < end]
+        if not segment:
+            continue
+        before = next((nodes for t, nodes in reversed(capacity) if t < start), segment[0][1])
+        final = segment[-1][1]
+        last_change = max((t for (t, nodes), (_, previous) in zip(segment[1:], segment) if nodes != previous),
+                          default=start)
+        settling.append(last_change - start)
+        if final >= before:
+            overshoot = max(overshoot, max(nodes for _, nodes in segment) - final)
+        else:
+            overshoot = max(overshoot, final - min(nodes for _, nodes in segment))
+    return (sum(settling) / len(settling) if settling else 0.0), overshoot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', default=['step', 'burst', 'ramp', 'sawtooth'], choices=sorted(STEPS))
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument('--max-nodes', type=int, default=10)
+    parser.add_argument('--pod-usage', type=float, default=1.5,
+                        help="CPU pods use relative to their request; above 1 (bursting towards the 300m limit) "
+                             "CPU saturates before requests do and the controller is what scales")
+    parser.add_argument('--duration', type=float, default=3 * 3600)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"{'scenario':>10} {'variant':>15} " + " ".join(f"{column:>20}" for column in COLUMNS))
+    for name in args.scenarios:
+        for variant in args.variants:
+            report = Simulation(
+                Workload(demand=scenario(name), pod_usage=args.pod_usage), args.duration, max_nodes=args.max_nodes,
+                config_overrides=VARIANTS[variant],
+            ).run()
+            summary = report.summary()
+            summary['settling_s'], summary['overshoot_nodes'] = step_response(
+                report.capacity, STEPS[name], args.duration)
+            print(f"{name:>10} {variant:>15} " + " ".join(
+                f"{round(summary[column], 1):>20}" for column in COLUMNS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Offline evaluation of the CPU trend forecaster.
+
+Replays a CPU utilization trace step by step, feeding the forecaster the same
+window of history the scaler would fetch, and compares when the forecast first
+crossed the scale-up threshold with when the actual CPU did.
+
+Reports, per method:
+  - crossings:      upward crossings of the threshold in the trace
+  - mean/median lead: seconds the forecast fired before each crossing (0 = purely reactive)
+  - false alarms:   forecast alarms not followed by a crossing within the horizon
+
+Traces come from a CSV file (timestamp,value), from a live Prometheus via query_range,
+or are generated synthetically (ramps and spikes with noise) when neither is given.
+
+Usage:
+  python tools/eval_forecast.py
+  python tools/eval_forecast.py --trace cpu.csv
+  python tools/eval_forecast.py --prometheus http://<alb>/prometheus --hours 24
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from forecast import TrendForecaster  # noqa: E402
+
+
+def synthetic_trace(hours=12, step=60, seed=3):
+    """Baseline load with a daily-ish wave, occasional linear ramps and short spikes."""
+    rng = random.Random(seed)
+    timestamps, values = [], []
+    ramp_left, ramp_rate = 0, 0.0
+    offset = 0.0
+
+    for i in range(int(hours * 3600 / step)):
+        t = i * step
+        if ramp_left == 0 and rng.random() < 0.02:
+            ramp_left, ramp_rate = rng.randint(10, 25), rng.uniform(1.5, 4.0)
+        if ramp_left:
+            offset += ramp_rate
+            ramp_left -= 1
+        else:
+            offset *= 0.93  # load recedes after the burst
+
+        wave = 15 * math.sin(2 * math.pi * t / (6 * 3600))
+        value = 35 + wave + offset + rng.gauss(0, 2.5)
+        timestamps.append(float(t))
+        values.append(max(0.0, min(100.0, value)))
+
+    return timestamps, values
+
+
+def load_csv(path):
+    timestamps, values = [], []
+    with open(path) as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#') or row[0] == 'timestamp':
+                continue
+            timestamps.append(float(row[0]))
+            values.append(float(row[1]))
+    return timestamps, values
+
+
+def load_prometheus(url, hours, step):
+    from metrics import PrometheusClient
+
+    client = PrometheusClient(url=url)
+    try:
+        end = time.time()
+        series = client.query_range(PrometheusClient.AVG_CPU_QUERY, end - hours * 3600, end, step, timeout=60)
+    finally:
+        client.close()
+
+    if not series:
+        raise SystemExit("Prometheus returned no CPU history for the requested period.")
+    return list(series[0].timestamps), list(series[0].values)
+
+
+def evaluate(timestamps, values, forecaster, threshold, window, horizon):
+    alarms = []
+    for i in range(len(values)):
+        start = bisect_left(timestamps, timestamps[i] - window)
+        predicted = forecaster.forecast(timestamps[start:i + 1], values[start:i + 1], horizon)
+        alarms.append(predicted is not None and predicted > threshold)
+
+    crossings = [i for i in range(1, len(values)) if values[i] > threshold >= values[i - 1]]
+
+    leads = []
+    for c in crossings:
+        # Walk back through the unbroken run of alarms leading up to the crossing
+        first = c
+        while first > 0 and alarms[first - 1] and values[first - 1] <= threshold:
+            first -= 1
+        leads.append(timestamps[c] - timestamps[first])
+
+    false_alarms = 0
+    for i, alarm in enumerate(alarms):
+        if not alarm or values[i] > threshold:
+            continue
+        end = bisect_left(timestamps, timestamps[i] + horizon)
+        if not any(v > threshold for v in values[i:end + 1]):
+            false_alarms += 1
+
+    return crossings, leads, false_alarms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--trace', help='CSV file of timestamp,value rows')
+    source.add_argument('--prometheus', help='Prometheus base URL to fetch history from')
+    parser.add_argument('--hours', type=float, default=12)
+    parser.add_argument('--step', type=float, default=60, help='Sample spacing in seconds')
+    parser.add_argument('--threshold', type=float, default=70.0)
+    parser.add_argument('--window', type=float, default=float(os.environ.get('FORECAST_WINDOW_SECONDS', 900)))
+    parser.add_argument('--horizon', type=float, default=float(os.environ.get('NODE_READY_SECONDS', 240)))
+    args = parser.parse_args()
+
+    if args.trace:
+        timestamps, values = load_csv(args.trace)
+    elif args.prometheus:
+        timestamps, values = load_prometheus(args.prometheus, args.hours, args.step)
+    else:
+        timestamps, values = synthetic_trace(args.hours, args.step)
+
+    print(f"{len(values)} samples, threshold {args.threshold}%, window {args.window:.0f}s, horizon {args.horizon:.0f}s\n")
+    print(f"{'method':>8} {'crossings':>10} {'mean lead (s)':>14} {'median lead (s)':>16} {'false alarms':>13}")
+    for method in TrendForecaster.METHODS:
+        crossings, leads, false_alarms = evaluate(
+            timestamps, values, TrendForecaster(method=method), args.threshold, args.window, args.horizon
+        )
+        mean_lead = statistics.mean(leads) if leads else 0.0
+        median_lead = statistics.median(leads) if leads else 0.0
+        print(f"{method:>8} {len(crossings):>10} {mean_lead:>14.0f} {median_lead:>16.0f} {false_alarms:>13}")
+
+
+if __name__ == '__main__':
+    main()
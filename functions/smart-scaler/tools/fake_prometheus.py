@@ -0,0 +1,105 @@
+"""
+A minimal stand-in for the Prometheus HTTP API, used by the offline benchmarks.
+
+Every /api/v1/query request sleeps for a fixed latency (to mimic the ALB hop and
+query evaluation) and answers with a single-sample vector (or a flat matrix for
+range queries), unless a canned result was registered for that exact PromQL string.
+/api/v1/rules lists the recording rules named in `recording_rules` as healthy.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # A deep accept backlog, so a burst of parallel connects is not dropped into SYN retries
+    request_queue_size = 128
+
+
+class FakePrometheus:
+    def __init__(self, latency: float = 0.05, value: float = 42.0):
+        self.latency = latency
+        self.value = value
+        self.results = {}
+        self.range_results = {}
+        self.recording_rules = []
+        self.requests_served = 0
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def set_result(self, query: str, result: list):
+        """Registers the raw `data.result` list returned for an exact PromQL string."""
+        self.results[query] = result
+
+    def set_range_result(self, query: str, result: list):
+        """Registers the raw `data.result` list returned by /api/v1/query_range for a PromQL string."""
+        self.range_results[query] = result
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is measurable
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections_opened += 1
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                query = params.get('query', [''])[0]
+                time.sleep(fake.latency)
+                with fake._lock:
+                    fake.requests_served += 1
+
+                if parsed.path.endswith('/rules'):
+                    rules = [{'type': 'recording', 'name': name, 'health': 'ok'} for name in fake.recording_rules]
+                    self._send({'status': 'success', 'data': {'groups': [{'name': 'fake', 'rules': rules}]}})
+                    return
+
+                if parsed.path.endswith('/query_range'):
+                    result_type, result = 'matrix', fake.range_results.get(query)
+                    if result is None:
+                        start, end, step = (float(params[k][0]) for k in ('start', 'end', 'step'))
+                        count = int((end - start) // step) + 1
+                        samples = [[start + i * step, str(fake.value)] for i in range(count)]
+                        result = [{'metric': {'query': query}, 'values': samples}]
+                else:
+                    result_type, result = 'vector', fake.results.get(query)
+                    if result is None:
+                        result = [{'metric': {'query': query}, 'value': [time.time(), str(fake.value)]}]
+
+                self._send({'status': 'success', 'data': {'resultType': result_type, 'result': result}})
+
+            def _send(self, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,108 @@
+"""
+Generates Prometheus recording rules for the scaler's queries.
+
+Every query in src/queries.py that names a `record` becomes one rule, so Prometheus
+precomputes the aggregation on its own schedule and the scaler reads a handful of
+ready-made series instead of scanning every node and pod series each cycle.
+PrometheusClient switches to a recorded series by itself once the rule is loaded.
+
+The rules are written into k8s-manifests/values/prometheus.yaml under
+additionalPrometheusRulesMap, between marker comments; the rest of the file is left as is.
+
+Usage: python tools/recording_rules.py [--check] [--print] [--values PATH] [--interval 30s]
+"""
+import argparse
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import queries  # noqa: E402
+
+DEFAULT_VALUES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'k8s-manifests', 'values', 'prometheus.yaml'
+)
+BEGIN = "  # BEGIN recording rules generated by functions/smart-scaler/tools/recording_rules.py; do not edit by hand"
+END = "  # END recording rules"
+SECTION = "additionalPrometheusRulesMap:"
+
+
+def render(interval: str) -> List[str]:
+    """The generated block, indented to sit under additionalPrometheusRulesMap."""
+    lines = [
+        BEGIN,
+        "  smart-scaler-recording:",
+        "    groups:",
+        "      - name: smart-scaler.recording",
+        f"        interval: {interval}",
+        "        rules:",
+    ]
+    for query in queries.REGISTRY.values():
+        if not query.record:
+            continue
+        lines += [
+            f"          # {query.name}",
+            f"          - record: {query.record}",
+            "            expr: |-",
+            f"              {query.promql}",
+        ]
+    lines.append(END)
+    return lines
+
+
+def splice(text: str, block: List[str]) -> str:
+    """Replaces the generated block in the values file, or adds it under additionalPrometheusRulesMap."""
+    lines = text.splitlines()
+
+    if BEGIN in lines:
+        start = lines.index(BEGIN)
+        end = lines.index(END, start)
+        lines[start:end + 1] = block
+    elif SECTION in lines:
+        at = lines.index(SECTION) + 1
+        lines[at:at] = block + [""]
+    else:
+        if lines and lines[-1].strip():
+            lines.append("")
+        lines += [SECTION] + block
+
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--values', default=os.path.normpath(DEFAULT_VALUES), help="kube-prometheus-stack values file")
+    parser.add_argument('--interval', default='30s', help="rule group evaluation interval")
+    parser.add_argument('--check', action='store_true', help="exit 1 if the values file is not up to date")
+    parser.add_argument('--print', action='store_true', help="print the generated rules instead of writing them")
+    args = parser.parse_args()
+
+    block = render(args.interval)
+    if args.print:
+        print("\n".join(block))
+        return
+
+    try:
+        with open(args.values) as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = ""
+    updated = splice(current, block)
+
+    if args.check:
+        if updated != current:
+            print(f"{args.values} is out of date; run python tools/recording_rules.py", file=sys.stderr)
+            sys.exit(1)
+        print(f"{args.values} is up to date.")
+        return
+
+    if updated != current:
+        with open(args.values, 'w') as f:
+            f.write(updated)
+    rules = sum(1 for query in queries.REGISTRY.values() if query.record)
+    print(f"Wrote {rules} recording rules to {args.values}")
+
+
+if __name__ == '__main__':
+    main()
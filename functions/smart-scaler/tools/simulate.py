@@ -0,0 +1,620 @@
+"""
+Offline replay simulator for the smart-scaler's decision code.
+
+Drives the real SmartScaler (make_decision + apply_decision, exactly as main.handler
+does) against a fake ASG on a virtual clock. Nodes take a configurable time to launch
+and join the cluster, the ASG honours its cooldown, and the workload is closed-loop:
+pods that do not fit on Ready nodes stay pending and CPU is measured against the
+capacity that actually exists.
+
+Demand comes from a CSV trace (timestamp,cpu_percent,pending_pods[,nodes]) recorded
+from the live cluster, or from a built-in synthetic scenario.
+
+Reports:
+  - time-to-capacity: how long each pending-pod episode lasted (mean / max)
+  - node-minutes:     worker capacity paid for over the run
+  - flaps:            scale direction reversals within --flap-window seconds
+  - hot CPU minutes:  time cluster CPU spent above --hot-cpu, i.e. how far capacity lagged a climb
+  - decision cost:    CPU time of make_decision per step (mean / p99)
+
+Pass --max-* thresholds to fail with a non-zero exit code, for use in CI.
+
+Usage:
+  python tools/simulate.py --scenario burst
+  python tools/simulate.py --trace recorded.csv --join-seconds 240 --max-flaps 2
+  python tools/simulate.py --scenario burst --warm-pool 1
+  python tools/simulate.py --scenario ramp --policies cpu --controller pid
+"""
+import argparse
+import csv
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import cycle  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+from config import ScalerConfig  # noqa: E402
+from planner import NodeCapacity  # noqa: E402
+from scaler import SmartScaler  # noqa: E402
+from seasonal import hour_of_week  # noqa: E402
+from signals import ClusterSignals, HpaStatus, NodeState, PodRequest, RangeSeries  # noqa: E402
+from state import SCALE_DOWN, SCALE_UP, ScalerState  # noqa: E402
+
+MIB = 1024 ** 2
+
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@dataclass
+class FakeInstance:
+    instance_id: str
+    private_ip: str
+    launched_at: float
+    state: str = 'Pending'
+    terminate_at: Optional[float] = None
+    # Seconds from launch to InService, and to a Ready Kubernetes node
+    in_service_after: float = 0.0
+    ready_after: float = 0.0
+
+
+class FakeAsg:
+    """
+    Just enough of the autoscaling and EC2 APIs for SmartScaler, on a virtual clock.
+    Instances are Pending for `launch_seconds`, then InService; they become Ready
+    Kubernetes nodes `join_seconds` after that. Terminating instances disappear after
+    `terminate_seconds`. Unrequested shrinks remove the oldest instance, like the real ASG.
+
+    With `warm_pool` set (its minimum size) the ASG keeps a pool of stopped instances, as many as
+    MaxSize minus DesiredCapacity and at least `warm_pool`, each initialized by a full cold launch
+    and bootstrap. A launch takes the pool's longest-initialized instance, which starts in
+    `warm_start_seconds` and is Ready `warm_join_seconds` later (later still if it had not finished
+    initializing); the pool refills behind it.
+    """
+
+    def __init__(self, clock: VirtualClock, desired: int, min_size: int, max_size: int,
+                 launch_seconds: float = 45, join_seconds: float = 180,
+                 terminate_seconds: float = 60, cooldown: float = 300, warm_pool: Optional[int] = None,
+                 warm_start_seconds: float = 20, warm_join_seconds: float = 30):
+        self.clock = clock
+        self.name = 'sim-worker-asg'
+        self.desired = desired
+        self.min_size = min_size
+        self.max_size = max_size
+        self.launch_seconds = launch_seconds
+        self.join_seconds = join_seconds
+        self.terminate_seconds = terminate_seconds
+        self.cooldown = cooldown
+        self.warm_pool = warm_pool
+        self.warm_start_seconds = warm_start_seconds
+        self.warm_join_seconds = warm_join_seconds
+
+        self.instances: List[FakeInstance] = []
+        # When each stopped instance in the warm pool finished (or will finish) initializing
+        self.pool: List[float] = []
+        self.last_activity = -math.inf
+        self.api_calls: Dict[str, int] = {}
+        self._next_id = 0
+
+        # Start from a settled cluster
+        for _ in range(desired):
+            self._launch(ready=True)
+        self._refill_pool(initialized=True)
+
+    # ---- autoscaling API -------------------------------------------------------------------
+
+    def describe_auto_scaling_groups(self, AutoScalingGroupNames):
+        self._count('describe_auto_scaling_groups')
+        warm_pool = {} if self.warm_pool is None else {
+            'WarmPoolConfiguration': {'MinSize': self.warm_pool, 'PoolState': 'Stopped', 'Status': ''},
+            'WarmPoolSize': len(self.pool),
+        }
+        return {'AutoScalingGroups': [{
+            'AutoScalingGroupName': self.name,
+            'DesiredCapacity': self.desired,
+            'MinSize': self.min_size,
+            'MaxSize': self.max_size,
+            'Instances': [
+                {'InstanceId': i.instance_id, 'LifecycleState': i.state, 'HealthStatus': 'Healthy'}
+                for i in self.instances
+            ],
+            **warm_pool,
+        }]}
+
+    def set_desired_capacity(self, AutoScalingGroupName, DesiredCapacity, HonorCooldown=False):
+        self._count('set_desired_capacity')
+        if HonorCooldown and self.clock.now - self.last_activity < self.cooldown:
+            raise ClientError(
+                {'Error': {'Code': 'ScalingActivityInProgress', 'Message': 'Cooldown in progress'}},
+                'SetDesiredCapacity',
+            )
+        self.desired = max(self.min_size, min(self.max_size, DesiredCapacity))
+        self.last_activity = self.clock.now
+
+    def terminate_instance_in_auto_scaling_group(self, InstanceId, ShouldDecrementDesiredCapacity):
+        self._count('terminate_instance_in_auto_scaling_group')
+        instance = next(i for i in self.instances if i.instance_id == InstanceId)
+        self._terminate(instance)
+        if ShouldDecrementDesiredCapacity:
+            self.desired -= 1
+        self.last_activity = self.clock.now
+
+    # ---- EC2 API ---------------------------------------------------------------------------
+
+    def describe_instances(self, InstanceIds):
+        self._count('describe_instances')
+        wanted = set(InstanceIds)
+        return {'Reservations': [{'Instances': [
+            {'InstanceId': i.instance_id, 'PrivateIpAddress': i.private_ip}
+            for i in self.instances if i.instance_id in wanted
+        ]}]}
+
+    # ---- simulation ------------------------------------------------------------------------
+
+    def tick(self):
+        now = self.clock.now
+        self.instances = [i for i in self.instances if i.terminate_at is None or i.terminate_at > now]
+
+        for instance in self.instances:
+            if instance.state == 'Pending' and now - instance.launched_at >= instance.in_service_after:
+                instance.state = 'InService'
+
+        live = [i for i in self.instances if i.terminate_at is None]
+        for _ in range(self.desired - len(live)):
+            self._launch()
+        for instance in sorted(live, key=lambda i: i.launched_at)[:max(len(live) - self.desired, 0)]:
+            self._terminate(instance)
+        self._refill_pool()
+
+    def ready_nodes(self) -> List[FakeInstance]:
+        return [
+            i for i in self.instances
+            if i.state == 'InService' and self.clock.now - i.launched_at >= i.ready_after
+        ]
+
+    def billed_nodes(self) -> int:
+        return len(self.instances)
+
+    def _launch(self, ready: bool = False):
+        self._next_id += 1
+        in_service_after, ready_after = self.launch_seconds, self.launch_seconds + self.join_seconds
+        if self.pool and not ready:
+            # Promote the instance that has been initializing longest
+            initialized_at = self.pool.pop(0)
+            in_service_after = self.warm_start_seconds
+            ready_after = self.warm_start_seconds + self.warm_join_seconds + max(initialized_at - self.clock.now, 0)
+        self.instances.append(FakeInstance(
+            instance_id=f"i-{self._next_id:04x}",
+            private_ip=f"10.0.2.{self._next_id % 250 + 2}",
+            launched_at=self.clock.now - (ready_after if ready else 0),
+            state='InService' if ready else 'Pending',
+            in_service_after=in_service_after,
+            ready_after=ready_after,
+        ))
+
+    def _refill_pool(self, initialized: bool = False):
+        """Tops the warm pool up to its size, or trims the instances initialized last off it."""
+        if self.warm_pool is None:
+            return
+        size = max(self.warm_pool, self.max_size - self.desired)
+        while len(self.pool) < size:
+            self.pool.append(-math.inf if initialized else self.clock.now + self.launch_seconds + self.join_seconds)
+        del self.pool[size:]
+
+    def _terminate(self, instance: FakeInstance):
+        instance.state = 'Terminating'
+        instance.terminate_at = self.clock.now + self.terminate_seconds
+
+    def _count(self, call: str):
+        self.api_calls[call] = self.api_calls.get(call, 0) + 1
+
+
+@dataclass
+class Workload:
+    """
+    Closed-loop demand model. `demand(t)` is the CPU (cores) the services want to use.
+    Pods run at `pod_usage` of their CPU request, as the HPAs hold them at ~70%.
+
+    By default pods appear the moment demand asks for them. With `hpa_max_replicas` set they come
+    from an HPA instead, which adds at most `hpa_step_pods` replicas per `hpa_period` seconds up to
+    its max; until they exist, the running pods absorb the demand up to their CPU request.
+    """
+    demand: Callable[[float], float]
+    pod_cpu: float = 0.1
+    pod_memory: float = 128 * MIB
+    pod_usage: float = 0.7
+    baseline_cpu: float = 5.0
+
+    hpa_max_replicas: Optional[int] = None
+    hpa_step_pods: int = 2
+    hpa_period: float = 30.0
+
+    def pods_wanted(self, t: float) -> int:
+        return max(1, math.ceil(self.demand(t) / (self.pod_cpu * self.pod_usage)))
+
+
+@dataclass
+class SimulationReport:
+    steps: int = 0
+    decisions: int = 0
+    rejected: int = 0
+    scale_ups: int = 0
+    scale_downs: int = 0
+    flaps: int = 0
+    node_minutes: float = 0.0
+    pending_pod_minutes: float = 0.0
+    hot_cpu_minutes: float = 0.0
+    time_to_capacity: List[float] = field(default_factory=list)
+    decision_cost: List[float] = field(default_factory=list)
+    api_calls: Dict[str, int] = field(default_factory=dict)
+    # (time, desired capacity) after every decision
+    capacity: List[Tuple[float, int]] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, float]:
+        costs = sorted(self.decision_cost)
+        return {
+            'decisions': self.decisions,
+            'scale_ups': self.scale_ups,
+            'scale_downs': self.scale_downs,
+            'rejected_by_cooldown': self.rejected,
+            'flaps': self.flaps,
+            'node_minutes': round(self.node_minutes, 1),
+            'pending_pod_minutes': round(self.pending_pod_minutes, 1),
+            'hot_cpu_minutes': round(self.hot_cpu_minutes, 1),
+            'capacity_episodes': len(self.time_to_capacity),
+            'time_to_capacity_mean_s': round(statistics.mean(self.time_to_capacity), 1) if self.time_to_capacity else 0.0,
+            'time_to_capacity_max_s': round(max(self.time_to_capacity), 1) if self.time_to_capacity else 0.0,
+            'decision_cost_mean_us': round(statistics.mean(costs) * 1e6, 1) if costs else 0.0,
+            'decision_cost_p99_us': round(costs[min(len(costs) - 1, int(len(costs) * 0.99))] * 1e6, 1) if costs else 0.0,
+        }
+
+
+class Simulation:
+    def __init__(self, workload: Workload, duration: float, min_nodes: int = 2, max_nodes: int = 5,
+                 initial_nodes: int = 3, interval: float = 60, tick: float = 10, flap_window: float = 600,
+                 hot_cpu: float = 70.0,
+                 history_window: float = 900, instance_type: str = 't3.medium',
+                 launch_seconds: float = 45, join_seconds: float = 180, cooldown: float = 300,
+                 warm_pool: Optional[int] = None, warm_start_seconds: float = 20, warm_join_seconds: float = 30,
+                 scaler_factory: Optional[Callable[[ScalerConfig, FakeAsg], SmartScaler]] = None,
+                 config_overrides: Optional[Mapping[str, Any]] = None, state: Optional[ScalerState] = None,
+                 requested_history: Sequence[Tuple[float, float]] = ()):
+        self.workload = workload
+        self.duration = duration
+        self.interval = interval
+        self.tick_seconds = tick
+        self.flap_window = flap_window
+        self.hot_cpu = hot_cpu
+        self.history_window = history_window
+
+        self.clock = VirtualClock()
+        self.asg = FakeAsg(self.clock, initial_nodes, min_nodes, max_nodes,
+                           launch_seconds=launch_seconds, join_seconds=join_seconds, cooldown=cooldown,
+                           warm_pool=warm_pool, warm_start_seconds=warm_start_seconds,
+                           warm_join_seconds=warm_join_seconds)
+        self.capacity = NodeCapacity.for_instance_type(instance_type)
+
+        config = ScalerConfig(
+            asg_name=self.asg.name, prometheus_url=None, dynamo_table=None,
+            min_nodes=min_nodes, max_nodes=max_nodes, worker_instance_type=instance_type,
+            node_ready_seconds=launch_seconds + join_seconds,
+            warm_node_ready_seconds=warm_start_seconds + warm_join_seconds,
+        )
+        if config_overrides:
+            config = replace(config, **config_overrides)
+        factory = scaler_factory or (lambda cfg, asg: SmartScaler(config=cfg, asg_client=asg, ec2_client=asg))
+        self.scaler = factory(config, self.asg)
+
+        self._cpu_samples: List[Tuple[float, float]] = []
+        # What the lock item holds when the run starts, e.g. a trained seasonal model
+        self.initial_state = state or ScalerState()
+        # (time, requested CPU cores), as the seasonal model reads it from Prometheus; seeded with
+        # `requested_history` from before the run and sampled at every decision
+        self._requested: List[Tuple[float, float]] = list(requested_history)
+
+        # HPA model state: replicas, when the last step was taken, and recent (time, replicas) for growth
+        self._replicas = workload.pods_wanted(0)
+        self._hpa_stepped_at = -math.inf
+        self._replica_history: List[Tuple[float, int]] = []
+
+    def observe(self) -> Tuple[ClusterSignals, int]:
+        """Builds the signals Prometheus would report right now. Returns them with the pending count."""
+        t = self.clock.now
+        ready = self.asg.ready_nodes()
+        per_node = int(self.capacity.cpu // self.workload.pod_cpu)
+
+        wanted = self.workload.pods_wanted(t)
+        replicas = self._hpa_replicas(t, wanted)
+        scheduled = min(replicas, per_node * len(ready))
+        pending = replicas - scheduled
+
+        used = scheduled * self.workload.pod_cpu * self.workload.pod_usage
+        if self.workload.hpa_max_replicas is not None:
+            used = min(self.workload.demand(t), scheduled * self.workload.pod_cpu)
+        total = len(ready) * self.capacity.cpu
+        cpu = min(100.0, self.workload.baseline_cpu + (used / total * 100 if total else 100.0))
+
+        nodes = []
+        for index, instance in enumerate(ready):
+            count = scheduled // len(ready) + (1 if index < scheduled % len(ready) else 0)
+            pods = tuple(
+                PodRequest(namespace='development', pod=f"{instance.instance_id}-{n}",
+                           cpu=self.workload.pod_cpu, memory=self.workload.pod_memory, workload='sim-service')
+                for n in range(count)
+            )
+            nodes.append(NodeState(
+                name=f"ip-{instance.private_ip.replace('.', '-')}", internal_ip=instance.private_ip,
+                allocatable_cpu=self.capacity.cpu, allocatable_memory=self.capacity.memory, pods=pods,
+                cpu_usage=count * self.workload.pod_cpu * self.workload.pod_usage,
+            ))
+
+        pending_requests = tuple(
+            PodRequest(namespace='development', pod=f"pending-{n}",
+                       cpu=self.workload.pod_cpu, memory=self.workload.pod_memory, workload='sim-service')
+            for n in range(pending)
+        )
+
+        self._cpu_samples.append((t, cpu))
+        history = [(ts, v) for ts, v in self._cpu_samples if ts >= t - self.history_window]
+        self._cpu_samples = history
+
+        hpas = ()
+        if self.workload.hpa_max_replicas is not None:
+            hpas = (HpaStatus(
+                namespace='development', name='sim-hpa', workload='sim-service',
+                current_replicas=replicas, desired_replicas=replicas, max_replicas=self.workload.hpa_max_replicas,
+                pod_cpu=self.workload.pod_cpu, pod_memory=self.workload.pod_memory,
+                recent_growth=replicas - self._replica_history[0][1],
+                limited=min(wanted, self.workload.hpa_max_replicas) > replicas,
+            ),)
+
+        signals = ClusterSignals(
+            cpu_utilization=cpu, pending_pods=pending, pending_requests=pending_requests, nodes=tuple(nodes),
+            hpas=hpas,
+            cpu_history=RangeSeries(
+                labels={}, timestamps=array('d', (ts for ts, _ in history)), values=array('d', (v for _, v in history))
+            ),
+        )
+        return signals, pending
+
+    def requested_range(self, start: float, end: float, step: float) -> Optional[RangeSeries]:
+        """The recorded requested CPU between `start` and `end`, like the range query it stands in for."""
+        samples = [(t, cores) for t, cores in self._requested if start <= t <= end]
+        if not samples:
+            return None
+        return RangeSeries(labels={}, timestamps=array('d', (t for t, _ in samples)),
+                           values=array('d', (cores for _, cores in samples)))
+
+    def _hpa_replicas(self, t: float, wanted: int) -> int:
+        """Replicas the workload runs at `t`: what demand wants, or what the HPA has reached so far."""
+        workload = self.workload
+        if workload.hpa_max_replicas is None:
+            return wanted
+
+        target = min(wanted, workload.hpa_max_replicas)
+        if target > self._replicas and t - self._hpa_stepped_at >= workload.hpa_period:
+            self._replicas = min(target, self._replicas + workload.hpa_step_pods)
+            self._hpa_stepped_at = t
+        elif target < self._replicas:
+            self._replicas = target
+
+        # Growth is measured over the same two minutes as the scaler's query
+        self._replica_history = [(ts, r) for ts, r in self._replica_history if ts >= t - 120] + [(t, self._replicas)]
+        return self._replicas
+
+    def run(self) -> SimulationReport:
+        report = SimulationReport()
+        last_direction, last_action_at = 0, -math.inf
+        pending_since: Optional[float] = None
+        next_decision = 0.0
+        # Carried between decisions the way the lock item carries it between invocations
+        state = self.initial_state
+
+        while self.clock.now <= self.duration:
+            self.asg.tick()
+            signals, pending = self.observe()
+
+            if pending and pending_since is None:
+                pending_since = self.clock.now
+            elif not pending and pending_since is not None:
+                report.time_to_capacity.append(self.clock.now - pending_since)
+                pending_since = None
+
+            report.node_minutes += self.asg.billed_nodes() * self.tick_seconds / 60
+            report.pending_pod_minutes += pending * self.tick_seconds / 60
+            if signals.cpu_utilization is not None and signals.cpu_utilization > self.hot_cpu:
+                report.hot_cpu_minutes += self.tick_seconds / 60
+
+            if self.clock.now >= next_decision:
+                next_decision += self.interval
+                report.decisions += 1
+
+                snapshot = self.scaler.describe_asg()
+                started = time.process_time()
+                state = state.observe(self.clock.now, signals.cpu_utilization)
+                self._requested.append((self.clock.now, (pending + sum(len(n.pods) for n in signals.nodes))
+                                        * self.workload.pod_cpu))
+                state = cycle.learn(self.scaler, self.requested_range, state, self.clock.now)
+                decision = self.scaler.make_decision(signals, snapshot, state, self.clock.now)
+                report.decision_cost.append(time.process_time() - started)
+
+                direction = (decision.target_capacity > snapshot.desired_capacity) - \
+                            (decision.target_capacity < snapshot.desired_capacity)
+                if direction:
+                    try:
+                        self.scaler.apply_decision(decision)
+                    except ClientError:
+                        report.rejected += 1
+                    else:
+                        state = state.acted(self.clock.now, SCALE_UP if direction > 0 else SCALE_DOWN,
+                                            decision.target_capacity)
+                        if direction > 0:
+                            report.scale_ups += 1
+                        else:
+                            report.scale_downs += 1
+                        if last_direction and direction != last_direction and \
+                                self.clock.now - last_action_at <= self.flap_window:
+                            report.flaps += 1
+                        last_direction, last_action_at = direction, self.clock.now
+
+                report.capacity.append((self.clock.now, self.asg.desired))
+
+            report.steps += 1
+            self.clock.advance(self.tick_seconds)
+
+        if pending_since is not None:
+            report.time_to_capacity.append(self.clock.now - pending_since)
+        report.api_calls = dict(self.asg.api_calls)
+        return report
+
+
+# ---- demand sources --------------------------------------------------------------------------
+
+def scenario(name: str, seed: int = 11) -> Callable[[float], float]:
+    """Synthetic demand curves, in CPU cores."""
+    rng = random.Random(seed)
+    noise = [rng.gauss(0, 0.05) for _ in range(10_000)]
+
+    def jitter(t):
+        return noise[int(t // 60) % len(noise)]
+
+    if name == 'burst':
+        # Quiet cluster, a sudden 4x burst for 40 minutes, then back to quiet
+        return lambda t: max(0.1, (3.6 if 1800 <= t < 4200 else 0.9) + jitter(t))
+    if name == 'ramp':
+        # Steady climb over an hour, plateau, then a slow decline
+        return lambda t: max(0.1, 0.8 + min(t, 3600) / 3600 * 3.0 - max(t - 5400, 0) / 3600 * 3.0 + jitter(t))
+    if name == 'step':
+        # Sustained 6x step at 30 minutes, back down at 90: the controller benchmark's input
+        return lambda t: max(0.1, (5.4 if 1800 <= t < 5400 else 0.9) + jitter(t))
+    if name == 'sawtooth':
+        # Repeating 15-minute spikes: a flapping stress test
+        return lambda t: max(0.1, (2.8 if (t // 900) % 2 else 1.0) + jitter(t))
+    if name == 'weekly':
+        # Office hours in UTC on epoch time (t = 0 is a Thursday midnight): weekdays jump to 4.2 cores
+        # at 08:00 with a lunchtime dip, weekends peak gently around midday, nights are quiet
+        def weekly(t):
+            weekday, hour = hour_of_week(t) // 24, t % 86400 / 3600
+            if weekday < 5 and 8 <= hour < 18:
+                level = 3.2 if 12 <= hour < 13 else 4.2
+            elif weekday >= 5 and 10 <= hour < 16:
+                level = 1.4
+            else:
+                level = 0.8
+            return max(0.1, level + jitter(t))
+        return weekly
+    raise ValueError(f"Unknown scenario {name!r}")
+
+
+def trace_demand(path: str, capacity: NodeCapacity, pod_cpu: float, pod_usage: float) -> Tuple[Callable[[float], float], float]:
+    """
+    Converts a recorded trace into demand. Each row is timestamp,cpu_percent,pending_pods[,nodes];
+    demand = CPU in use on the recorded nodes + CPU the pending pods would have used.
+    Returns the step-wise demand function and the trace duration.
+    """
+    points = []
+    with open(path) as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#') or row[0] == 'timestamp':
+                continue
+            t, cpu, pending = float(row[0]), float(row[1]), float(row[2])
+            nodes = float(row[3]) if len(row) > 3 and row[3] else 3
+            points.append((t, cpu / 100 * nodes * capacity.cpu + pending * pod_cpu * pod_usage))
+
+    start = points[0][0]
+    times = [t - start for t, _ in points]
+    values = [v for _, v in points]
+
+    def demand(t):
+        return values[max(0, bisect_right(times, t) - 1)]
+
+    return demand, times[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--scenario', default='burst', choices=['burst', 'ramp', 'sawtooth', 'step', 'weekly'])
+    source.add_argument('--trace', help='CSV of timestamp,cpu_percent,pending_pods[,nodes]')
+    parser.add_argument('--duration', type=float, default=3 * 3600, help='Seconds to simulate (scenarios only)')
+    parser.add_argument('--interval', type=float, default=60, help='Seconds between scaler runs')
+    parser.add_argument('--min-nodes', type=int, default=2)
+    parser.add_argument('--max-nodes', type=int, default=5)
+    parser.add_argument('--initial-nodes', type=int, default=3)
+    parser.add_argument('--launch-seconds', type=float, default=45)
+    parser.add_argument('--join-seconds', type=float, default=180)
+    parser.add_argument('--cooldown', type=float, default=300)
+    parser.add_argument('--warm-pool', type=int, help='Minimum size of an ASG warm pool of stopped, initialized workers')
+    parser.add_argument('--warm-start-seconds', type=float, default=20)
+    parser.add_argument('--warm-join-seconds', type=float, default=30)
+    parser.add_argument('--policies', default='smart',
+                        help="SCALING_POLICIES to run: 'smart', 'legacy' or a comma-separated list of policies")
+    parser.add_argument('--controller', choices=['threshold', 'pid'], help='CAPACITY_CONTROLLER to run')
+    parser.add_argument('--flap-window', type=float, default=600)
+    parser.add_argument('--hot-cpu', type=float, default=70.0, help='Cluster CPU %% counted towards hot CPU minutes')
+    parser.add_argument('--max-flaps', type=int, help='Fail if more flaps than this')
+    parser.add_argument('--max-time-to-capacity', type=float, help='Fail if any episode lasts longer (seconds)')
+    parser.add_argument('--max-node-minutes', type=float, help='Fail if more node-minutes are consumed')
+    parser.add_argument('--max-hot-cpu-minutes', type=float, help='Fail if CPU stays above --hot-cpu for longer')
+    parser.add_argument('--verbose', action='store_true', help="Show the scaler's own log output")
+    args = parser.parse_args()
+
+    # Cooldown rejections are expected here and counted in the report
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    capacity = NodeCapacity.for_instance_type('t3.medium')
+    if args.trace:
+        demand, duration = trace_demand(args.trace, capacity, pod_cpu=0.1, pod_usage=0.7)
+    else:
+        demand, duration = scenario(args.scenario), args.duration
+
+    overrides: Dict[str, Any] = {'scaling_policies': tuple(name.strip() for name in args.policies.split(','))}
+    if args.controller:
+        overrides['capacity_controller'] = args.controller
+
+    report = Simulation(
+        Workload(demand=demand), duration,
+        min_nodes=args.min_nodes, max_nodes=args.max_nodes, initial_nodes=args.initial_nodes,
+        interval=args.interval, flap_window=args.flap_window, hot_cpu=args.hot_cpu,
+        launch_seconds=args.launch_seconds, join_seconds=args.join_seconds, cooldown=args.cooldown,
+        warm_pool=args.warm_pool, warm_start_seconds=args.warm_start_seconds, warm_join_seconds=args.warm_join_seconds,
+        config_overrides=overrides,
+    ).run()
+
+    for key, value in report.summary().items():
+        print(f"{key:>26}: {value}")
+    print(f"{'aws_api_calls':>26}: {report.api_calls}")
+
+    failures = []
+    summary = report.summary()
+    if args.max_flaps is not None and summary['flaps'] > args.max_flaps:
+        failures.append(f"flaps {summary['flaps']} > {args.max_flaps}")
+    if args.max_time_to_capacity is not None and summary['time_to_capacity_max_s'] > args.max_time_to_capacity:
+        failures.append(f"time-to-capacity {summary['time_to_capacity_max_s']}s > {args.max_time_to_capacity}s")
+    if args.max_node_minutes is not None and summary['node_minutes'] > args.max_node_minutes:
+        failures.append(f"node-minutes {summary['node_minutes']} > {args.max_node_minutes}")
+    if args.max_hot_cpu_minutes is not None and summary['hot_cpu_minutes'] > args.max_hot_cpu_minutes:
+        failures.append(f"hot CPU minutes {summary['hot_cpu_minutes']} > {args.max_hot_cpu_minutes}")
+
+    if failures:
+        print(f"\nFAILED: {'; '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
 import os
+import gzip
 import json
 import pulumi
 import base64
 import pulumi_aws as aws
+from urllib.parse import quote
 
 # Initialize the configuration object
 config = pulumi.Config()
@@ -18,6 +20,18 @@ common_project_name = config.require('common-project-name')
 master_project_name = config.require('master-project-name')
 min_nodes = int(config.require("min-nodes"))
 max_nodes = int(config.require("max-nodes"))
+# Stopped workers the ASG keeps initialized and starts instead of launching cold ones; 0 disables the pool
+warm_pool_size = int(config.get("warm-pool-size") or 0)
+# k3s release the workers run, served from the cluster bucket; keep it no newer than the master's
+k3s_version = config.require("k3s-version")
+# SHA-256 of that release's install.sh, which the release checksums do not cover; workers refuse any other
+# installer. Update it with the version:
+#   curl -sfL https://raw.githubusercontent.com/k3s-io/k3s/<version>/install.sh | sha256sum
+k3s_install_sha256 = config.require("k3s-install-sha256")
+
+# Shared secret Alertmanager presents to the scaler's webhook (pulumi config set --secret scaler-webhook-token ...)
+# The fast path stays disabled until it is set
+scaler_webhook_token = config.get_secret("scaler-webhook-token") or ""
 
 # Construct the reference string to access exported variables from common project
 common_ref_name = f"{current_org}/{common_project_name}/{current_stack}"
@@ -43,17 +57,45 @@ alb_dns_name = master_ref.get_output("alb_dns")
 # Get the directory where __main__.py is located
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Construct the path to the script relative to THIS file
-script_path = os.path.join(current_dir, "scripts", "join_cluster.sh")
+# Construct the path to the bootstrap agent relative to THIS file
+script_path = os.path.join(current_dir, "scripts", "bootstrap.py")
 
 with open(script_path, 'r') as f:
     user_data_script = f.read()
 
+# The launch lifecycle hook the bootstrap completes once the instance is prepared (warm pool) or joined (in service)
+worker_bootstrap_hook_name = "worker-bootstrap"
+
+# Pin the k3s release in the cluster bucket, so workers neither reach the internet nor pick up a new release
+# while booting. Pulumi fetches each file once, when the version changes; the agent checks the binary and
+# images against the release's checksums and the installer against k3s-install-sha256.
+release_url = f"https://github.com/k3s-io/k3s/releases/download/{quote(k3s_version)}"
+k3s_artifacts = [
+    aws.s3.BucketObject(
+        f"k3s-artifact-{name}",
+        bucket=s3_bucket_id,
+        key=f"artifacts/k3s/{k3s_version}/{name}",
+        source=pulumi.RemoteAsset(url),
+    )
+    for name, url in {
+        "k3s": f"{release_url}/k3s",
+        "k3s-airgap-images-amd64.tar.zst": f"{release_url}/k3s-airgap-images-amd64.tar.zst",
+        "sha256sum-amd64.txt": f"{release_url}/sha256sum-amd64.txt",
+        "install.sh": f"https://raw.githubusercontent.com/k3s-io/k3s/{quote(k3s_version)}/install.sh",
+    }.items()
+]
+
 # Encoding it for the AWS Launch Template
+# Gzipped, as the agent is larger than the 16 KB user data limit; cloud-init unpacks it
 worker_user_data = s3_bucket_id.apply(
-    lambda name: base64.b64encode(
-        user_data_script.replace("REPLACE_ME_BUCKET_NAME", name).encode('utf-8')
-    ).decode('utf-8')
+    lambda name: base64.b64encode(gzip.compress(
+        user_data_script
+        .replace("REPLACE_ME_BUCKET_NAME", name)
+        .replace("REPLACE_ME_K3S_VERSION", k3s_version)
+        .replace("REPLACE_ME_LIFECYCLE_HOOK", worker_bootstrap_hook_name)
+        .replace("REPLACE_ME_INSTALLER_SHA256", k3s_install_sha256)
+        .encode('utf-8')
+    )).decode('utf-8')
 )
 
 # Create a launch Template (The Blueprints for the worker nodes)
@@ -75,6 +117,8 @@ worker_launch_template = aws.ec2.LaunchTemplate(
         ),
     )],
     user_data=worker_user_data,
+    # Instances launched from it read the artifacts as soon as they boot
+    opts=pulumi.ResourceOptions(depends_on=k3s_artifacts),
 )
 
 # Create the Auto Scaling Group
@@ -91,8 +135,15 @@ worker_asg = aws.autoscaling.Group("worker-asg",
     health_check_type="EC2",
     health_check_grace_period=600,
     capacity_rebalance=True,
-    termination_policies=["OldestInstance"], # Predictable termination
+    termination_policies=["OldestInstance"], # Only for ASG-initiated terminations; the smart-scaler terminates the node it drained
     enabled_metrics=["GroupMinSize", "GroupMaxSize", "GroupDesiredCapacity"],
+    # Instances in the pool have run the prepare phase of the bootstrap agent and are stopped, paying only for
+    # their volumes; a scale-up starts one and it only has to join. The pool holds MaxSize - DesiredCapacity
+    # instances, at least warm-pool-size, and the smart-scaler reads its size to expect the faster join.
+    warm_pool=aws.autoscaling.GroupWarmPoolArgs(
+        pool_state="Stopped",
+        min_size=warm_pool_size,
+    ) if warm_pool_size > 0 else None,
     tags=[{
         "key": "Name",
         "value": "k3s-worker-node",
@@ -100,6 +151,36 @@ worker_asg = aws.autoscaling.Group("worker-asg",
     }]
 )
 
+# Keeps a launching instance Pending until the bootstrap reports it prepared or joined, so the ASG does not
+# stop a warm-pool instance halfway through its preparation or count a worker in service before it joins
+aws.autoscaling.LifecycleHook("worker-bootstrap-hook",
+    name=worker_bootstrap_hook_name,
+    autoscaling_group_name=worker_asg.name,
+    default_result="CONTINUE",
+    heartbeat_timeout=600, # As long as the health check grace period
+    lifecycle_transition="autoscaling:EC2_INSTANCE_LAUNCHING",
+)
+
+# Lets the bootstrap on each worker find its ASG and complete the hook
+aws.iam.RolePolicy("worker-bootstrap-policy",
+    role=cluster_node_role_name,
+    policy=worker_asg.arn.apply(lambda arn: json.dumps({
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Action": ["autoscaling:CompleteLifecycleAction"],
+                "Resource": arn
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["autoscaling:DescribeAutoScalingInstances"],
+                "Resource": "*"
+            }
+        ]
+    }))
+)
+
 # Without it the asg will kill the node immediately
 # Pauses the Ec2 destruction
 # termination_hook = aws.autoscaling.LifecycleHook("termination-hook",
@@ -184,6 +265,9 @@ scaling_lambda = aws.lambda_.Function("cluster-autoscaler",
     role=lambda_role.arn,
     runtime="python3.11",
     handler="main.handler", # The auto-scaling repo must use this filename/function
+    # Must stay under the scaling lease (LOCK_LEASE_SECONDS, 120s by default) so a timed-out run's lease
+    # lapses before the next one; the handler renews the lease before touching the ASG
+    timeout=60,
     # This creates a dummy 'main.py' so Pulumi can finish without the local files
     code=pulumi.AssetArchive({
         "main.py": pulumi.StringAsset("def handler(event, context): print('Placeholder code')")
@@ -196,10 +280,55 @@ scaling_lambda = aws.lambda_.Function("cluster-autoscaler",
             "ASG_NAME": worker_asg.name,
             "MIN_NODES": min_nodes,
             "MAX_NODES": max_nodes,
+            "WORKER_INSTANCE_TYPE": worker_instance_type,
+            "EMIT_EMF_METRICS": "true",
+            "WEBHOOK_TOKEN": scaler_webhook_token,
+            # Lets a rebuilt Prometheus client reuse results from the same time bucket
+            "QUERY_CACHE_SPILL_PATH": "/tmp/smart-scaler-query-cache.json",
         }
     }
 )
 
+# Alertmanager posts scale-up alerts here so the scaler reacts without waiting for the next scheduled run.
+# Alertmanager cannot sign requests with SigV4, so the URL is public and the handler checks the bearer token.
+scaler_webhook_url = aws.lambda_.FunctionUrl("scaler-webhook-url",
+    function_name=scaling_lambda.name,
+    authorization_type="NONE",
+)
+
+aws.lambda_.Permission("scaler-webhook-invoke",
+    action="lambda:InvokeFunctionUrl",
+    function=scaling_lambda.name,
+    principal="*",
+    function_url_auth_type="NONE",
+)
+
+# Lets the in-cluster scaler daemon on the master (ansible role smart-scaler-daemon) do what the Lambda does.
+# The node role is shared with the workers, so this is scoped to the scaling table and the worker ASG.
+aws.iam.RolePolicy("scaler-daemon-policy",
+    role=cluster_node_role_name,
+    policy=pulumi.Output.all(scaling_table.arn, worker_asg.arn).apply(lambda arns: json.dumps({
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Action": ["dynamodb:UpdateItem", "dynamodb:GetItem"],
+                "Resource": arns[0]
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["autoscaling:SetDesiredCapacity", "autoscaling:TerminateInstanceInAutoScalingGroup"],
+                "Resource": arns[1]
+            },
+            {
+                "Effect": "Allow",
+                "Action": ["autoscaling:DescribeAutoScalingGroups", "ec2:DescribeInstances"],
+                "Resource": "*"
+            }
+        ]
+    }))
+)
+
 # Policy required by EBS CSI
 ebs_csi_policy = aws.iam.Policy(
     "AmazonEBSCSIDriverPolicy",
@@ -238,7 +367,10 @@ aws.iam.RolePolicyAttachment(
 )
 
 
+pulumi.export("worker_asg_name", worker_asg.name)
 pulumi.export("dynamo_table", scaling_table.name)
 pulumi.export("lambda_function_name", scaling_lambda.name)
+pulumi.export("scaler_webhook_url", scaler_webhook_url.function_url)
+pulumi.export("scaler_webhook_token", pulumi.Output.secret(scaler_webhook_token))
 pulumi.export("ebs_csi_policy_arn", ebs_csi_policy.arn)
 # pulumi.export("nth_queue_url", nth_queue.id)
\ No newline at end of file
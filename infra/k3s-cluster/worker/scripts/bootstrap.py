@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Worker bootstrap agent. infra/k3s-cluster/worker/__main__.py renders it into the launch template user
+data and cloud-init runs it once, on the first boot. Standard library only, so nothing has to be
+installed before it can start.
+
+The k3s binary, its airgap images and the installer come from pinned artifacts in the cluster bucket,
+read with the instance profile's credentials. The work is split for the ASG warm pool:
+  prepare: the artifacts, downloaded concurrently and checked against the release checksums (the
+           installer, which the release does not sum, against the digest pinned in the stack config),
+           the k3s agent installed but not started, and the k3s-join unit that joins on the next boot
+  join:    waits for cluster_info, backing off exponentially, and starts the agent
+An instance launched straight into service does both, waiting for cluster_info alongside the downloads.
+One bound for the warm pool only prepares, and is joined by the k3s-join unit when the ASG starts it on
+promotion. Each run completes the ASG's launch lifecycle hook and writes a per-step timing report to
+/var/lib/k3s-bootstrap/timing-<phase>.json.
+
+Usage: bootstrap.py [boot|join] [--root DIR] [--imds-url URL] [--endpoint-url URL]
+scripts/local_bootstrap.py runs it against fake AWS endpoints and a fake installer.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
+
+# Replaced by infra/k3s-cluster/worker/__main__.py when it renders the user data
+SETTINGS = {
+    'bucket': 'REPLACE_ME_BUCKET_NAME',
+    'k3s_version': 'REPLACE_ME_K3S_VERSION',
+    'lifecycle_hook': 'REPLACE_ME_LIFECYCLE_HOOK',
+    'installer_sha256': 'REPLACE_ME_INSTALLER_SHA256',
+    'arch': 'amd64',
+}
+
+# Bucket prefix of the pinned release files, uploaded by the worker stack
+ARTIFACTS_PREFIX = 'artifacts/k3s'
+
+K3S_BINARY = '/usr/local/bin/k3s'
+IMAGES_DIR = '/var/lib/rancher/k3s/agent/images'
+INSTALLER = '/usr/local/sbin/k3s-install.sh'
+BOOTSTRAP = '/usr/local/sbin/k3s-bootstrap'
+JOIN_UNIT = '/etc/systemd/system/k3s-join.service'
+# Holds the joined marker and the timing reports
+STATE_DIR = '/var/lib/k3s-bootstrap'
+LOG_FILE = '/var/log/k3s-install.log'
+
+logger = logging.getLogger('k3s-bootstrap')
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Seconds before retry `attempt` (from 0): doubling from `base` up to `cap`, jittered over its upper half."""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Imds:
+    """IMDSv2: instance identity, the ASG's target lifecycle state and the instance profile's credentials."""
+
+    def __init__(self, url: str = 'http://169.254.169.254'):
+        self.url = url.rstrip('/')
+        self._token: Optional[str] = None
+        self._credentials: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> str:
+        with self._lock:
+            if self._token is None:
+                request = urllib.request.Request(f"{self.url}/latest/api/token", method='PUT',
+                                                 headers={'X-aws-ec2-metadata-token-ttl-seconds': '21600'})
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    self._token = response.read().decode()
+        request = urllib.request.Request(f"{self.url}/latest/meta-data/{path}",
+                                         headers={'X-aws-ec2-metadata-token': self._token})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read().decode()
+
+    def credentials(self) -> Dict[str, str]:
+        """The instance profile's temporary credentials, fetched again five minutes before they expire."""
+        credentials = self._credentials
+        if credentials is None or _expires_in(credentials) < 300:
+            role = self.get('iam/security-credentials/').split()[0]
+            credentials = self._credentials = json.loads(self.get(f'iam/security-credentials/{role}'))
+        return credentials
+
+
+def _expires_in(credentials: Dict[str, str]) -> float:
+    expiration = datetime.strptime(credentials['Expiration'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    return expiration.timestamp() - time.time()
+
+
+def sign(method: str, url: str, region: str, service: str, credentials: Dict[str, str],
+         body: bytes = b'', headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Headers for a request signed with AWS Signature Version 4; `url` must already be URI-encoded."""
+    parsed = urllib.parse.urlsplit(url)
+    amz_date = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    payload_hash = hashlib.sha256(body).hexdigest()
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    headers.update({'host': parsed.netloc, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash})
+    if credentials.get('Token'):
+        headers['x-amz-security-token'] = credentials['Token']
+
+    signed_headers = ';'.join(sorted(headers))
+    query = '&'.join(sorted(
+        f"{urllib.parse.quote(key, safe='-_.~')}={urllib.parse.quote(value, safe='-_.~')}"
+        for key, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+    ))
+    canonical_request = '\n'.join([
+        method, parsed.path or '/', query,
+        ''.join(f"{key}:{str(headers[key]).strip()}\n" for key in sorted(headers)),
+        signed_headers, payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = f"AWS4{credentials['SecretAccessKey']}".encode()
+    for part in (amz_date[:8], region, service, 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    headers['authorization'] = (f"AWS4-HMAC-SHA256 Credential={credentials['AccessKeyId']}/{scope}, "
+                                f"SignedHeaders={signed_headers}, Signature={signature}")
+    return headers
+
+
+class Aws:
+    """Signed S3 reads and Auto Scaling calls. `endpoint_url` replaces every AWS endpoint (S3 path-style)."""
+    ATTEMPTS = 5
+
+    def __init__(self, imds: Imds, region: str, endpoint_url: Optional[str] = None):
+        self.imds = imds
+        self.region = region
+        self.endpoint_url = endpoint_url.rstrip('/') if endpoint_url else None
+
+    def _open(self, method: str, url: str, service: str, body: bytes = b'',
+              headers: Optional[Dict[str, str]] = None):
+        headers = sign(method, url, self.region, service, self.imds.credentials(), body, headers)
+        request = urllib.request.Request(url, data=body or None, method=method, headers=headers)
+        return urllib.request.urlopen(request, timeout=30)
+
+    def _object_url(self, bucket: str, key: str) -> str:
+        base = f"{self.endpoint_url}/{bucket}" if self.endpoint_url else f"https://{bucket}.s3.{self.region}.amazonaws.com"
+        return f"{base}/{urllib.parse.quote(key, safe='/-_.~')}"
+
+    def get_object(self, bucket: str, key: str) -> Optional[bytes]:
+        """A small object's content, or None while it does not exist."""
+        try:
+            with self._open('GET', self._object_url(bucket, key), 's3') as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            # Without s3:ListBucket a missing key reads as 403
+            if e.code in (403, 404):
+                return None
+            raise
+
+    def download(self, bucket: str, key: str, path: str) -> str:
+        """Streams an object to `path`, retrying transient failures. Returns its SHA-256."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for attempt in range(self.ATTEMPTS):
+            try:
+                digest = hashlib.sha256()
+                with self._open('GET', self._object_url(bucket, key), 's3') as response, \
+                        open(f"{path}.part", 'wb') as out:
+                    for chunk in iter(lambda: response.read(1 << 20), b''):
+                        digest.update(chunk)
+                        out.write(chunk)
+                os.replace(f"{path}.part", path)
+                return digest.hexdigest()
+            except (urllib.error.URLError, OSError) as e:
+                if attempt == self.ATTEMPTS - 1 or (isinstance(e, urllib.error.HTTPError) and e.code < 500):
+                    raise
+                delay = backoff(attempt)
+                logger.warning(f"Download of {key} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def autoscaling(self, action: str, **params: str) -> ElementTree.Element:
+        url = f"{self.endpoint_url or f'https://autoscaling.{self.region}.amazonaws.com'}/"
+        body = urllib.parse.urlencode({'Action': action, 'Version': '2011-01-01', **params}).encode()
+        headers = {'content-type': 'application/x-www-form-urlencoded; charset=utf-8'}
+        with self._open('POST', url, 'autoscaling', body, headers) as response:
+            return ElementTree.fromstring(response.read())
+
+
+class Step:
+    def __init__(self, name: str, run: Callable[[], None], after: Sequence[str] = ()):
+        self.name = name
+        self.run = run
+        self.after = frozenset(after)
+
+
+class TimingReport:
+    """When each step started (relative to the run), how long it took and whether it succeeded."""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self.steps: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+
+    def time(self, name: str, run: Callable):
+        start, status = time.monotonic(), 'failed'
+        try:
+            result = run()
+            status = 'ok'
+            return result
+        finally:
+            duration = time.monotonic() - start
+            with self._lock:
+                self.steps.append({'step': name, 'start_s': round(start - self._started, 3),
+                                   'duration_s': round(duration, 3), 'status': status})
+            logger.info(f"Step {name}: {status} in {duration:.2f}s")
+
+    def write(self, path: str):
+        report = {
+            'phase': self.phase,
+            'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            'total_s': round(time.monotonic() - self._started, 3),
+            'steps': sorted(self.steps, key=lambda step: step['start_s']),
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Bootstrap {self.phase} took {report['total_s']:.1f}s; timing report in {path}")
+
+
+def run_steps(steps: Sequence[Step], report: TimingReport, stop: threading.Event, workers: int = 4):
+    """Runs each step as soon as the steps it comes after have finished; the first failure stops the rest."""
+    done, pending, running = set(), list(steps), {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while pending or running:
+                for step in [step for step in pending if step.after <= done]:
+                    pending.remove(step)
+                    running[pool.submit(report.time, step.name, step.run)] = step
+                if not running:
+                    raise RuntimeError(f"Steps waiting on steps that never run: {[step.name for step in pending]}")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                    done.add(running.pop(future).name)
+        except BaseException:
+            # Waits (cluster_info) watch this so the pool can shut down
+            stop.set()
+            raise
+
+
+class Agent:
+    def __init__(self, settings: Dict[str, str], root: str = '/', imds_url: str = 'http://169.254.169.254',
+                 endpoint_url: Optional[str] = None):
+        self.settings = settings
+        self.root = root
+        self.imds = Imds(imds_url)
+        self.endpoint_url = endpoint_url
+        self.stop = threading.Event()
+        self.checksums: Dict[str, str] = {}
+        self.cluster_info: Optional[Tuple[str, str]] = None
+        self._aws: Optional[Aws] = None
+
+    def path(self, path: str) -> str:
+        return os.path.join(self.root, path.lstrip('/'))
+
+    @property
+    def aws(self) -> Aws:
+        if self._aws is None:
+            self._aws = Aws(self.imds, self.imds.get('placement/region'), self.endpoint_url)
+        return self._aws
+
+    def run(self, phase: str) -> int:
+        report = TimingReport(phase)
+        try:
+            warm = report.time('target state', self.target_state).startswith('Warmed:')
+            steps = self.prepare_steps(warm) if phase == 'boot' else []
+            if not warm:
+                downloads = ('k3s binary', 'airgap images', 'installer') if phase == 'boot' else ()
+                steps += [
+                    Step('cluster info', self.wait_for_cluster_info),
+                    Step('start agent', self.start_agent, after=('cluster info', *downloads)),
+                ]
+            run_steps(steps, report, self.stop)
+            report.time('lifecycle hook', self.complete_lifecycle)
+            if warm:
+                logger.info("Prepared for the warm pool; the join runs on promotion.")
+            return 0
+        except Exception:
+            logger.exception(f"Bootstrap {phase} failed")
+            return 1
+        finally:
+            report.write(self.path(f"{STATE_DIR}/timing-{phase}.json"))
+
+    def prepare_steps(self, warm: bool) -> List[Step]:
+        steps = [
+            Step('checksums', self.fetch_checksums),
+            Step('k3s binary', self.fetch_binary, after=('checksums',)),
+            Step('airgap images', self.fetch_images, after=('checksums',)),
+            Step('installer', self.fetch_installer),
+            Step('join unit', self.install_join_unit),
+        ]
+        if warm:
+            steps.append(Step('agent unit', self.install_agent, after=('k3s binary', 'installer')))
+        return steps
+
+    def target_state(self) -> str:
+        """Where the ASG is taking this instance: InService, or e.g. Warmed:Stopped while bound for the warm pool."""
+        for attempt in range(8):
+            try:
+                state = self.imds.get('autoscaling/target-lifecycle-state')
+                if state:
+                    return state
+            except urllib.error.URLError:
+                pass
+            time.sleep(backoff(attempt, cap=10.0))
+        logger.info("No target lifecycle state (not launched by an ASG); joining.")
+        return 'InService'
+
+    # ---- prepare ---------------------------------------------------------------------------
+
+    def _artifact(self, name: str) -> str:
+        return f"{ARTIFACTS_PREFIX}/{self.settings['k3s_version']}/{name}"
+
+    def fetch_checksums(self):
+        data = self.aws.get_object(self.settings['bucket'], self._artifact(f"sha256sum-{self.settings['arch']}.txt"))
+        if data is None:
+            raise RuntimeError(f"No checksums under {self._artifact('')}; are the k3s artifacts uploaded?")
+        self.checksums = {name: digest for digest, name in (line.split() for line in data.decode().splitlines() if line)}
+
+    def _fetch_verified(self, name: str, path: str, expected: Optional[str] = None):
+        """Downloads an artifact and removes it again unless it matches `expected`, or else the release checksum."""
+        digest = self.aws.download(self.settings['bucket'], self._artifact(name), path)
+        if digest != (expected or self.checksums.get(name)):
+            os.remove(path)
+            raise RuntimeError(f"Checksum mismatch for {name}: {digest}")
+
+    def fetch_binary(self):
+        self._fetch_verified('k3s', self.path(K3S_BINARY))
+        os.chmod(self.path(K3S_BINARY), 0o755)
+
+    def fetch_images(self):
+        # k3s imports whatever is in the images directory when the agent starts, without pulling
+        name = f"k3s-airgap-images-{self.settings['arch']}.tar.zst"
+        self._fetch_verified(name, self.path(f"{IMAGES_DIR}/{name}"))
+
+    def fetch_installer(self):
+        # Runs as root, so it is held to the same standard as the binary
+        self._fetch_verified('install.sh', self.path(INSTALLER), self.settings['installer_sha256'])
+
+    def install_join_unit(self):
+        """Copies this agent in place and enables the unit that runs its join on the next boot."""
+        os.makedirs(os.path.dirname(self.path(BOOTSTRAP)), exist_ok=True)
+        shutil.copyfile(os.path.abspath(__file__), self.path(BOOTSTRAP))
+        os.chmod(self.path(BOOTSTRAP), 0o755)
+        os.makedirs(os.path.dirname(self.path(JOIN_UNIT)), exist_ok=True)
+        with open(self.path(JOIN_UNIT), 'w') as f:
+            f.write(
+                "[Unit]\n"
+                "Description=Join this worker to the k3s cluster\n"
+                "Wants=network-online.target\n"
+                "After=network-online.target\n"
+                f"ConditionPathExists=!{STATE_DIR}/joined\n\n"
+                "[Service]\n"
+                "Type=oneshot\n"
+                f"ExecStart=/usr/bin/python3 {BOOTSTRAP} join\n\n"
+                "[Install]\n"
+                "WantedBy=multi-user.target\n"
+            )
+        self._run(['systemctl', 'daemon-reload'])
+        self._run(['systemctl', 'enable', 'k3s-join.service'])
+
+    def install_agent(self, server: Optional[str] = None, token: Optional[str] = None):
+        """Runs the installer on the binary already in place: the agent unit alone, or configured and started."""
+        env = dict(os.environ, INSTALL_K3S_SKIP_DOWNLOAD='true')
+        if server is None:
+            env.update(INSTALL_K3S_SKIP_ENABLE='true', INSTALL_K3S_SKIP_START='true')
+        else:
+            env.update(K3S_URL=server, K3S_TOKEN=token)
+        self._run(['sh', self.path(INSTALLER), 'agent'], env=env)
+
+    # ---- join ------------------------------------------------------------------------------
+
+    def wait_for_cluster_info(self):
+        """Reads the master's address and token from the bucket, backing off up to 30s while it is not there yet."""
+        attempt = 0
+        while not self.stop.is_set():
+            try:
+                data = self.aws.get_object(self.settings['bucket'], 'cluster_info')
+            except urllib.error.URLError as e:
+                logger.warning(f"Reading cluster info failed: {e}")
+                data = None
+            if data:
+                master_ip, token = data.decode().strip().split('|', 1)
+                self.cluster_info = (master_ip, token)
+                logger.info(f"Master IP: {master_ip}")
+                return
+            delay = backoff(attempt)
+            attempt += 1
+            logger.info(f"Waiting for cluster info (next read in {delay:.1f}s)...")
+            self.stop.wait(delay)
+        raise RuntimeError("Stopped while waiting for cluster info")
+
+    def start_agent(self):
+        master_ip, token = self.cluster_info
+        logger.info("Joining cluster...")
+        self.install_agent(f"https://{master_ip}:6443", token)
+        os.makedirs(self.path(STATE_DIR), exist_ok=True)
+        open(self.path(f"{STATE_DIR}/joined"), 'w').close()
+
+    def complete_lifecycle(self):
+        """Moves the instance on (into the warm pool or into service) instead of waiting out the hook's heartbeat."""
+        instance_id = self.imds.get('instance-id')
+        described = self.aws.autoscaling('DescribeAutoScalingInstances', **{'InstanceIds.member.1': instance_id})
+        group = described.find('.//{*}AutoScalingGroupName')
+        if group is None:
+            logger.info("Not in an Auto Scaling group; no lifecycle action to complete.")
+            return
+        try:
+            self.aws.autoscaling('CompleteLifecycleAction', AutoScalingGroupName=group.text,
+                                 LifecycleHookName=self.settings['lifecycle_hook'], InstanceId=instance_id,
+                                 LifecycleActionResult='CONTINUE')
+        except urllib.error.HTTPError as e:
+            logger.info(f"No lifecycle action to complete ({e.code}).")
+
+    @staticmethod
+    def _run(command: List[str], env: Optional[Dict[str, str]] = None):
+        result = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        for line in result.stdout.splitlines():
+            logger.info(f"  {line}")
+        result.check_returncode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('phase', nargs='?', default='boot', choices=['boot', 'join'],
+                        help="'boot' under cloud-init, 'join' from the k3s-join unit")
+    parser.add_argument('--root', default='/', help='Prefix for every path written, for local runs')
+    parser.add_argument('--imds-url', default='http://169.254.169.254')
+    parser.add_argument('--endpoint-url', help='Replaces the S3 and Auto Scaling endpoints, for local runs')
+    args = parser.parse_args()
+
+    agent = Agent(SETTINGS, root=args.root, imds_url=args.imds_url, endpoint_url=args.endpoint_url)
+    os.makedirs(os.path.dirname(agent.path(LOG_FILE)), exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s %(levelname)s %(threadName)s %(message)s',
+        handlers=[logging.FileHandler(agent.path(LOG_FILE)), logging.StreamHandler()],
+    )
+    sys.exit(agent.run(args.phase))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+A minimal stand-in for the AWS endpoints the worker bootstrap agent talks to, for local runs.
+
+One HTTP server answers as:
+  - IMDSv2: the session token, instance-id, region, the ASG's target lifecycle state and the
+    instance profile's credentials (requests without the token get 401)
+  - S3 (path-style): GET of the objects registered with `put`, each visible once its delay has
+    passed, 404 before
+  - Auto Scaling: DescribeAutoScalingInstances and CompleteLifecycleAction, which is recorded
+S3 and Auto Scaling requests must carry a SigV4 Authorization header with the fake credentials'
+access key and session token, or they get 403. Every request sleeps `latency` seconds first.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+ACCESS_KEY = 'AKIAFAKEBOOTSTRAP'
+SESSION_TOKEN = 'fake-session-token'
+IMDS_TOKEN = 'fake-imds-token'
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeAws:
+    def __init__(self, latency: float = 0.02, instance_id: str = 'i-0fake0bootstrap', region: str = 'ap-southeast-1',
+                 asg_name: str = 'worker-asg-fake', target_state: str = 'InService'):
+        self.latency = latency
+        self.instance_id = instance_id
+        self.region = region
+        self.asg_name = asg_name
+        self.target_state = target_state
+        # "bucket/key" -> (content, visible from)
+        self.objects: Dict[str, Tuple[bytes, float]] = {}
+        self.completed_actions: List[Dict[str, str]] = []
+        self.requests: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def put(self, bucket: str, key: str, content: bytes, delay: float = 0.0):
+        """Stores an object, readable `delay` seconds from now."""
+        self.objects[f"{bucket}/{key}"] = (content, time.monotonic() + delay)
+
+    def count(self, prefix: str) -> int:
+        """Requests served whose path starts with `prefix`."""
+        return sum(1 for _, path in self.requests if path.startswith(prefix))
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_PUT(self):
+                self._record()
+                if self.path == '/latest/api/token':
+                    self._send(200, IMDS_TOKEN.encode())
+                else:
+                    self._send(404)
+
+            def do_GET(self):
+                self._record()
+                path = urlparse(self.path).path
+                if path.startswith('/latest/'):
+                    self._metadata(path[len('/latest/meta-data/'):])
+                elif self._signed():
+                    entry = fake.objects.get(unquote(path.lstrip('/')))
+                    if entry is None or time.monotonic() < entry[1]:
+                        self._send(404, b'<Error><Code>NoSuchKey</Code></Error>')
+                    else:
+                        self._send(200, entry[0], 'application/octet-stream')
+
+            def do_POST(self):
+                self._record()
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self._signed():
+                    return
+                params = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+                if params.get('Action') == 'DescribeAutoScalingInstances':
+                    self._send(200, (
+                        '<DescribeAutoScalingInstancesResponse xmlns="https://autoscaling.amazonaws.com/doc/2011-01-01/">'
+                        '<DescribeAutoScalingInstancesResult><AutoScalingInstances><member>'
+                        f"<InstanceId>{fake.instance_id}</InstanceId>"
+                        f"<AutoScalingGroupName>{fake.asg_name}</AutoScalingGroupName>"
+                        '</member></AutoScalingInstances></DescribeAutoScalingInstancesResult>'
+                        '</DescribeAutoScalingInstancesResponse>'
+                    ).encode(), 'text/xml')
+                elif params.get('Action') == 'CompleteLifecycleAction':
+                    with fake._lock:
+                        fake.completed_actions.append(params)
+                    self._send(200, b'<CompleteLifecycleActionResponse/>', 'text/xml')
+                else:
+                    self._send(400)
+
+            def _metadata(self, item: str):
+                if self.headers.get('X-aws-ec2-metadata-token') != IMDS_TOKEN:
+                    self._send(401)
+                    return
+                values = {
+                    'instance-id': fake.instance_id,
+                    'placement/region': fake.region,
+                    'autoscaling/target-lifecycle-state': fake.target_state,
+                    'iam/security-credentials/': 'fake-node-role',
+                    'iam/security-credentials/fake-node-role': json.dumps({
+                        'AccessKeyId': ACCESS_KEY, 'SecretAccessKey': 'fake-secret', 'Token': SESSION_TOKEN,
+                        'Expiration': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + 3600)),
+                    }),
+                }
+                if item in values:
+                    self._send(200, values[item].encode())
+                else:
+                    self._send(404)
+
+            def _signed(self) -> bool:
+                authorization = self.headers.get('Authorization', '')
+                if not authorization.startswith(f"AWS4-HMAC-SHA256 Credential={ACCESS_KEY}/") or \
+                        self.headers.get('X-Amz-Security-Token') != SESSION_TOKEN:
+                    self._send(403, b'<Error><Code>AccessDenied</Code></Error>')
+                    return False
+                return True
+
+            def _record(self):
+                time.sleep(fake.latency)
+                with fake._lock:
+                    fake.requests.append((self.command, self.path))
+
+            def _send(self, status: int, body: bytes = b'', content_type: str = 'text/plain'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,171 @@
+"""
+Runs the worker bootstrap agent locally, against fake AWS endpoints (fake_aws.py) and a fake k3s
+installer and systemctl that only record how they were called. The agent is rendered with the fake
+installer's digest, as the worker stack renders it with k3s-install-sha256.
+
+Stages pinned artifacts of --artifact-mb megabytes in the fake bucket, publishes cluster_info
+--cluster-info-delay seconds in and runs the rendered agent in a scratch root, as cloud-init would.
+With --warm the instance first prepares for the warm pool, then the copy the agent installed runs the
+join, as the k3s-join unit would on promotion. Prints each phase's timing report and fails when the
+agent did not:
+  - place the binary and images with their checksums verified
+  - run the installer as expected (agent unit only when warm, then started with the master's address)
+  - complete the lifecycle hook once per phase and leave the joined marker
+With --tampered-installer the bucket serves an installer other than the pinned one, and the run fails
+unless the agent refuses it: boot exits non-zero without running any installer or joining.
+
+Usage: python scripts/local_bootstrap.py [--warm] [--tampered-installer] [--cluster-info-delay 3] [--latency 0.02]
+                                         [--artifact-mb 8]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_aws import FakeAws  # noqa: E402
+
+BUCKET = 'k3s-storage-bucket-local'
+K3S_VERSION = 'v1.31.4+k3s1'
+HOOK = 'worker-bootstrap'
+PREFIX = f"artifacts/k3s/{K3S_VERSION}"
+# Where the agent downloads the installer, under the scratch root
+INSTALLER = 'usr/local/sbin/k3s-install.sh'
+
+# Records its arguments and the variables the agent sets, like the real install.sh it stands in for
+FAKE_INSTALLER = """#!/bin/sh
+echo "install.sh $* url=${K3S_URL:-} token=${K3S_TOKEN:-} skip_download=${INSTALL_K3S_SKIP_DOWNLOAD:-} \
+skip_start=${INSTALL_K3S_SKIP_START:-}" >> "$FAKE_CALLS"
+"""
+FAKE_SYSTEMCTL = """#!/bin/sh
+echo "systemctl $*" >> "$FAKE_CALLS"
+"""
+
+
+def render(settings: dict) -> str:
+    """The agent as the worker stack renders it into the user data."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bootstrap.py')) as f:
+        source = f.read()
+    for placeholder, value in settings.items():
+        source = source.replace(placeholder, value)
+    return source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--warm', action='store_true', help='Launch into the warm pool, then promote')
+    parser.add_argument('--cluster-info-delay', type=float, default=3.0)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds added to every fake AWS request')
+    parser.add_argument('--artifact-mb', type=int, default=8, help='Size of the fake binary and images')
+    parser.add_argument('--tampered-installer', action='store_true',
+                        help='Serve an installer that does not match the pinned digest')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='k3s-bootstrap-')
+    root, bin_dir = os.path.join(scratch, 'root'), os.path.join(scratch, 'bin')
+    calls = os.path.join(scratch, 'calls.log')
+    open(calls, 'w').close()
+    os.makedirs(bin_dir)
+    with open(os.path.join(bin_dir, 'systemctl'), 'w') as f:
+        f.write(FAKE_SYSTEMCTL)
+    os.chmod(os.path.join(bin_dir, 'systemctl'), 0o755)
+    agent = os.path.join(scratch, 'user-data')
+    with open(agent, 'w') as f:
+        f.write(render({
+            'REPLACE_ME_BUCKET_NAME': BUCKET, 'REPLACE_ME_K3S_VERSION': K3S_VERSION, 'REPLACE_ME_LIFECYCLE_HOOK': HOOK,
+            'REPLACE_ME_INSTALLER_SHA256': hashlib.sha256(FAKE_INSTALLER.encode()).hexdigest(),
+        }))
+    env = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}", FAKE_CALLS=calls)
+
+    binary, images = os.urandom(args.artifact_mb << 20), os.urandom(args.artifact_mb << 20)
+    checksums = (f"{hashlib.sha256(binary).hexdigest()}  k3s\n"
+                 f"{hashlib.sha256(images).hexdigest()}  k3s-airgap-images-amd64.tar.zst\n")
+
+    failures = []
+    with FakeAws(latency=args.latency, target_state='Warmed:Stopped' if args.warm else 'InService') as aws:
+        aws.put(BUCKET, f"{PREFIX}/k3s", binary)
+        aws.put(BUCKET, f"{PREFIX}/k3s-airgap-images-amd64.tar.zst", images)
+        aws.put(BUCKET, f"{PREFIX}/sha256sum-amd64.txt", checksums.encode())
+        installer = FAKE_INSTALLER + ('echo "tampered" >> "$FAKE_CALLS"\n' if args.tampered_installer else '')
+        aws.put(BUCKET, f"{PREFIX}/install.sh", installer.encode())
+        aws.put(BUCKET, 'cluster_info', b'10.0.2.10|K10fake::server:token', delay=args.cluster_info_delay)
+
+        flags = ['--root', root, '--imds-url', aws.url, '--endpoint-url', aws.url]
+        phases = [('boot', [sys.executable, agent, 'boot'])]
+        if args.warm:
+            phases.append(('join', [sys.executable, os.path.join(root, 'usr/local/sbin/k3s-bootstrap'), 'join']))
+        for phase, command in phases:
+            if phase == 'join':
+                aws.target_state = 'InService'
+            result = subprocess.run(command + flags, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True)
+            if result.returncode:
+                if args.tampered_installer:
+                    print(f"{phase}: refused, exit {result.returncode}")
+                    if 'Checksum mismatch for install.sh' not in result.stdout:
+                        print(result.stdout)
+                        failures.append(f"{phase} failed for another reason than the installer checksum")
+                    break
+                print(result.stdout)
+                failures.append(f"{phase} exited with {result.returncode}")
+                continue
+            if args.tampered_installer:
+                failures.append(f"{phase} accepted the tampered installer")
+            with open(os.path.join(root, f"var/lib/k3s-bootstrap/timing-{phase}.json")) as f:
+                report = json.load(f)
+            print(f"{phase}: {report['total_s']:.2f}s")
+            for step in report['steps']:
+                print(f"  {step['step']:>16}  start {step['start_s']:>7.3f}s  "
+                      f"took {step['duration_s']:>7.3f}s  {step['status']}")
+
+        cluster_info_reads = aws.count(f"/{BUCKET}/cluster_info")
+        lifecycle = aws.completed_actions
+
+    with open(calls) as f:
+        installer_calls = [line.strip() for line in f if line.startswith(('install.sh', 'tampered'))]
+    print(f"\ncluster_info reads: {cluster_info_reads}")
+    print("installer calls:\n  " + "\n  ".join(installer_calls))
+
+    if args.tampered_installer:
+        if installer_calls:
+            failures.append(f"the tampered installer ran: {installer_calls}")
+        if os.path.exists(os.path.join(root, INSTALLER)):
+            failures.append("the tampered installer was left in place")
+        if lifecycle or os.path.exists(os.path.join(root, 'var/lib/k3s-bootstrap/joined')):
+            failures.append("the instance joined with a tampered installer")
+        finish(failures, scratch)
+        return
+
+    for path, content in (('usr/local/bin/k3s', binary),
+                          ('var/lib/rancher/k3s/agent/images/k3s-airgap-images-amd64.tar.zst', images)):
+        if not os.path.exists(os.path.join(root, path)):
+            failures.append(f"{path} missing")
+            continue
+        with open(os.path.join(root, path), 'rb') as f:
+            if f.read() != content:
+                failures.append(f"{path} differs from the artifact")
+    expected = (['skip_start=true'] if args.warm else []) + ['url=https://10.0.2.10:6443']
+    if len(installer_calls) != len(expected) or \
+            any(marker not in call for marker, call in zip(expected, installer_calls)):
+        failures.append(f"installer calls {installer_calls}, expected ones with {expected}")
+    if len(lifecycle) != len(phases) or any(action.get('LifecycleHookName') != HOOK for action in lifecycle):
+        failures.append(f"lifecycle actions completed: {lifecycle}")
+    if not os.path.exists(os.path.join(root, 'var/lib/k3s-bootstrap/joined')):
+        failures.append("no joined marker")
+    finish(failures, scratch)
+
+
+def finish(failures, scratch):
+    if failures:
+        print(f"\nFAILED (scratch root kept in {scratch}): {'; '.join(failures)}")
+        sys.exit(1)
+    shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main()